@@ -0,0 +1,192 @@
+import asyncio
+from quart import Quart, Response, abort, render_template, request, jsonify, url_for
+from . import responses
+from .async_service import AsyncNeo4jQueries, AsyncParkingService
+from .cache import CompressedBody, compress_body
+from .connections import registry
+from .map import COLOR_MAP, ParkingService, read_filters
+from .neo4j_queries import Neo4jQueries
+from config import *
+
+# Mode de service asynchrone (ASGI) : hypercorn -w 4 app.async_main:app
+# Mêmes routes et mêmes réponses que app/main.py ; les entrées/sorties indépendantes d'une
+# requête sont lancées ensemble et chaque worker sert de nombreuses requêtes à la fois.
+app = Quart(__name__)
+app.secret_key = "paris_parking_secret_key"
+
+parking_service = ParkingService()
+neo4j_queries = Neo4jQueries()
+async_service = AsyncParkingService(parking_service)
+async_neo4j_queries = AsyncNeo4jQueries(neo4j_queries)
+
+async def filter_choices() -> dict:
+    """
+    Valeurs proposées dans les listes déroulantes du formulaire, lues depuis le cache des facettes.
+    Returns:
+        dict: Variables de template (arrondissements, types_reglement, types_station, zones).
+    """
+    return responses.filter_choices(await async_service.get_facets())
+
+async def compressed_response(entry: CompressedBody) -> Response:
+    """
+    Sert une réponse mise en cache compressée (voir app.main.compressed_response).
+    Args:
+        entry (CompressedBody): Réponse compressée.
+    Returns:
+        Response: Réponse Quart.
+    """
+    response = responses.compressed_response(Response, entry, request.accept_encodings["gzip"])
+    await response.make_conditional(request)
+    return response
+
+@app.route("/")
+async def index():
+    """
+    Page d'accueil de l'application.
+    Returns:
+        Rendered HTML template for the index page.
+    """
+    return await render_template("index.html", **await filter_choices())
+
+@app.route("/search", methods=["POST"])
+async def search():
+    """
+    Recherche des emplacements de stationnement en fonction des filtres du formulaire (voir app.main.search).
+    Returns:
+        Rendered HTML template for the index page with search results.
+    """
+    form = await request.form
+    filters = read_filters(form)
+    after = form.get("after") or None
+    key = parking_service.map_key(filters, SEARCH_PAGE_SIZE, after)
+    if MAP_RENDERER == "folium":
+        parking_service.remember_search_map(key, filters, after)
+    return await compressed_response(await async_service.get_or_create_response(
+        ("search", key), lambda: render_search(filters, after, key)))
+
+async def render_search(filters: dict, after: str = None, key: str = None) -> CompressedBody:
+    """
+    Effectue une recherche et rend la page de résultats, compressée.
+    Les facettes du formulaire sont lues pendant la recherche (géocodage, requête MongoDB).
+    Args:
+        filters (dict): Filtres saisis dans le formulaire.
+        after (str): Curseur de la page demandée (un curseur invalide ramène à la première page).
+        key (str): Clé de la page, qui identifie sa carte (/map/<key>).
+    Returns:
+        CompressedBody: Page HTML compressée.
+    """
+    choices = asyncio.ensure_future(filter_choices())
+    normalized, results, next_cursor, after = await async_service.cached_search_page_or_first(
+        filters, SEARCH_PAGE_SIZE, after)
+
+    # Le rendu Folium occupe le processeur : il s'exécute dans un thread
+    if MAP_RENDERER == "folium":
+        await asyncio.to_thread(parking_service.page_map, normalized, results, after)
+
+    html = await render_template("index.html",
+                                 **responses.search_context(filters, after, key, results, next_cursor),
+                                 **await choices)
+    return compress_body(html, "text/html")
+
+@app.route("/api/zones/<int:arrondissement>")
+async def get_zones_by_arrondissement(arrondissement):
+    """
+    Zones de règlement d'un arrondissement, précalculées (voir app.main.get_zones_by_arrondissement).
+    Args:
+        arrondissement (int): Le numéro de l'arrondissement pour lequel récupérer les zones.
+    Returns:
+        JSON: Liste des zones de règlement pour l'arrondissement spécifié.
+    """
+    version = await async_service.get_data_version("neo4j")
+    body, etag = await async_neo4j_queries.get_zones_response(arrondissement, version)
+    response = Response(body, mimetype="application/json")
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = ZONES_MAX_AGE
+    await response.make_conditional(request)
+    return response
+
+@app.route("/api/emplacements")
+async def api_emplacements():
+    """
+    Recherche des emplacements et renvoie les résultats en GeoJSON compact (voir app.main.api_emplacements).
+    Returns:
+        GeoJSON: FeatureCollection des emplacements trouvés.
+    """
+    filters = read_filters(request.args)
+    limit = responses.read_limit(request.args)
+    after = request.args.get("after")
+
+    async def render() -> CompressedBody:
+        try:
+            _, results, next_cursor = await async_service.cached_search_page(filters, limit, after)
+        except ValueError as e:
+            abort(400, str(e))
+        next_url = url_for("api_emplacements", limit=limit, after=next_cursor, **filters) if next_cursor else None
+        return responses.geojson_body(parking_service.to_geojson(results), next_cursor, next_url)
+
+    key = ("geojson", parking_service.map_key(filters, limit, after))
+    return await compressed_response(await async_service.get_or_create_response(key, render))
+
+@app.route("/api/emplacements.ndjson")
+async def api_emplacements_ndjson():
+    """
+    Recherche des emplacements et diffuse tous les résultats en NDJSON (voir app.main.api_emplacements_ndjson).
+    Returns:
+        NDJSON: Emplacements trouvés (voir Emplacement.to_dict).
+    """
+    filters = read_filters(request.args)
+    emplacements = async_service.iter_emplacements(filters, request.args.get("after"))
+    try:
+        first = await emplacements.__anext__()
+    except StopAsyncIteration:
+        first = None
+    except ValueError as e:
+        abort(400, str(e))
+
+    async def generate():
+        if first is None:
+            return
+        yield responses.ndjson_line(first).encode("utf-8")
+        async for emp in emplacements:
+            yield responses.ndjson_line(emp).encode("utf-8")
+
+    return Response(generate(), mimetype="application/x-ndjson")
+
+@app.route("/light-map")
+async def show_light_map():
+    """
+    Affiche une carte Leaflet qui charge les résultats depuis /api/emplacements.
+    Returns:
+        Rendered HTML template for the lightweight map page.
+    """
+    return await render_template("light_map.html", color_map=COLOR_MAP, page_size=SEARCH_PAGE_SIZE)
+
+@app.route("/api/geocoding/stats")
+async def geocoding_stats():
+    """
+    Expose les compteurs du cache de géocodage (succès mémoire, gazetteer, disque, appels réseau).
+    Returns:
+        JSON: Compteurs du géocodeur.
+    """
+    return jsonify(parking_service.geocoder.stats())
+
+@app.route("/map")
+@app.route("/map/<key>")
+async def show_map(key=None):
+    """
+    Affiche la carte d'une recherche, ou la carte par défaut (voir app.main.show_map).
+    Args:
+        key (str): Clé de la carte générée par la recherche.
+    Returns:
+        HTML de la carte.
+    """
+    return Response(await async_service.get_map(key), mimetype="text/html")
+
+@app.after_serving
+async def close_connections():
+    # Les clients asynchrones sont liés à la boucle d'événements du worker : fermeture à l'arrêt
+    await registry.aclose()
+
+if __name__ == "__main__":
+    app.run(host=FLASK_HOST, port=FLASK_PORT, debug=FLASK_DEBUG)
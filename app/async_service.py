@@ -0,0 +1,242 @@
+import asyncio
+from typing import Dict, List, Optional, Tuple
+from config import *
+from .cache import MISSING
+from .connections import ConnectionRegistry, registry
+from .map import FACETS_PIPELINE, SEARCH_PROJECTION, ParkingService, decode_cursor, facets_from_result
+from .neo4j_queries import ZONES_QUERY, Neo4jQueries
+from .records import Emplacement
+
+
+class AsyncParkingService:
+    """Accès asynchrones de ParkingService, pour le mode de service ASGI (app/async_main.py).
+    Les entrées/sorties (MongoDB via l'API asynchrone de PyMongo, géocodage) sont attendues
+    sans bloquer la boucle d'événements, et celles qui sont indépendantes sont lancées
+    ensemble. Les caches, l'instantané, la construction des requêtes et le rendu restent
+    ceux du ParkingService enveloppé : les deux modes partagent le même comportement.
+    """
+    def __init__(self, service: ParkingService, connections: ConnectionRegistry = registry):
+        """
+        Args:
+            service (ParkingService): Service synchrone dont les caches et traitements sont réutilisés.
+            connections (ConnectionRegistry): Registre des connexions (registre de l'application par défaut).
+        """
+        self.service = service
+        self.connections = connections
+
+    @property
+    def db(self):
+        return self.connections.async_db
+
+    async def get_data_version(self, source: str = "mongo"):
+        """
+        Version des données publiée par l'ETL, lue dans le cache de versions du service.
+        Args:
+            source (str): "mongo" ou "neo4j".
+        Returns:
+            Optional[str]: Identifiant de version.
+        """
+        version = self.service.version_cache.get(source)
+        if version is MISSING:
+            doc = await self.db[COLLECTION_METADATA].find_one({"_id": source}, {"version": 1})
+            version = doc.get("version") if doc else None
+            self.service.version_cache.set(source, version)
+        return version
+
+    async def sync_data_version(self):
+        """
+        Invalide les caches du service lorsqu'une nouvelle version est publiée (voir
+        ParkingService.sync_data_version). La version est lue de façon asynchrone puis la
+        synchronisation du service s'exécute sur le cache de versions, sans entrée/sortie.
+        Returns:
+            Optional[str]: Version courante des données.
+        """
+        await self.get_data_version("mongo")
+        return self.service.sync_data_version()
+
+    async def geocode(self, address: str):
+        """Géocode une adresse dans un thread (caches mémoire/disque, puis Nominatim)."""
+        return await asyncio.to_thread(self.service.geocoder.geocode, address)
+
+    async def get_facets(self) -> dict:
+        """
+        Facettes de recherche (voir ParkingService.get_facets), calculées par une agrégation asynchrone.
+        Returns:
+            Dict[str, List[Dict]]: Pour chaque champ, liste triée de {"value": ..., "count": ...}.
+        """
+        await self.sync_data_version()
+        facets = self.service._facets
+        if facets is None:
+            cursor = await self.db[COLLECTION_EMPLACEMENTS].aggregate(FACETS_PIPELINE)
+            result = (await cursor.to_list(None) or [{}])[0]
+            facets = self.service._facets = facets_from_result(result)
+        return facets
+
+    async def geocode_filters(self, filters: dict):
+        """Géocode l'adresse des filtres de recherche, s'il y en a une (None sinon)."""
+        return await self.geocode(filters["address"]) if filters.get("address") else None
+
+    async def normalize_filters(self, filters: dict) -> dict:
+        """Filtres normalisés (voir ParkingService.normalize_filters), avec géocodage asynchrone."""
+        return self.service.normalize_filters(filters, await self.geocode_filters(filters))
+
+    async def cached_search_page(self, filters: dict, limit: int = SEARCH_PAGE_SIZE, after: str = None):
+        """
+        Version asynchrone de ParkingService.cached_search_page (même cache de résultats).
+        Le géocodage et la lecture de la version des données sont lancés ensemble.
+        Returns:
+            Tuple[dict, List[Emplacement], Optional[str]]: Filtres normalisés, emplacements de la page
+            et curseur de la page suivante.
+        Raises:
+            ValueError: Si le curseur est invalide.
+        """
+        location, _ = await asyncio.gather(self.geocode_filters(filters), self.sync_data_version())
+        normalized = self.service.normalize_filters(filters, location)
+        key = self.service.map_key(normalized, limit, after)
+        page = self.service.search_cache.get(key)
+        if page is MISSING:
+            page = await self.search_page(normalized, limit, after)
+            self.service.search_cache.set(key, page)
+        results, next_cursor = page
+        return normalized, self.service.exact_distances(results, location), next_cursor
+
+    async def cached_search_page_or_first(self, filters: dict, limit: int = SEARCH_PAGE_SIZE, after: str = None):
+        """Version asynchrone de ParkingService.cached_search_page_or_first."""
+        try:
+            return await self.cached_search_page(filters, limit, after) + (after,)
+        except ValueError:
+            return await self.cached_search_page(filters, limit) + (None,)
+
+    async def search_page(self, filters: dict, limit: int = SEARCH_PAGE_SIZE,
+                          after: str = None) -> Tuple[List[Emplacement], Optional[str]]:
+        """
+        Version asynchrone de ParkingService.search_page : l'instantané colonnaire est interrogé
+        directement, MongoDB par des requêtes asynchrones.
+        Returns:
+            Tuple[List[Emplacement], Optional[str]]: Emplacements de la page et curseur de la page suivante.
+        Raises:
+            ValueError: Si le curseur est invalide.
+        """
+        service = self.service
+        snapshot = service.snapshot.get(await self.sync_data_version())
+        cursor = decode_cursor(after) if after else None
+        if service.is_near_search(filters):
+            user_coords = await asyncio.to_thread(service.locate, filters)
+            if user_coords is None:
+                return [], None
+            # Instantané ou index spatial en mémoire (chargé à la première recherche) : dans un thread
+            page = await asyncio.to_thread(service.local_near_page, snapshot, user_coords, filters, limit, cursor)
+            if page is None:
+                page = await self.search_near(user_coords, service.build_query(filters), PROXIMITY_RADIUS, limit, cursor)
+            return page, service.page_cursor(page, limit, by_distance=True)
+
+        page = service.local_page(snapshot, filters, limit, cursor)
+        if page is None:
+            documents = await (self.db[COLLECTION_EMPLACEMENTS].find(service.key_page_query(filters, cursor),
+                                                                     SEARCH_PROJECTION)
+                               .sort("_key", 1).limit(limit).to_list(None))
+            page = Emplacement.from_cursor(documents)
+        return page, service.page_cursor(page, limit)
+
+    async def iter_emplacements(self, filters: dict, after: str = None, batch_size: int = 1000):
+        """
+        Parcourt tous les résultats d'une recherche, page par page (voir ParkingService.iter_emplacements).
+        Returns:
+            AsyncIterator[Emplacement]: Emplacements, dans l'ordre de pagination.
+        """
+        while True:
+            page, after = await self.search_page(filters, batch_size, after)
+            for emp in page:
+                yield emp
+            if after is None:
+                return
+
+    async def get_map(self, key: str = None) -> str:
+        """
+        Version asynchrone de ParkingService.get_map : la page de résultats est relue par le cache
+        asynchrone, le rendu Folium (processeur) s'exécute dans un thread.
+        Args:
+            key (str): Clé de la carte (optionnelle, voir ParkingService.remember_search_map).
+        Returns:
+            str: Code HTML de la carte.
+        """
+        requested = self.service.map_requests.get(key) if key else MISSING
+        if requested is MISSING:
+            return await asyncio.to_thread(self.service.get_map)
+        filters, after = requested
+        normalized, results, _, after = await self.cached_search_page_or_first(filters, SEARCH_PAGE_SIZE, after)
+        return await asyncio.to_thread(self.service.page_map, normalized, results, after)
+
+    async def get_or_create_response(self, key, render):
+        """
+        Retourne une réponse compressée du cache des réponses du service, en la calculant si besoin.
+        Args:
+            key (Hashable): Clé de la réponse (route et paramètres bruts de la requête).
+            render (Callable[[], Awaitable[CompressedBody]]): Coroutine produisant la réponse compressée.
+        Returns:
+            CompressedBody: La réponse.
+        """
+        await self.sync_data_version()
+        entry = self.service.response_cache.get(key)
+        if entry is MISSING:
+            entry = await render()
+            self.service.response_cache.set(key, entry)
+        return entry
+
+    async def search_near(self, user_coords, query: dict, radius: float, limit: int = 500,
+                          cursor: list = None) -> List[Emplacement]:
+        """
+        Version asynchrone de ParkingService.search_near : le pipeline $geoNear et la requête
+        de repli (documents sans `location`) sont exécutés en parallèle.
+        Returns:
+            List[Emplacement]: Liste des emplacements triés par distance croissante.
+        """
+        collection = self.db[COLLECTION_EMPLACEMENTS]
+
+        async def near():
+            near_cursor = await collection.aggregate(self.service.near_pipeline(user_coords, query, radius, limit, cursor))
+            return await near_cursor.to_list(None)
+
+        fallback_query = self.service.fallback_query(user_coords, query, radius)
+        documents, fallback_documents = await asyncio.gather(
+            near(), collection.find(fallback_query, SEARCH_PROJECTION).to_list(None))
+        return self.service.merge_near_results(documents, fallback_documents, user_coords, radius, limit, cursor)
+
+
+class AsyncNeo4jQueries:
+    """Accès asynchrones de Neo4jQueries (driver Neo4j asynchrone) ; réponses précalculées partagées."""
+    def __init__(self, queries: Neo4jQueries, connections: ConnectionRegistry = registry):
+        """
+        Args:
+            queries (Neo4jQueries): Requêtes synchrones dont les réponses précalculées sont réutilisées.
+            connections (ConnectionRegistry): Registre des connexions (registre de l'application par défaut).
+        """
+        self.queries = queries
+        self.connections = connections
+        self._loading: Optional[asyncio.Task] = None
+
+    async def get_all_zones_by_arrondissement(self) -> Dict[int, List[str]]:
+        """
+        Returns:
+            Dict[int, List[str]]: Zones triées, par numéro d'arrondissement.
+        """
+        async with self.connections.async_neo4j_driver.session() as session:
+            result = await session.run(ZONES_QUERY)
+            return {record["arrond"]: sorted(record["zones"]) async for record in result}
+
+    async def get_zones_response(self, arrondissement: int, version: Optional[str] = None) -> Tuple[bytes, str]:
+        """
+        Réponse JSON précalculée des zones d'un arrondissement et son ETag (voir
+        Neo4jQueries.get_zones_response). Les requêtes concurrentes arrivées pendant un
+        rechargement attendent la même requête Neo4j.
+        Args:
+            arrondissement (int): Le numéro de l'arrondissement.
+            version (Optional[str]): Version courante du graphe publiée par l'ETL.
+        Returns:
+            Tuple[bytes, str]: Corps JSON et ETag.
+        """
+        if not self.queries.zones_loaded(version):
+            if self._loading is None or self._loading.done():
+                self._loading = asyncio.ensure_future(self.get_all_zones_by_arrondissement())
+            self.queries.set_zones(await self._loading, version)
+        return self.queries.get_zones_response(arrondissement, version)
@@ -0,0 +1,106 @@
+import gzip
+import hashlib
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from typing import Any, Dict, Hashable, Optional, Union
+
+MISSING = object()
+
+# Réponse conservée compressée : corps gzip, ETag du contenu non compressé, type MIME et en-têtes
+CompressedBody = namedtuple("CompressedBody", ["gzip_body", "etag", "mimetype", "headers"], defaults=((),))
+
+
+def compress_body(body: Union[str, bytes], mimetype: str, headers=(), level: int = 6) -> CompressedBody:
+    """
+    Compresse une réponse une fois pour toutes avant sa mise en cache.
+    Args:
+        body (Union[str, bytes]): Corps de la réponse (texte encodé en UTF-8).
+        mimetype (str): Type MIME de la réponse.
+        headers (Iterable[Tuple[str, str]]): En-têtes à renvoyer avec la réponse (Link...).
+        level (int): Niveau de compression gzip.
+    Returns:
+        CompressedBody: Corps compressé, ETag (empreinte du contenu), type MIME et en-têtes.
+    """
+    raw = body.encode("utf-8") if isinstance(body, str) else body
+    # mtime fixe : deux compressions du même contenu donnent les mêmes octets
+    return CompressedBody(gzip.compress(raw, compresslevel=level, mtime=0), hashlib.sha1(raw).hexdigest(),
+                          mimetype, tuple(headers))
+
+
+class TTLCache:
+    """Cache LRU borné avec durée de vie (TTL) par entrée, thread-safe.
+    Les entrées les moins récemment utilisées sont évincées lorsque `maxsize` est atteint ;
+    une entrée plus ancienne que `ttl` secondes est considérée comme absente.
+    Les compteurs de succès et d'échecs sont exposés par `stats()`.
+    """
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        """
+        Args:
+            maxsize (int): Nombre maximal d'entrées conservées.
+            ttl (Optional[float]): Durée de vie d'une entrée en secondes (None : illimitée).
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        """
+        Récupère une valeur du cache.
+        Args:
+            key (Hashable): Clé recherchée.
+            default (Any): Valeur retournée si la clé est absente ou expirée.
+        Returns:
+            Any: La valeur associée ou `default`.
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = MISSING):
+        """
+        Ajoute ou remplace une valeur dans le cache.
+        Args:
+            key (Hashable): Clé.
+            value (Any): Valeur à conserver.
+            ttl (Optional[float]): Durée de vie spécifique à cette entrée (par défaut celle du cache).
+        """
+        ttl = self.ttl if ttl is MISSING else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Retire une entrée du cache et retourne sa valeur."""
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return entry[0] if entry is not None else default
+
+    def clear(self):
+        """Vide le cache (les compteurs sont conservés)."""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns:
+            Dict[str, int]: Compteurs de succès/échecs et taille du cache.
+        """
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._data), "maxsize": self.maxsize}
@@ -0,0 +1,169 @@
+import os
+import threading
+from pymongo import AsyncMongoClient, MongoClient
+from neo4j import AsyncGraphDatabase, GraphDatabase
+from config import (MONGO_URI, DB_NAME, MONGO_MAX_POOL_SIZE, NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD,
+                    NEO4J_DATABASE, NEO4J_MAX_POOL_SIZE)
+
+
+class ConnectionRegistry:
+    """Clients MongoDB et Neo4j partagés par les services de l'application.
+    Les clients sont créés à la première utilisation (et non à l'import), une seule fois
+    même si plusieurs threads les demandent en même temps, avec des pools de taille
+    explicite. Après un fork (workers gunicorn/uwsgi), le processus enfant abandonne les
+    clients hérités du parent et en recrée de nouveaux : les sockets et threads de
+    surveillance des pilotes ne survivent pas à un fork.
+    Les clients asynchrones (mode de service asynchrone, app/async_main.py) sont créés
+    de la même façon, depuis la boucle d'événements du worker qui les utilise.
+    """
+    def __init__(self, mongo_uri: str = MONGO_URI, db_name: str = DB_NAME, mongo_pool_size: int = MONGO_MAX_POOL_SIZE,
+                 neo4j_uri: str = NEO4J_URI, neo4j_auth=(NEO4J_USER, NEO4J_PASSWORD),
+                 neo4j_database: str = NEO4J_DATABASE, neo4j_pool_size: int = NEO4J_MAX_POOL_SIZE):
+        """
+        Args:
+            mongo_uri (str): URI de connexion MongoDB.
+            db_name (str): Nom de la base MongoDB.
+            mongo_pool_size (int): Nombre maximal de connexions MongoDB (maxPoolSize).
+            neo4j_uri (str): URI de connexion Neo4j.
+            neo4j_auth: Couple (utilisateur, mot de passe) Neo4j.
+            neo4j_database (str): Nom de la base Neo4j.
+            neo4j_pool_size (int): Nombre maximal de connexions Neo4j (max_connection_pool_size).
+        """
+        self.mongo_uri = mongo_uri
+        self.db_name = db_name
+        self.mongo_pool_size = mongo_pool_size
+        self.neo4j_uri = neo4j_uri
+        self.neo4j_auth = neo4j_auth
+        self.neo4j_database = neo4j_database
+        self.neo4j_pool_size = neo4j_pool_size
+        self._mongo_client = None
+        self._neo4j_driver = None
+        self._async_mongo_client = None
+        self._async_neo4j_driver = None
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+
+    def _forget_clients(self):
+        self._mongo_client = self._neo4j_driver = None
+        self._async_mongo_client = self._async_neo4j_driver = None
+
+    def _check_fork(self):
+        # Filet de sécurité si le hook post-fork n'a pas été appelé (appelé sous verrou)
+        if self._pid != os.getpid():
+            self._forget_clients()
+            self._pid = os.getpid()
+
+    @property
+    def mongo_client(self) -> MongoClient:
+        """Client MongoDB partagé, créé à la première utilisation."""
+        client = self._mongo_client
+        if client is None or self._pid != os.getpid():
+            with self._lock:
+                self._check_fork()
+                if self._mongo_client is None:
+                    self._mongo_client = MongoClient(self.mongo_uri, maxPoolSize=self.mongo_pool_size)
+                client = self._mongo_client
+        return client
+
+    @property
+    def db(self):
+        """Base MongoDB de l'application."""
+        return self.mongo_client[self.db_name]
+
+    @property
+    def neo4j_driver(self):
+        """Driver Neo4j partagé, créé à la première utilisation."""
+        driver = self._neo4j_driver
+        if driver is None or self._pid != os.getpid():
+            with self._lock:
+                self._check_fork()
+                if self._neo4j_driver is None:
+                    self._neo4j_driver = GraphDatabase.driver(self.neo4j_uri, auth=self.neo4j_auth,
+                                                              database=self.neo4j_database,
+                                                              max_connection_pool_size=self.neo4j_pool_size)
+                driver = self._neo4j_driver
+        return driver
+
+    @property
+    def async_mongo_client(self) -> AsyncMongoClient:
+        """Client MongoDB asynchrone partagé (API asynchrone de PyMongo), créé à la première utilisation."""
+        client = self._async_mongo_client
+        if client is None or self._pid != os.getpid():
+            with self._lock:
+                self._check_fork()
+                if self._async_mongo_client is None:
+                    self._async_mongo_client = AsyncMongoClient(self.mongo_uri, maxPoolSize=self.mongo_pool_size)
+                client = self._async_mongo_client
+        return client
+
+    @property
+    def async_db(self):
+        """Base MongoDB de l'application, accès asynchrone."""
+        return self.async_mongo_client[self.db_name]
+
+    @property
+    def async_neo4j_driver(self):
+        """Driver Neo4j asynchrone partagé, créé à la première utilisation."""
+        driver = self._async_neo4j_driver
+        if driver is None or self._pid != os.getpid():
+            with self._lock:
+                self._check_fork()
+                if self._async_neo4j_driver is None:
+                    self._async_neo4j_driver = AsyncGraphDatabase.driver(
+                        self.neo4j_uri, auth=self.neo4j_auth, database=self.neo4j_database,
+                        max_connection_pool_size=self.neo4j_pool_size)
+                driver = self._async_neo4j_driver
+        return driver
+
+    def reset_after_fork(self):
+        """
+        Abandonne les clients hérités du processus parent, sans les fermer : leurs sockets
+        sont partagés avec le parent, qui continue de les utiliser. Les prochains accès
+        recréent des clients propres au processus courant.
+        """
+        self._lock = threading.Lock()
+        self._forget_clients()
+        self._pid = os.getpid()
+
+    def close(self):
+        """Ferme les clients ouverts par ce processus."""
+        with self._lock:
+            self._check_fork()
+            if self._mongo_client is not None:
+                self._mongo_client.close()
+            if self._neo4j_driver is not None:
+                self._neo4j_driver.close()
+            self._mongo_client = self._neo4j_driver = None
+
+    async def aclose(self):
+        """Ferme les clients asynchrones ouverts par ce processus (arrêt du serveur ASGI)."""
+        with self._lock:
+            self._check_fork()
+            mongo_client, neo4j_driver = self._async_mongo_client, self._async_neo4j_driver
+            self._async_mongo_client = self._async_neo4j_driver = None
+        if mongo_client is not None:
+            await mongo_client.close()
+        if neo4j_driver is not None:
+            await neo4j_driver.close()
+
+
+registry = ConnectionRegistry()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=registry.reset_after_fork)
+
+
+def post_fork(server=None, worker=None):
+    """
+    Hook post-fork de gunicorn (voir gunicorn.conf.py) : reconnexion propre dans chaque worker.
+    Sous uwsgi, le même hook est enregistré via uwsgidecorators.postfork lorsqu'il est disponible.
+    """
+    registry.reset_after_fork()
+
+
+try:
+    from uwsgidecorators import postfork
+except ImportError:
+    pass
+else:
+    postfork(post_fork)
@@ -0,0 +1,128 @@
+import numpy as np
+from typing import Dict, Iterable, List, Tuple
+from geopy.distance import geodesic
+from .spatial_index import EARTH_RADIUS_M, HAVERSINE_TOLERANCE, REFERENCE_LAT, get_coords
+
+
+class DistanceEngine:
+    """Moteur de calcul de distances vectorisé (NumPy).
+    Les coordonnées des emplacements sont stockées dans des tableaux float64 contigus
+    (en radians) et les distances vers un ou plusieurs points de requête sont calculées
+    en une seule passe.
+
+    Deux méthodes sont disponibles :
+    - "haversine" : distance sur la sphère, écart < 0,5 % avec geodesic (WGS84) ;
+    - "equirectangular" : approximation plane locale, valable à l'échelle de Paris
+      (écart supplémentaire < 0,01 % sur quelques kilomètres), environ deux fois plus rapide.
+    """
+    METHODS = ("haversine", "equirectangular")
+
+    def __init__(self, lats: Iterable[float], lons: Iterable[float], method: str = "haversine"):
+        """
+        Args:
+            lats (Iterable[float]): Latitudes des emplacements (degrés).
+            lons (Iterable[float]): Longitudes des emplacements (degrés).
+            method (str): "haversine" ou "equirectangular".
+        """
+        if method not in self.METHODS:
+            raise ValueError(f"Méthode de distance inconnue: {method}")
+        self.method = method
+        self.lat = np.ascontiguousarray(np.radians(np.asarray(lats, dtype=np.float64)))
+        self.lon = np.ascontiguousarray(np.radians(np.asarray(lons, dtype=np.float64)))
+        self.cos_lat = np.cos(self.lat)
+
+    @classmethod
+    def from_emplacements(cls, emplacements: Iterable[Dict], method: str = "haversine") -> Tuple["DistanceEngine", List[Dict]]:
+        """
+        Construit un moteur à partir de documents emplacements.
+        Les emplacements sans coordonnées geo_point_2d sont écartés.
+        Args:
+            emplacements (Iterable[Dict]): Documents emplacements.
+            method (str): Méthode de calcul des distances.
+        Returns:
+            Tuple[DistanceEngine, List[Dict]]: Le moteur et les emplacements retenus, dans l'ordre des tableaux.
+        """
+        kept, lats, lons = [], [], []
+        for emp in emplacements:
+            point = get_coords(emp)
+            if point is None:
+                continue
+            kept.append(emp)
+            lats.append(point[0])
+            lons.append(point[1])
+        return cls(lats, lons, method=method), kept
+
+    def __len__(self):
+        return len(self.lat)
+
+    def distances(self, lat: float, lon: float) -> np.ndarray:
+        """
+        Calcule les distances (en mètres) entre un point et tous les emplacements.
+        Args:
+            lat (float): Latitude du point (degrés).
+            lon (float): Longitude du point (degrés).
+        Returns:
+            np.ndarray: Tableau des distances, aligné sur les emplacements.
+        """
+        return self.distances_many([(lat, lon)])[0]
+
+    def distances_many(self, points: Iterable[Tuple[float, float]]) -> np.ndarray:
+        """
+        Calcule les distances (en mètres) entre plusieurs points et tous les emplacements.
+        Args:
+            points (Iterable[Tuple[float, float]]): Points (latitude, longitude) en degrés.
+        Returns:
+            np.ndarray: Matrice (nb_points, nb_emplacements) des distances.
+        """
+        q = np.radians(np.asarray(list(points), dtype=np.float64).reshape(-1, 2))
+        q_lat, q_lon = q[:, 0:1], q[:, 1:2]
+        dlat = self.lat - q_lat
+        dlon = self.lon - q_lon
+
+        if self.method == "equirectangular":
+            x = dlon * np.cos(np.radians(REFERENCE_LAT))
+            return EARTH_RADIUS_M * np.hypot(x, dlat)
+
+        a = np.sin(dlat / 2) ** 2 + np.cos(q_lat) * self.cos_lat * np.sin(dlon / 2) ** 2
+        return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+    def nearest(self, lat: float, lon: float, radius: float = None, limit: int = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Retourne les indices des emplacements triés par distance croissante.
+        Args:
+            lat (float): Latitude du point (degrés).
+            lon (float): Longitude du point (degrés).
+            radius (float): Rayon maximal en mètres (optionnel).
+            limit (int): Nombre maximal d'indices retournés (optionnel).
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Indices et distances correspondantes.
+        """
+        dist = self.distances(lat, lon)
+        idx = np.flatnonzero(dist <= radius) if radius is not None else np.arange(len(dist))
+        if limit is not None and limit < len(idx):
+            # Sélection partielle avant le tri pour éviter de trier tout le tableau
+            idx = idx[np.argpartition(dist[idx], limit - 1)[:limit]]
+        idx = idx[np.argsort(dist[idx], kind="stable")]
+        return idx, dist[idx]
+
+    def within(self, lat: float, lon: float, radius: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Retourne les emplacements situés à moins de `radius` mètres, triés par distance.
+        Les candidats proches de la frontière (bande de HAVERSINE_TOLERANCE) sont vérifiés
+        avec geodesic : l'ensemble retourné est identique à celui d'un filtre geodesic.
+        Args:
+            lat (float): Latitude du point (degrés).
+            lon (float): Longitude du point (degrés).
+            radius (float): Rayon en mètres.
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Indices et distances correspondantes.
+        """
+        idx, dist = self.nearest(lat, lon, radius * (1 + HAVERSINE_TOLERANCE))
+        border = np.flatnonzero(dist > radius * (1 - HAVERSINE_TOLERANCE))
+        if len(border):
+            keep = np.ones(len(idx), dtype=bool)
+            for pos in border:
+                point = (np.degrees(self.lat[idx[pos]]), np.degrees(self.lon[idx[pos]]))
+                keep[pos] = geodesic((lat, lon), point).meters <= radius
+            idx, dist = idx[keep], dist[keep]
+        return idx, dist
@@ -0,0 +1,293 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import namedtuple
+from typing import Callable, Dict, Iterable, Optional, Tuple
+from geopy.exc import GeopyError
+from .cache import MISSING, TTLCache
+
+GeocodedPoint = namedtuple("GeocodedPoint", ["latitude", "longitude", "source"])
+
+# Abréviations courantes des types de voie, développées avant comparaison
+_ABBREVIATIONS = {
+    "bd": "boulevard", "bld": "boulevard", "boul": "boulevard",
+    "av": "avenue", "ave": "avenue",
+    "pl": "place", "r": "rue", "sq": "square", "imp": "impasse",
+    "fg": "faubourg", "fbg": "faubourg", "st": "saint", "ste": "sainte"
+}
+_POSTCODE = re.compile(r"\b75(0[0-2][0-9]|116)\b")
+_ARRONDISSEMENT = re.compile(r"^(?:paris )?([1-9]|1[0-9]|20) ?(?:e|er|eme|ieme)?(?: arrondissement)?(?: paris)?$")
+_TRAILING_NOISE = re.compile(r"(?:(?:^| )(?:paris|france|75(?:0[0-2][0-9]|116)))+$")
+
+
+def normalize_address(text: str) -> str:
+    """
+    Normalise une adresse pour servir de clé de cache.
+    Minuscules, accents et ponctuation retirés, abréviations de voie développées,
+    espaces multiples réduits.
+    Args:
+        text (str): Adresse saisie par l'utilisateur.
+    Returns:
+        str: Adresse normalisée.
+    """
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    words = re.sub(r"[^a-z0-9]+", " ", text).split()
+    return " ".join(_ABBREVIATIONS.get(word, word) for word in words)
+
+
+def postcode_to_arrondissement(postcode: str) -> int:
+    """Convertit un code postal parisien (75001-75020, 75116) en numéro d'arrondissement."""
+    return 16 if postcode == "75116" else int(postcode[-2:])
+
+
+class Gazetteer:
+    """Résolution hors ligne des arrondissements, codes postaux et noms de voie parisiens.
+    Les centroïdes sont calculés à partir des emplacements déjà chargés dans MongoDB
+    (moyenne des coordonnées par arrondissement, par voie et par couple voie/arrondissement).
+    """
+    def __init__(self, rows: Iterable[Dict]):
+        """
+        Args:
+            rows (Iterable[Dict]): Agrégats {"nomvoie", "arrond", "lat", "lon", "count"}.
+        """
+        arrond_sums: Dict[int, list] = {}
+        street_sums: Dict[str, list] = {}
+        street_arrond_sums: Dict[Tuple[str, int], list] = {}
+        for row in rows:
+            if row.get("lat") is None or row.get("lon") is None:
+                continue
+            count = row.get("count", 1)
+            street = normalize_address(row.get("nomvoie") or "")
+            arrond = row.get("arrond")
+            targets = []
+            if arrond:
+                targets.append(arrond_sums.setdefault(arrond, [0.0, 0.0, 0]))
+            if street:
+                targets.append(street_sums.setdefault(street, [0.0, 0.0, 0]))
+                if arrond:
+                    targets.append(street_arrond_sums.setdefault((street, arrond), [0.0, 0.0, 0]))
+            for sums in targets:
+                sums[0] += row["lat"] * count
+                sums[1] += row["lon"] * count
+                sums[2] += count
+
+        centroid = lambda sums: (sums[0] / sums[2], sums[1] / sums[2])
+        self.arrondissements = {k: centroid(v) for k, v in arrond_sums.items()}
+        self.streets = {k: centroid(v) for k, v in street_sums.items()}
+        self.streets_by_arrond = {k: centroid(v) for k, v in street_arrond_sums.items()}
+
+    def lookup(self, key: str) -> Optional[Tuple[float, float]]:
+        """
+        Résout une adresse normalisée sans appel réseau.
+        Sont reconnus : un arrondissement ("15", "paris 15e", "15eme arrondissement"),
+        un code postal seul ("75015") et un nom de voie sans numéro, éventuellement
+        suivi du code postal ou de "paris".
+        Args:
+            key (str): Adresse normalisée (voir normalize_address).
+        Returns:
+            Optional[Tuple[float, float]]: Coordonnées (latitude, longitude) ou None.
+        """
+        match = _ARRONDISSEMENT.match(key)
+        if match:
+            return self.arrondissements.get(int(match.group(1)))
+
+        postcode = _POSTCODE.search(key)
+        street = _TRAILING_NOISE.sub("", key).strip()
+        if not street:
+            return self.arrondissements.get(postcode_to_arrondissement(postcode.group(0))) if postcode else None
+
+        # Une adresse avec numéro demande une précision que le centroïde de la voie n'a pas
+        if street[0].isdigit():
+            return None
+        if postcode:
+            point = self.streets_by_arrond.get((street, postcode_to_arrondissement(postcode.group(0))))
+            if point:
+                return point
+        return self.streets.get(street)
+
+
+class GeocodeStore:
+    """Stockage persistant (SQLite) des résultats de géocodage, partagé entre redémarrages.
+    La connexion (et le répertoire du fichier) n'est ouverte qu'à la première utilisation,
+    dans le processus qui l'utilise : le service est construit à l'import, avant le fork
+    des workers, et une connexion SQLite ne doit pas être partagée entre processus. Un
+    processus enfant abandonne la connexion et le verrou hérités et ouvre les siens.
+    """
+    def __init__(self, path: str, ttl: Optional[float] = None):
+        """
+        Args:
+            path (str): Chemin du fichier SQLite.
+            ttl (Optional[float]): Durée de validité d'une entrée en secondes (None : illimitée).
+        """
+        self.path = path
+        self.ttl = ttl
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+
+    def _check_fork(self):
+        # Processus enfant : la connexion et le verrou du parent ne sont ni fermés ni réutilisés
+        if self._pid != os.getpid():
+            self._lock = threading.Lock()
+            self._conn = None
+            self._pid = os.getpid()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Connexion du processus courant, ouverte au premier appel (appelé sous verrou)."""
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS geocode ("
+                "key TEXT PRIMARY KEY, latitude REAL, longitude REAL, created_at REAL)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def get(self, key: str) -> Optional[Tuple[float, float]]:
+        """Retourne les coordonnées enregistrées pour une clé, ou None si absentes ou expirées."""
+        self._check_fork()
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT latitude, longitude, created_at FROM geocode WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or (self.ttl is not None and row[2] + self.ttl < time.time()):
+            return None
+        return row[0], row[1]
+
+    def set(self, key: str, point: Tuple[float, float]):
+        """Enregistre les coordonnées associées à une clé."""
+        self._check_fork()
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO geocode (key, latitude, longitude, created_at) VALUES (?, ?, ?, ?)",
+                (key, point[0], point[1], time.time())
+            )
+            conn.commit()
+
+    def close(self):
+        """Ferme la connexion ouverte par ce processus, s'il y en a une."""
+        self._check_fork()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class Geocoder:
+    """Géocodage d'adresses avec plusieurs niveaux de cache devant Nominatim.
+    Ordre de résolution : cache mémoire LRU/TTL, gazetteer hors ligne, stockage SQLite,
+    puis appel réseau au géolocalisateur. Les résultats réseau alimentent le stockage
+    persistant et le cache mémoire ; les adresses introuvables ne sont gardées qu'en mémoire.
+    """
+    def __init__(self, geolocator, gazetteer_loader: Callable[[], Gazetteer] = None, store: GeocodeStore = None,
+                 cache_size: int = 1024, ttl: Optional[float] = 86400):
+        """
+        Args:
+            geolocator: Géolocalisateur geopy (Nominatim).
+            gazetteer_loader (Callable[[], Gazetteer]): Fonction construisant le gazetteer (appelée au premier besoin).
+            store (GeocodeStore): Stockage persistant (optionnel).
+            cache_size (int): Taille du cache mémoire.
+            ttl (Optional[float]): Durée de vie des entrées du cache mémoire en secondes.
+        """
+        self.geolocator = geolocator
+        self.store = store
+        self.cache = TTLCache(maxsize=cache_size, ttl=ttl)
+        self._gazetteer_loader = gazetteer_loader
+        self._gazetteer: Optional[Gazetteer] = None
+        self._lock = threading.Lock()
+        self.counters = {"gazetteer_hits": 0, "disk_hits": 0, "network_calls": 0, "network_errors": 0, "not_found": 0}
+
+    @property
+    def gazetteer(self) -> Optional[Gazetteer]:
+        if self._gazetteer is None and self._gazetteer_loader is not None:
+            with self._lock:
+                if self._gazetteer is None:
+                    self._gazetteer = self._gazetteer_loader()
+        return self._gazetteer
+
+    def refresh_gazetteer(self):
+        """Reconstruit le gazetteer (après un chargement ETL) et vide le cache mémoire."""
+        gazetteer = self._gazetteer_loader() if self._gazetteer_loader is not None else None
+        with self._lock:
+            self._gazetteer = gazetteer
+        self.cache.clear()
+
+    def invalidate(self):
+        """Oublie le gazetteer (reconstruit au prochain besoin) et vide le cache mémoire."""
+        with self._lock:
+            self._gazetteer = None
+        self.cache.clear()
+
+    def geocode(self, address: str) -> Optional[GeocodedPoint]:
+        """
+        Géocode une adresse.
+        Args:
+            address (str): Adresse ou code postal saisi par l'utilisateur.
+        Returns:
+            Optional[GeocodedPoint]: Coordonnées et origine du résultat, ou None si introuvable.
+        """
+        key = normalize_address(address)
+        if not key:
+            return None
+
+        cached = self.cache.get(key)
+        if cached is not MISSING:
+            return cached
+
+        point = self._resolve(address, key)
+        if point is MISSING:
+            # Erreur réseau : on ne garde pas le résultat pour réessayer à la prochaine demande
+            return None
+        self.cache.set(key, point)
+        return point
+
+    def _resolve(self, address: str, key: str):
+        gazetteer = self.gazetteer
+        if gazetteer is not None:
+            coords = gazetteer.lookup(key)
+            if coords:
+                self.counters["gazetteer_hits"] += 1
+                return GeocodedPoint(coords[0], coords[1], "gazetteer")
+
+        if self.store is not None:
+            coords = self.store.get(key)
+            if coords:
+                self.counters["disk_hits"] += 1
+                return GeocodedPoint(coords[0], coords[1], "disk")
+
+        self.counters["network_calls"] += 1
+        try:
+            location = self.geolocator.geocode(address)
+        except GeopyError as e:
+            self.counters["network_errors"] += 1
+            print(f"Erreur lors du géocodage de '{address}': {e}")
+            return MISSING
+
+        if not location:
+            self.counters["not_found"] += 1
+            return None
+
+        if self.store is not None:
+            self.store.set(key, (location.latitude, location.longitude))
+        return GeocodedPoint(location.latitude, location.longitude, "network")
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns:
+            Dict[str, int]: Compteurs du cache mémoire et des différents niveaux de résolution.
+        """
+        memory = self.cache.stats()
+        return {
+            "memory_hits": memory["hits"],
+            "memory_misses": memory["misses"],
+            "memory_size": memory["size"],
+            **self.counters
+        }
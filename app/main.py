@@ -1,11 +1,35 @@
-from flask import Flask, render_template, request, jsonify
-from .map import ParkingService
+from flask import Flask, Response, abort, render_template, request, jsonify, stream_with_context, url_for
+from . import responses
+from .cache import CompressedBody, compress_body
+from .map import COLOR_MAP, ParkingService, read_filters
+from .neo4j_queries import Neo4jQueries
 from config import *
 
 app = Flask(__name__)
 app.secret_key = "paris_parking_secret_key"
 
 parking_service = ParkingService()
+neo4j_queries = Neo4jQueries()
+
+def filter_choices() -> dict:
+    """
+    Valeurs proposées dans les listes déroulantes du formulaire, lues depuis le cache des facettes.
+    Returns:
+        dict: Variables de template (arrondissements, types_reglement, types_station, zones).
+    """
+    return responses.filter_choices(parking_service.get_facets())
+
+def compressed_response(entry: CompressedBody) -> Response:
+    """
+    Sert une réponse mise en cache compressée : telle quelle (Content-Encoding: gzip) si le client
+    accepte gzip, décompressée sinon. L'ETag permet une réponse 304 aux requêtes GET conditionnelles.
+    Args:
+        entry (CompressedBody): Réponse compressée.
+    Returns:
+        Response: Réponse Flask.
+    """
+    response = responses.compressed_response(Response, entry, request.accept_encodings["gzip"])
+    return response.make_conditional(request)
 
 @app.route("/")
 def index():
@@ -17,16 +41,7 @@ def index():
     Returns:
         Rendered HTML template for the index page.
     """
-    arrondissements = list(range(1, 21))
-    types_reglement = parking_service.get_unique_values("regpri")
-    types_station = parking_service.get_unique_values("typsta")
-    zones = parking_service.get_unique_values("zoneres")
-
-    return render_template("index.html",
-                         arrondissements=arrondissements,
-                         types_reglement=types_reglement,
-                         types_station=types_station,
-                         zones=zones)
+    return render_template("index.html", **filter_choices())
 
 @app.route("/search", methods=["POST"])
 def search():
@@ -36,76 +51,155 @@ def search():
     MongoDB pour récupérer les emplacements de stationnement correspondants, et crée une carte
     avec les résultats. Elle utilise la classe ParkingService pour gérer les opérations de recherche
     et de création de carte.
+    La page rendue est conservée compressée dans le cache des réponses : une recherche
+    identique est servie sans requête ni rendu.
     Args:
         request (Flask Request): La requête contenant les données du formulaire de recherche.
     Returns:
         Rendered HTML template for the index page with search results.
     """
-    # Récupération des filtres depuis le formulaire
-    filters = {
-        "arrondissement": request.form.get("arrondissement"),
-        "regpri": request.form.get("regpri"),
-        "typsta": request.form.get("typsta"),
-        "zoneres": request.form.get("zoneres"),
-        "nomvoie": request.form.get("nomvoie"),
-        "address": request.form.get("address")
-    }
-
-    # Filtrer les valeurs vides pour éviter les requêtes inutiles
-    filters = {k: v for k, v in filters.items() if v}
-    results = parking_service.search_emplacements(filters)
-
-    # Si aucun résultat n'est trouvé, on utilise Paris comme centre par défaut
-    center = [48.8566, 2.3522]
-    if results and results[0].get("geo_point_2d"):
-        geo = results[0]["geo_point_2d"]
-        if "lat" in geo and "lon" in geo:
-            center = [geo["lat"], geo["lon"]]
-
-    # Création de la carte avec les résultats
-    parking_service.create_map(results, center)
+    # Récupération des filtres depuis le formulaire (les valeurs vides sont ignorées)
+    filters = read_filters(request.form)
+    # Curseur de page (bouton "Page suivante")
+    after = request.form.get("after") or None
+    key = parking_service.map_key(filters, SEARCH_PAGE_SIZE, after)
+    # La page mise en cache référence /map/<key> : la carte doit rester reconstructible
+    if MAP_RENDERER == "folium":
+        parking_service.remember_search_map(key, filters, after)
+    return compressed_response(parking_service.get_or_create_response(
+        ("search", key), lambda: compress_body(render_search(filters, after, key), "text/html")))
+
+def render_search(filters: dict, after: str = None, key: str = None) -> str:
+    """
+    Effectue une recherche et rend la page de résultats.
+    Args:
+        filters (dict): Filtres saisis dans le formulaire.
+        after (str): Curseur de la page demandée (un curseur invalide ramène à la première page).
+        key (str): Clé de la page, qui identifie sa carte (/map/<key>).
+    Returns:
+        str: HTML de la page.
+    """
+    normalized, results, next_cursor, after = parking_service.cached_search_page_or_first(
+        filters, SEARCH_PAGE_SIZE, after)
+
+    # Création de la carte avec les résultats (réutilisée pour une recherche identique).
+    # En mode geojson, la carte charge elle-même les résultats depuis /api/emplacements.
+    if MAP_RENDERER == "folium":
+        parking_service.page_map(normalized, results, after)
 
     return render_template("index.html",
-                         results=results,
-                         nb_results=len(results),
-                         filters=filters,
-                         arrondissements=list(range(1, 21)),
-                         types_reglement=parking_service.get_unique_values("regpri"),
-                         types_station=parking_service.get_unique_values("typsta"),
-                         zones=parking_service.get_unique_values("zoneres"))
+                           **responses.search_context(filters, after, key, results, next_cursor),
+                           **filter_choices())
 
 @app.route("/api/zones/<int:arrondissement>")
 def get_zones_by_arrondissement(arrondissement):
     """
     Récupère les zones de règlement pour un arrondissement spécifique.
-    Cette route API interroge la base de données Neo4j pour obtenir les zones de règlement
-    associées à un arrondissement donné. Elle renvoie les résultats sous forme de liste JSON.
+    Les zones des 20 arrondissements sont précalculées en une seule requête Neo4j et servies
+    depuis la mémoire, avec ETag et Cache-Control. Elles ne sont rechargées que lorsque
+    le chargement du graphe publie une nouvelle version.
     Args:
         arrondissement (int): Le numéro de l'arrondissement pour lequel récupérer les zones.
     Returns:
         JSON: Liste des zones de règlement pour l'arrondissement spécifié.
     """
-    # Vérification que l'arrondissement est valide
-    query = """
-    MATCH (a:Arrondissement {number: $arrond})<-[:APPARTIENT_A]-(z:Zone)
-    RETURN z.name as zone
+    body, etag = neo4j_queries.get_zones_response(arrondissement, parking_service.get_data_version("neo4j"))
+    response = Response(body, mimetype="application/json")
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = ZONES_MAX_AGE
+    return response.make_conditional(request)
+
+@app.route("/api/emplacements")
+def api_emplacements():
     """
-    with parking_service.neo4j_driver.session() as session:
-        result = session.run(query, arrond=arrondissement)
-        zones = [record["zone"] for record in result]
-    return jsonify(zones)
+    Recherche des emplacements et renvoie les résultats en GeoJSON compact.
+    Accepte les mêmes filtres que le formulaire de recherche, en query string.
+    Seules les coordonnées et les attributs regpri/typsta/placal sont transmis.
+    Pagination par curseur : `limit` (500 par défaut, de 1 à 5000) et `after`, le curseur
+    `next` de la page précédente (également fourni dans l'en-tête Link).
+    La réponse est mise en cache compressée, avec ETag.
+    Returns:
+        GeoJSON: FeatureCollection des emplacements trouvés.
+    """
+    filters = read_filters(request.args)
+    limit = responses.read_limit(request.args)
+    after = request.args.get("after")
+
+    def render() -> CompressedBody:
+        try:
+            _, results, next_cursor = parking_service.cached_search_page(filters, limit, after)
+        except ValueError as e:
+            abort(400, str(e))
+        next_url = url_for("api_emplacements", limit=limit, after=next_cursor, **filters) if next_cursor else None
+        return responses.geojson_body(parking_service.to_geojson(results), next_cursor, next_url)
+
+    key = ("geojson", parking_service.map_key(filters, limit, after))
+    return compressed_response(parking_service.get_or_create_response(key, render))
+
+@app.route("/api/emplacements.ndjson")
+def api_emplacements_ndjson():
+    """
+    Recherche des emplacements et diffuse tous les résultats en NDJSON (un document par ligne).
+    Accepte les mêmes filtres que /api/emplacements, ainsi qu'un curseur `after` de départ.
+    Les résultats sont lus et envoyés page par page : le premier emplacement part
+    sans attendre la fin de la recherche et la mémoire reste bornée.
+    Returns:
+        NDJSON: Emplacements trouvés (voir Emplacement.to_dict).
+    """
+    filters = read_filters(request.args)
+    after = request.args.get("after")
+    try:
+        emplacements = parking_service.iter_emplacements(filters, after)
+        first = next(emplacements, None)
+    except ValueError as e:
+        abort(400, str(e))
+
+    def generate():
+        if first is None:
+            return
+        yield responses.ndjson_line(first)
+        for emp in emplacements:
+            yield responses.ndjson_line(emp)
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+@app.route("/light-map")
+def show_light_map():
+    """
+    Affiche une carte Leaflet qui charge les résultats depuis /api/emplacements.
+    Les marqueurs et popups sont construits par le navigateur à partir du GeoJSON.
+    Returns:
+        Rendered HTML template for the lightweight map page.
+    """
+    return render_template("light_map.html", color_map=COLOR_MAP, page_size=SEARCH_PAGE_SIZE)
+
+@app.route("/api/geocoding/stats")
+def geocoding_stats():
+    """
+    Expose les compteurs du cache de géocodage (succès mémoire, gazetteer, disque, appels réseau).
+    Returns:
+        JSON: Compteurs du géocodeur.
+    """
+    return jsonify(parking_service.geocoder.stats())
 
 @app.route("/map")
-def show_map():
+@app.route("/map/<key>")
+def show_map(key=None):
     """
     Affiche la carte des emplacements de stationnement.
-    Cette route génère une carte interactive avec les emplacements de stationnement
-    disponibles dans la base de données. Elle utilise la classe ParkingService pour créer
-    la carte et l'enregistrer dans un fichier HTML.
+    Cette route sert depuis le cache mémoire la carte générée pour une recherche,
+    identifiée par sa clé, et la reconstruit si elle a été évincée. Sans clé connue,
+    la carte par défaut centrée sur Paris est renvoyée.
+    Args:
+        key (str): Clé de la carte générée par la recherche.
     Returns:
-        Rendered HTML template for the map page.
+        HTML de la carte.
     """
-    return render_template("map.html")
+    return Response(parking_service.get_map(key), mimetype="text/html")
 
 if __name__ == "__main__":
+    # Construction de l'index spatial au démarrage plutôt qu'à la première recherche
+    parking_service.refresh_spatial_index()
+    neo4j_queries.load_zones(parking_service.get_data_version("neo4j"))
     app.run(host=FLASK_HOST, port=FLASK_PORT, debug=FLASK_DEBUG)
@@ -1,25 +1,230 @@
-from pymongo import MongoClient
+import base64
+import hashlib
+import json
+import math
+import re
+import threading
+from typing import List, Optional
 import folium
 from folium.plugins import MarkerCluster
-from neo4j import GraphDatabase
 from geopy.geocoders import Nominatim
-from geopy.distance import geodesic
 from config import *
+from etl.cleaning import normalize_text
+from .connections import ConnectionRegistry, registry
+from .distance import DistanceEngine
+from .geocoding import Gazetteer, GeocodeStore, Geocoder, normalize_address
+from .cache import MISSING, TTLCache
+from .records import Emplacement
+from .snapshot import SnapshotHolder
+from .spatial_index import EARTH_RADIUS_M, SpatialIndexHolder, geohash, geohash_center
 
 
 # Initialisation du géolocalisateur
 geolocator = Nominatim(user_agent="paris_parking_app")
 
+# Couleur des marqueurs selon le type de règlement
+COLOR_MAP = {
+    "PAYANT": "red",
+    "GIG/GIC": "blue",
+    "2 ROUES": "green",
+    "LIVRAISON": "orange",
+    "AUTOLIB": "purple",
+    "TAXI": "yellow"
+}
+
+# Champs proposés comme filtres dans le formulaire de recherche
+FACET_FIELDS = ("regpri", "typsta", "zoneres")
+
+# Champs de recherche du formulaire et des API
+FILTER_FIELDS = ("arrondissement", "regpri", "typsta", "zoneres", "nomvoie", "address")
+
+# Attributs transmis au client dans la réponse GeoJSON
+GEOJSON_PROPERTIES = ("regpri", "typsta", "placal")
+
+# Champs lus pour une recherche : ceux d'Emplacement (carte, GeoJSON et clé de pagination _key)
+SEARCH_PROJECTION = {
+    "_id": 0, "_key": 1, "geo_point_2d": 1, "regpri": 1, "typsta": 1, "nomvoie": 1,
+    "arrond": 1, "zoneres": 1, "placal": 1, "surface_calculee": 1
+}
+
+
+# Agrégation unique des valeurs de facette et de leurs effectifs
+FACETS_PIPELINE = [{"$facet": {
+    field: [
+        {"$match": {field: {"$nin": [None, ""]}}},
+        {"$group": {"_id": f"${field}", "count": {"$sum": 1}}},
+        {"$sort": {"_id": 1}}
+    ]
+    for field in FACET_FIELDS
+}}]
+
+
+def facets_from_result(result: dict) -> dict:
+    """
+    Met en forme le résultat de FACETS_PIPELINE.
+    Args:
+        result (dict): Document produit par l'étape $facet.
+    Returns:
+        Dict[str, List[Dict]]: Pour chaque champ, liste triée de {"value": ..., "count": ...}.
+    """
+    return {
+        field: [{"value": row["_id"], "count": row["count"]} for row in result.get(field, [])]
+        for field in FACET_FIELDS
+    }
+
+
+def read_filters(source) -> dict:
+    """
+    Extrait les filtres de recherche non vides d'un formulaire ou d'une query string.
+    Args:
+        source (MultiDict): request.form ou request.args.
+    Returns:
+        dict: Filtres de recherche renseignés.
+    """
+    return {field: source.get(field) for field in FILTER_FIELDS if source.get(field)}
+
+
+def encode_cursor(values: list) -> str:
+    """
+    Encode la position du dernier résultat d'une page en curseur opaque (paramètre `after`).
+    Args:
+        values (list): Clé de tri du dernier résultat ([_key] ou [distance, _key]).
+    Returns:
+        str: Curseur base64 utilisable dans une URL.
+    """
+    payload = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str) -> list:
+    """
+    Décode un curseur produit par encode_cursor.
+    Args:
+        token (str): Curseur reçu dans le paramètre `after`.
+    Returns:
+        list: Clé de tri du dernier résultat de la page précédente.
+    Raises:
+        ValueError: Si le curseur est invalide.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Curseur invalide: {token}") from e
+    if not isinstance(values, list) or not values or not isinstance(values[-1], str):
+        raise ValueError(f"Curseur invalide: {token}")
+    return values
+
 class ParkingService:
     """Service for managing parking data and operations.
     Cette classe fournit des méthodes pour rechercher des emplacements de stationnement,
     filtrer par proximité, créer des cartes et obtenir des valeurs uniques pour certains champs.
     """
-    def __init__(self):
-        """Initialise le service avec les connexions à la base de données MongoDB et Neo4j."""
-        self.mongo_client = MongoClient(MONGO_URI)
-        self.db = self.mongo_client[DB_NAME]
-        self.neo4j_driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD), database=NEO4J_DATABASE)
+    def __init__(self, connections: ConnectionRegistry = registry):
+        """
+        Initialise le service. Les connexions MongoDB et Neo4j sont celles du registre partagé,
+        ouvertes à la première requête.
+        Args:
+            connections (ConnectionRegistry): Registre des connexions (registre de l'application par défaut).
+        """
+        self.connections = connections
+        self.spatial_index = SpatialIndexHolder(self._load_indexed_emplacements, cell_size=SPATIAL_INDEX_CELL_SIZE)
+        self.snapshot = SnapshotHolder(SNAPSHOT_DIR)
+        self.geocoder = Geocoder(
+            geolocator,
+            gazetteer_loader=self._load_gazetteer,
+            store=GeocodeStore(GEOCODE_DB_PATH, ttl=GEOCODE_DISK_TTL),
+            cache_size=GEOCODE_CACHE_SIZE,
+            ttl=GEOCODE_CACHE_TTL
+        )
+        self.map_cache = TTLCache(maxsize=MAP_CACHE_SIZE, ttl=MAP_CACHE_TTL)
+        # Pages de résultats par filtres normalisés, et réponses compressées par paramètres bruts
+        self.search_cache = TTLCache(maxsize=SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TTL)
+        self.response_cache = TTLCache(maxsize=SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TTL)
+        # Paramètres des cartes référencées par les pages de recherche (mêmes taille et durée de vie
+        # que les réponses), de quoi reconstruire une carte évincée de map_cache
+        self.map_requests = TTLCache(maxsize=SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TTL)
+        # Versions publiées par l'ETL, relues au plus toutes les DATA_VERSION_CHECK_INTERVAL secondes
+        self.version_cache = TTLCache(maxsize=8, ttl=DATA_VERSION_CHECK_INTERVAL)
+        self._data_version = MISSING
+        self._version_lock = threading.Lock()
+        self._facets = None
+
+    @property
+    def mongo_client(self):
+        return self.connections.mongo_client
+
+    @property
+    def db(self):
+        return self.connections.db
+
+    @property
+    def neo4j_driver(self):
+        return self.connections.neo4j_driver
+
+    def get_data_version(self, source: str = "mongo"):
+        """
+        Retourne la version des données publiée par le dernier chargement ETL.
+        Args:
+            source (str): "mongo" ou "neo4j".
+        Returns:
+            Optional[str]: Identifiant de version, ou None si aucun chargement n'a été publié.
+        """
+        version = self.version_cache.get(source)
+        if version is MISSING:
+            doc = self.db[COLLECTION_METADATA].find_one({"_id": source}, {"version": 1})
+            version = doc.get("version") if doc else None
+            self.version_cache.set(source, version)
+        return version
+
+    def sync_data_version(self):
+        """
+        Invalide les caches dérivés des données MongoDB lorsque l'ETL a publié une nouvelle version :
+        facettes, cartes rendues, index spatial et gazetteer sont reconstruits au prochain besoin.
+        Returns:
+            Optional[str]: Version courante des données.
+        """
+        version = self.get_data_version("mongo")
+        if version != self._data_version:
+            with self._version_lock:
+                if version != self._data_version:
+                    if self._data_version is not MISSING:
+                        print(f"🔄 Nouvelle version des données: {version}")
+                        self.map_cache.clear()
+                        self.search_cache.clear()
+                        self.response_cache.clear()
+                        self.spatial_index.invalidate()
+                        self.geocoder.invalidate()
+                    self._facets = None
+                    self._data_version = version
+        return version
+
+    def _load_indexed_emplacements(self):
+        """Charge les emplacements géolocalisés à placer dans l'index spatial."""
+        return Emplacement.from_cursor(
+            self.db[COLLECTION_EMPLACEMENTS].find({"geo_point_2d": {"$ne": None}}, SEARCH_PROJECTION))
+
+    def _load_gazetteer(self):
+        """Construit le gazetteer hors ligne à partir des centroïdes des voies et arrondissements."""
+        pipeline = [
+            {"$match": {"geo_point_2d.lat": {"$ne": None}, "geo_point_2d.lon": {"$ne": None}}},
+            {"$group": {
+                "_id": {"nomvoie": "$nomvoie", "arrond": "$arrond"},
+                "lat": {"$avg": "$geo_point_2d.lat"},
+                "lon": {"$avg": "$geo_point_2d.lon"},
+                "count": {"$sum": 1}
+            }}
+        ]
+        rows = self.db[COLLECTION_EMPLACEMENTS].aggregate(pipeline)
+        return Gazetteer(dict(row["_id"], lat=row["lat"], lon=row["lon"], count=row["count"]) for row in rows)
+
+    def refresh_spatial_index(self):
+        """
+        Reconstruit l'index spatial en mémoire.
+        À appeler au démarrage ou après un chargement ETL pour prendre en compte les nouvelles données.
+        Returns:
+            int: Nombre d'emplacements indexés.
+        """
+        return len(self.spatial_index.refresh())
 
     def search_emplacements(self, filters: dict, limit: int = 500):
         """Recherche des emplacements de stationnement en fonction des filtres fournis.
@@ -27,55 +232,431 @@ class ParkingService:
             filters (dict): Dictionnaire contenant les filtres de recherche.
             limit (int): Nombre maximum d'emplacements à retourner.
         Returns:
-            List[Dict]: Liste des emplacements de stationnement correspondant aux filtres.
+            List[Emplacement]: Liste des emplacements de stationnement correspondant aux filtres.
         """
+        return self.search_page(filters, limit)[0]
+
+    def normalize_filters(self, filters: dict, location=MISSING) -> dict:
+        """
+        Met les filtres de recherche sous forme canonique, pour servir de clé de cache.
+        Les textes sont normalisés comme par build_query ; une adresse géocodée est remplacée
+        par le geohash de son point (SEARCH_CACHE_GEOHASH_PRECISION), de sorte que les adresses
+        d'une même cellule partagent leurs résultats, calculés depuis le centre de la cellule.
+        C'est une approximation : à la précision 7 (cellules d'environ 100 m × 150 m à Paris), le
+        centre est jusqu'à ~90 m du point géocodé. Les résultats retenus (rayon PROXIMITY_RADIUS)
+        et leur ordre sont ceux du centre ; cached_search_page recalcule ensuite les distances
+        affichées depuis le point géocodé (voir exact_distances).
+        Args:
+            filters (dict): Filtres de recherche saisis.
+            location (Optional[GeocodedPoint]): Résultat du géocodage de l'adresse, s'il est déjà connu.
+        Returns:
+            dict: Filtres normalisés, utilisables par search_page.
+        """
+        normalized = {}
+        if filters.get("arrondissement"):
+            normalized["arrondissement"] = str(int(filters["arrondissement"]))
+        for field in ("regpri", "typsta", "nomvoie"):
+            if filters.get(field) and normalize_text(filters[field]):
+                normalized[field] = normalize_text(filters[field])
+        if filters.get("zoneres") and filters["zoneres"].strip():
+            normalized["zoneres"] = filters["zoneres"].strip()
         if filters.get("address"):
-            location = geolocator.geocode(filters["address"])
+            if location is MISSING:
+                location = self.geocoder.geocode(filters["address"])
             if location:
-                user_coords = (location.latitude, location.longitude)
-                # Recherche tous les emplacements
-                emplacements = list(self.db[COLLECTION_EMPLACEMENTS].find({}))
-                # Filtre par proximité
-                return self.filter_by_proximity(emplacements, user_coords, radius=500)
+                normalized["geohash"] = geohash(location.latitude, location.longitude, SEARCH_CACHE_GEOHASH_PRECISION)
             else:
-                return []
-        else:
-            query = {}
+                normalized["address"] = normalize_address(filters["address"])
+        return normalized
+
+    def locate(self, filters: dict):
+        """
+        Retourne le point d'une recherche par adresse (geohash des filtres normalisés ou adresse à géocoder).
+        Args:
+            filters (dict): Filtres de recherche.
+        Returns:
+            Optional[Tuple[float, float]]: Coordonnées (latitude, longitude), ou None si l'adresse est introuvable.
+        """
+        if filters.get("geohash"):
+            return geohash_center(filters["geohash"])
+        location = self.geocoder.geocode(filters["address"])
+        return (location.latitude, location.longitude) if location else None
+
+    def cached_search_page(self, filters: dict, limit: int = SEARCH_PAGE_SIZE, after: str = None):
+        """
+        search_page servie par le cache des résultats, indexé par les filtres normalisés.
+        Le cache est borné (SEARCH_CACHE_SIZE), expire après SEARCH_CACHE_TTL secondes et est
+        vidé à la publication d'une nouvelle version des données.
+        Args:
+            filters (dict): Filtres de recherche saisis.
+            limit (int): Nombre maximum d'emplacements de la page.
+            after (str): Curseur retourné avec la page précédente (optionnel).
+        Returns:
+            Tuple[dict, List[Emplacement], Optional[str]]: Filtres normalisés, emplacements de la page
+            (distances depuis l'adresse saisie) et curseur de la page suivante.
+        Raises:
+            ValueError: Si le curseur est invalide.
+        """
+        self.sync_data_version()
+        location = self.geocoder.geocode(filters["address"]) if filters.get("address") else None
+        normalized = self.normalize_filters(filters, location)
+        key = self.map_key(normalized, limit, after)
+        page = self.search_cache.get(key)
+        if page is MISSING:
+            page = self.search_page(normalized, limit, after)
+            self.search_cache.set(key, page)
+        results, next_cursor = page
+        return normalized, self.exact_distances(results, location), next_cursor
+
+    @staticmethod
+    def exact_distances(results: List[Emplacement], location) -> List[Emplacement]:
+        """
+        Distances d'une page de recherche par adresse, recalculées depuis le point géocodé
+        plutôt que depuis le centre de sa cellule geohash (voir normalize_filters).
+        Les curseurs de pagination restent ceux de la page en cache, calculés depuis le centre.
+        Args:
+            results (List[Emplacement]): Emplacements de la page en cache.
+            location (Optional[GeocodedPoint]): Point géocodé de l'adresse saisie (None : pas d'adresse).
+        Returns:
+            List[Emplacement]: Emplacements de la page, avec leur distance à l'adresse.
+        """
+        located = [i for i, emp in enumerate(results) if emp.distance is not None and emp.lat is not None]
+        if location is None or not located:
+            return results
+        engine = DistanceEngine([results[i].lat for i in located], [results[i].lon for i in located])
+        exact = list(results)
+        for i, distance in zip(located, engine.distances(location.latitude, location.longitude).tolist()):
+            exact[i] = results[i]._replace(distance=distance)
+        return exact
+
+    def cached_search_page_or_first(self, filters: dict, limit: int = SEARCH_PAGE_SIZE, after: str = None):
+        """
+        cached_search_page pour l'interface : un curseur invalide ramène à la première page.
+        Returns:
+            Tuple[dict, List[Emplacement], Optional[str], Optional[str]]: Filtres normalisés, emplacements
+            de la page, curseur de la page suivante et curseur de la page effectivement affichée.
+        """
+        try:
+            return self.cached_search_page(filters, limit, after) + (after,)
+        except ValueError:
+            return self.cached_search_page(filters, limit) + (None,)
+
+    def search_page(self, filters: dict, limit: int = SEARCH_PAGE_SIZE, after: str = None):
+        """
+        Retourne une page de résultats de recherche et le curseur de la page suivante.
+        Sans adresse, les résultats sont triés par `_key` (index unique) et la page suivante
+        commence après la dernière clé ; avec une adresse, ils sont triés par distance puis
+        par `_key`. Seuls les champs de SEARCH_PROJECTION sont lus.
+        Lorsque l'instantané colonnaire de la version courante est disponible (SNAPSHOT_DIR),
+        la recherche est servie depuis celui-ci, sans requête MongoDB ; sinon par MongoDB.
+        Args:
+            filters (dict): Dictionnaire contenant les filtres de recherche.
+            limit (int): Nombre maximum d'emplacements de la page.
+            after (str): Curseur retourné avec la page précédente (optionnel).
+        Returns:
+            Tuple[List[Emplacement], Optional[str]]: Emplacements de la page et curseur de la page
+            suivante (None s'il n'y en a pas).
+        Raises:
+            ValueError: Si le curseur est invalide.
+        """
+        snapshot = self.snapshot.get(self.sync_data_version())
+        cursor = decode_cursor(after) if after else None
+        if self.is_near_search(filters):
+            user_coords = self.locate(filters)
+            if user_coords is None:
+                return [], None
+            page = self.local_near_page(snapshot, user_coords, filters, limit, cursor)
+            if page is None:
+                page = self.search_near(user_coords, self.build_query(filters), PROXIMITY_RADIUS, limit, cursor)
+            return page, self.page_cursor(page, limit, by_distance=True)
+
+        page = self.local_page(snapshot, filters, limit, cursor)
+        if page is None:
+            page = Emplacement.from_cursor(self.db[COLLECTION_EMPLACEMENTS].find(
+                self.key_page_query(filters, cursor), SEARCH_PROJECTION).sort("_key", 1).limit(limit))
+        return page, self.page_cursor(page, limit)
+
+    @staticmethod
+    def is_near_search(filters: dict) -> bool:
+        """Indique si la recherche porte sur une position (adresse ou geohash), triée par distance."""
+        return bool(filters.get("address") or filters.get("geohash"))
+
+    def local_near_page(self, snapshot, user_coords, filters: dict, limit: int, cursor: list = None):
+        """
+        Page d'une recherche par position servie sans MongoDB : par l'instantané colonnaire s'il est
+        disponible, sinon par l'index spatial en mémoire (GEO_SEARCH_MODE="memory"), filtres appliqués.
+        Les modes de service synchrone et asynchrone partagent cette sélection.
+        Args:
+            snapshot (Optional[ParkingSnapshot]): Instantané de la version courante.
+            user_coords (tuple): Coordonnées (latitude, longitude) du point de recherche.
+            filters (dict): Filtres de recherche normalisés.
+            limit (int): Nombre maximum d'emplacements de la page.
+            cursor (list): [distance, _key] du dernier résultat de la page précédente (optionnel).
+        Returns:
+            Optional[List[Emplacement]]: Emplacements de la page, ou None si la recherche revient à MongoDB.
+        """
+        if snapshot is not None:
+            return snapshot.near(*user_coords, PROXIMITY_RADIUS, filters, limit, cursor)
+        if GEO_SEARCH_MODE == "memory":
+            # Recherche dans l'index spatial en mémoire (cellules voisines uniquement)
+            nearby = self.spatial_index.get().query_radius(*user_coords, PROXIMITY_RADIUS)
+            matches = self.record_filter(filters)
+            return self.paginate_by_distance([emp._replace(distance=d) for d, emp in nearby if matches(emp)],
+                                             limit, cursor)
+        return None
+
+    @staticmethod
+    def local_page(snapshot, filters: dict, limit: int, cursor: list = None):
+        """
+        Page d'une recherche sans position servie par l'instantané colonnaire, s'il est disponible.
+        Returns:
+            Optional[List[Emplacement]]: Emplacements de la page, ou None si la recherche revient à MongoDB.
+        """
+        if snapshot is None:
+            return None
+        return snapshot.page(filters, limit, cursor[-1] if cursor else None)
+
+    def key_page_query(self, filters: dict, cursor: list = None) -> dict:
+        """
+        Requête MongoDB d'une page sans position, triée par `_key` : filtres puis clé suivant le curseur.
+        Args:
+            filters (dict): Filtres de recherche.
+            cursor (list): [_key] du dernier résultat de la page précédente (optionnel).
+        Returns:
+            dict: Requête MongoDB (à trier par `_key` croissante).
+        """
+        query = self.build_query(filters)
+        query["_key"] = {"$gt": cursor[-1]} if cursor else {"$exists": True}
+        return query
+
+    @staticmethod
+    def page_cursor(page, limit: int, by_distance: bool = False) -> Optional[str]:
+        """
+        Curseur de la page suivante : position du dernier résultat d'une page complète.
+        Args:
+            page (List[Emplacement]): Emplacements de la page.
+            limit (int): Taille de page demandée.
+            by_distance (bool): Page triée par (distance, _key) plutôt que par _key.
+        Returns:
+            Optional[str]: Curseur, ou None si la page est la dernière.
+        """
+        if len(page) < limit or not page:
+            return None
+        last = page[-1]
+        return encode_cursor([last.distance, last.key or ""] if by_distance else [last.key])
+
+    def iter_emplacements(self, filters: dict, after: str = None, batch_size: int = 1000):
+        """
+        Parcourt tous les résultats d'une recherche, page par page (flux NDJSON).
+        Args:
+            filters (dict): Dictionnaire contenant les filtres de recherche.
+            after (str): Curseur de départ (optionnel).
+            batch_size (int): Nombre d'emplacements lus par requête.
+        Returns:
+            Iterator[Emplacement]: Emplacements, dans l'ordre de pagination.
+        """
+        while True:
+            page, after = self.search_page(filters, batch_size, after)
+            yield from page
+            if after is None:
+                return
 
-            if filters.get("arrondissement"):
-                query["arrond"] = int(filters["arrondissement"])
+    @staticmethod
+    def paginate_by_distance(emplacements, limit: int, cursor: list = None):
+        """
+        Trie des emplacements par (distance, _key) et retourne ceux qui suivent le curseur.
+        Args:
+            emplacements (List[Emplacement]): Emplacements dont la distance est renseignée.
+            limit (int): Nombre maximum d'emplacements retournés.
+            cursor (list): [distance, _key] du dernier résultat de la page précédente (optionnel).
+        Returns:
+            List[Emplacement]: Emplacements de la page.
+        """
+        ranked = sorted(emplacements, key=lambda emp: (emp.distance, emp.key or ""))
+        if cursor:
+            position = (cursor[0], cursor[1])
+            ranked = [emp for emp in ranked if (emp.distance, emp.key or "") > position]
+        return ranked[:limit]
+
+    def build_query(self, filters: dict) -> dict:
+        """
+        Construit la requête MongoDB correspondant aux filtres de recherche (hors adresse).
+        Les filtres texte portent sur les champs normalisés écrits par l'ETL : égalité pour les
+        valeurs de facette (regpri, typsta), préfixe ancré et échappé pour le nom de voie,
+        de sorte que chaque critère peut être servi par un index.
+        Args:
+            filters (dict): Dictionnaire contenant les filtres de recherche.
+        Returns:
+            dict: Requête MongoDB.
+        """
+        query = {}
 
-            if filters.get("regpri"):
-                query["regpri"] = {"$regex": filters["regpri"], "$options": "i"}
+        if filters.get("arrondissement"):
+            query["arrond"] = int(filters["arrondissement"])
 
-            if filters.get("typsta"):
-                query["typsta"] = {"$regex": filters["typsta"], "$options": "i"}
+        if filters.get("regpri"):
+            query["regpri_norm"] = normalize_text(filters["regpri"])
+
+        if filters.get("typsta"):
+            query["typsta_norm"] = normalize_text(filters["typsta"])
+
+        if filters.get("zoneres"):
+            query["zoneres"] = filters["zoneres"]
+
+        if filters.get("nomvoie"):
+            street = normalize_text(filters["nomvoie"])
+            if street:
+                # Préfixe d'un des suffixes du nom ("rivoli" trouve "RUE DE RIVOLI")
+                query["nomvoie_words"] = {"$regex": "^" + re.escape(street)}
+
+        return query
+
+    @staticmethod
+    def record_filter(filters: dict):
+        """
+        Équivalent en mémoire de build_query, évalué sur des emplacements (index spatial en mémoire).
+        Args:
+            filters (dict): Dictionnaire contenant les filtres de recherche.
+        Returns:
+            Callable[[Emplacement], bool]: Prédicat vrai pour les emplacements retenus.
+        """
+        conditions = []
+        if filters.get("arrondissement"):
+            arrond = int(filters["arrondissement"])
+            conditions.append(lambda emp: emp.arrond == arrond)
+        for field in ("regpri", "typsta"):
+            if filters.get(field):
+                wanted = normalize_text(filters[field])
+                conditions.append(lambda emp, field=field, wanted=wanted:
+                                  bool(getattr(emp, field)) and normalize_text(getattr(emp, field)) == wanted)
+        if filters.get("zoneres"):
+            conditions.append(lambda emp: emp.zoneres == filters["zoneres"])
+        if filters.get("nomvoie"):
+            street = normalize_text(filters["nomvoie"])
+            if street:
+                # Préfixe d'un des mots du nom, comme nomvoie_words ("rivoli" trouve "RUE DE RIVOLI")
+                conditions.append(lambda emp: bool(emp.nomvoie) and (" " + street) in " " + normalize_text(emp.nomvoie))
+        return lambda emp: all(condition(emp) for condition in conditions)
+
+    def search_near(self, user_coords, query: dict, radius: float, limit: int = 500, cursor: list = None):
+        """
+        Recherche les emplacements proches d'un point via l'index 2dsphere du champ `location`.
+        Les résultats sont triés par distance et portent la distance calculée (en mètres)
+        dans le champ `distance`. Les documents sans `location` sont traités par le
+        filtre de proximité côté client, en complément.
+        Args:
+            user_coords (tuple): Coordonnées (latitude, longitude) du point de recherche.
+            query (dict): Filtres MongoDB additionnels (arrondissement, règlement, ...).
+            radius (float): Rayon de recherche en mètres.
+            limit (int): Nombre maximum d'emplacements à retourner.
+            cursor (list): [distance, _key] du dernier résultat de la page précédente (optionnel).
+        Returns:
+            List[Emplacement]: Liste des emplacements triés par distance croissante.
+        """
+        collection = self.db[COLLECTION_EMPLACEMENTS]
+        documents = collection.aggregate(self.near_pipeline(user_coords, query, radius, limit, cursor))
+        # Repli : documents sans champ location (coordonnées hors emprise ou anciens chargements)
+        fallback_documents = collection.find(self.fallback_query(user_coords, query, radius), SEARCH_PROJECTION)
+        return self.merge_near_results(documents, fallback_documents, user_coords, radius, limit, cursor)
 
-            if filters.get("zoneres"):
-                query["zoneres"] = filters["zoneres"]
+    def merge_near_results(self, documents, fallback_documents, user_coords, radius: float, limit: int,
+                           cursor: list = None) -> List[Emplacement]:
+        """
+        Fusionne les résultats du pipeline $geoNear et ceux de la requête de repli (documents
+        sans `location`, filtrés par proximité côté client), triés par distance.
+        Args:
+            documents (Iterable[Dict]): Documents du pipeline $geoNear (avec leur distance).
+            fallback_documents (Iterable[Dict]): Documents de la requête de repli.
+            user_coords (tuple): Coordonnées (latitude, longitude) du point de recherche.
+            radius (float): Rayon de recherche en mètres.
+            limit (int): Nombre maximum d'emplacements à retourner.
+            cursor (list): [distance, _key] du dernier résultat de la page précédente (optionnel).
+        Returns:
+            List[Emplacement]: Emplacements de la page, triés par distance croissante.
+        """
+        results = Emplacement.from_cursor(documents)
+        fallback = self.filter_by_proximity(fallback_documents, user_coords, radius)
+        if fallback:
+            results = self.paginate_by_distance(results + fallback, limit, cursor)
+        return results
 
-            if filters.get("nomvoie"):
-                query["nomvoie"] = {"$regex": filters["nomvoie"], "$options": "i"}
+    def near_pipeline(self, user_coords, query: dict, radius: float, limit: int = 500, cursor: list = None) -> list:
+        """
+        Pipeline $geoNear de search_near (servi par l'index 2dsphere de `location`).
+        Les résultats sont triés par (distance, _key) ; avec un curseur, la recherche reprend
+        à la distance du dernier résultat (minDistance) et écarte ceux déjà retournés.
+        Args:
+            user_coords (tuple): Coordonnées (latitude, longitude) du point de recherche.
+            query (dict): Filtres MongoDB additionnels.
+            radius (float): Rayon de recherche en mètres.
+            limit (int): Nombre maximum d'emplacements à retourner.
+            cursor (list): [distance, _key] du dernier résultat de la page précédente (optionnel).
+        Returns:
+            list: Étapes du pipeline d'agrégation.
+        """
+        lat, lon = user_coords
+        geo_near = {
+            "near": {"type": "Point", "coordinates": [lon, lat]},
+            "key": "location",
+            "distanceField": "distance",
+            "maxDistance": radius,
+            "spherical": True,
+            "query": query
+        }
+        pipeline = [{"$geoNear": geo_near}]
+        if cursor:
+            distance, key = cursor
+            geo_near["minDistance"] = distance
+            pipeline.append({"$match": {"$or": [{"distance": {"$gt": distance}}, {"_key": {"$gt": key}}]}})
+        pipeline += [
+            {"$sort": {"distance": 1, "_key": 1}},
+            {"$limit": limit},
+            {"$project": dict(SEARCH_PROJECTION, distance=1)}
+        ]
+        return pipeline
 
-            return list(self.db[COLLECTION_EMPLACEMENTS].find(query).limit(limit))
+    def fallback_query(self, user_coords, query: dict, radius: float) -> dict:
+        """
+        Requête des documents sans `location` situés dans le carré englobant le cercle de recherche.
+        Le carré sur geo_point_2d.lat/lon est servi par l'index composé sur ces champs, au lieu
+        d'un parcours de toute la collection à chaque recherche par adresse.
+        Args:
+            user_coords (tuple): Coordonnées (latitude, longitude) du point de recherche.
+            query (dict): Filtres MongoDB additionnels.
+            radius (float): Rayon de recherche en mètres.
+        Returns:
+            dict: Requête MongoDB.
+        """
+        lat, lon = user_coords
+        dlat = math.degrees(radius * 1.01 / EARTH_RADIUS_M)
+        dlon = dlat / max(math.cos(math.radians(lat)), 1e-6)
+        return dict(query, location={"$exists": False},
+                    **{"geo_point_2d.lat": {"$gte": lat - dlat, "$lte": lat + dlat},
+                       "geo_point_2d.lon": {"$gte": lon - dlon, "$lte": lon + dlon}})
 
     def filter_by_proximity(self, emplacements, user_coords, radius=2000):
         """Filtre les emplacements de stationnement par proximité d'un point géographique.
         Args:
-            emplacements (List[Dict]): Liste des emplacements de stationnement.
+            emplacements (Iterable[Union[Dict, Emplacement]]): Documents ou enregistrements emplacements.
             user_coords (tuple): Coordonnées de l'utilisateur sous forme de tuple (latitude, longitude).
             radius (int): Rayon de filtrage en mètres.
         Returns:
-            List[Dict]: Liste des emplacements filtrés par proximité.
+            List[Emplacement]: Liste des emplacements filtrés par proximité, triés par distance.
+        Les distances sont calculées en une passe vectorisée (haversine) ; seuls les
+        emplacements proches de la limite du rayon sont vérifiés avec geodesic.
         """
+        engine, candidates = DistanceEngine.from_emplacements(emplacements)
+        if not candidates:
+            return []
+
         filtered_emplacements = []
-        for emp in emplacements:
-            geo_point = emp.get("geo_point_2d")
-            if geo_point and "lat" in geo_point and "lon" in geo_point:
-                emp_coords = (geo_point["lat"], geo_point["lon"])
-                distance = geodesic(user_coords, emp_coords).meters
-                if distance <= radius:
-                    filtered_emplacements.append(emp)
+        indices, distances = engine.within(user_coords[0], user_coords[1], radius)
+        for i, distance in zip(indices.tolist(), distances.tolist()):
+            emp = candidates[i]
+            if isinstance(emp, Emplacement):
+                filtered_emplacements.append(emp._replace(distance=distance))
+            else:
+                filtered_emplacements.append(Emplacement.from_document(emp, distance))
         return filtered_emplacements
 
     def get_unique_values(self, field: str):
@@ -91,18 +672,36 @@ class ParkingService:
         Exemple d'utilisation:
             unique_regpri = parking_service.get_unique_values("regpri")
             unique_typsta = parking_service.get_unique_values("typsta")
+        Les champs de FACET_FIELDS sont servis depuis le cache des facettes.
         """
+        if field in FACET_FIELDS:
+            return [facet["value"] for facet in self.get_facets()[field]]
         return self.db[COLLECTION_EMPLACEMENTS].distinct(field)
 
+    def get_facets(self) -> dict:
+        """
+        Retourne les valeurs des facettes de recherche (regpri, typsta, zoneres) avec leurs effectifs.
+        Les facettes sont calculées en une seule agrégation ($facet) puis conservées en mémoire
+        jusqu'à la publication d'une nouvelle version des données par l'ETL.
+        Returns:
+            Dict[str, List[Dict]]: Pour chaque champ, liste triée de {"value": ..., "count": ...}.
+        """
+        self.sync_data_version()
+        facets = self._facets
+        if facets is None:
+            result = next(self.db[COLLECTION_EMPLACEMENTS].aggregate(FACETS_PIPELINE), {})
+            facets = self._facets = facets_from_result(result)
+        return facets
+
     def create_map(self, emplacements, center=None, use_clusters=True):
         """
         Crée une carte Folium avec les emplacements de stationnement.
         Args:
-            emplacements (List[Dict]): Liste des emplacements de stationnement à afficher.
+            emplacements (List[Emplacement]): Liste des emplacements de stationnement à afficher.
             center (List[float]): Coordonnées [latitude, longitude] pour centrer la carte.
             use_clusters (bool): Indique si les marqueurs doivent être regroupés en clusters.
         Returns:
-            str: Chemin vers le fichier HTML de la carte générée.
+            str: Code HTML de la carte générée (rendu en mémoire, aucun fichier n'est écrit).
         Cette méthode crée une carte interactive en utilisant la bibliothèque Folium.
         Elle ajoute des marqueurs pour chaque emplacement de stationnement, avec des popups
         contenant des informations détaillées sur chaque emplacement.
@@ -110,8 +709,8 @@ class ParkingService:
         seront regroupés en clusters pour une meilleure visualisation.
         Si `center` n'est pas fourni, la carte sera centrée sur Paris (48.8566, 2.3522).
         Exemple d'utilisation:
-            map_path = parking_service.create_map(emplacements, center=[48.8566, 2.3522], use_clusters=True)
-            return render_template("map.html", map_path=map_path)
+            map_html = parking_service.create_map(emplacements, center=[48.8566, 2.3522], use_clusters=True)
+            return Response(map_html, mimetype="text/html")
         """
         if not center:
             center = [48.8566, 2.3522]
@@ -123,42 +722,165 @@ class ParkingService:
         else:
             marker_cluster = m
 
-        color_map = {
-            "PAYANT": "red",
-            "GIG/GIC": "blue",
-            "2 ROUES": "green",
-            "LIVRAISON": "orange",
-            "AUTOLIB": "purple",
-            "TAXI": "yellow"
-        }
+        color_map = COLOR_MAP
 
         for emp in emplacements:
-            geo_point = emp.get("geo_point_2d")
-            if not geo_point or "lat" not in geo_point or "lon" not in geo_point:
+            if emp.lat is None:
                 continue
 
-            regpri = emp.get("regpri", "AUTRE")
+            regpri = emp.regpri or "AUTRE"
             color = color_map.get(regpri, "gray")
+            nomvoie = emp.nomvoie or "Voie inconnue"
 
             popup_html = f"""
             <div style="font-family: Arial; min-width: 200px;">
-                <h4 style="margin: 0 0 10px 0; color: #2c3e50;">{emp.get('nomvoie', 'Voie inconnue')}</h4>
-                <p><strong>Type:</strong> {emp.get('typsta', 'N/A')}</p>
-                <p><strong>Règlement:</strong> {emp.get('regpri', 'N/A')}</p>
-                <p><strong>Arrondissement:</strong> {emp.get('arrond', 'N/A')}</p>
-                <p><strong>Zone:</strong> {emp.get('zoneres', 'N/A')}</p>
-                <p><strong>Places:</strong> {emp.get('placal', 0)}</p>
-                <p><strong>Surface:</strong> {emp.get('surface_calculee', 0):.1f} m²</p>
+                <h4 style="margin: 0 0 10px 0; color: #2c3e50;">{nomvoie}</h4>
+                <p><strong>Type:</strong> {emp.typsta or 'N/A'}</p>
+                <p><strong>Règlement:</strong> {emp.regpri or 'N/A'}</p>
+                <p><strong>Arrondissement:</strong> {emp.arrond or 'N/A'}</p>
+                <p><strong>Zone:</strong> {emp.zoneres or 'N/A'}</p>
+                <p><strong>Places:</strong> {emp.placal or 0}</p>
+                <p><strong>Surface:</strong> {emp.surface_calculee or 0:.1f} m²</p>
             </div>
             """
 
             folium.Marker(
-                location=[geo_point["lat"], geo_point["lon"]],
+                location=[emp.lat, emp.lon],
                 popup=folium.Popup(popup_html, max_width=300),
                 icon=folium.Icon(color=color, icon="car", prefix="fa"),
-                tooltip=f"{emp.get('nomvoie', 'Voie inconnue')} - {regpri}"
+                tooltip=f"{nomvoie} - {regpri}"
             ).add_to(marker_cluster)
 
-        map_path = "app/templates/map.html"
-        m.save(map_path)
-        return map_path
+        return m.get_root().render()
+
+    def to_geojson(self, emplacements) -> dict:
+        """
+        Convertit des emplacements en FeatureCollection GeoJSON compacte.
+        Seules les coordonnées (arrondies à 6 décimales, ~10 cm) et les attributs
+        regpri/typsta/placal sont transmis ; les popups sont construites côté client.
+        Args:
+            emplacements (List[Emplacement]): Liste des emplacements de stationnement.
+        Returns:
+            dict: FeatureCollection GeoJSON.
+        """
+        features = []
+        for emp in emplacements:
+            if emp.lat is None:
+                continue
+            features.append({
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": [round(emp.lon, 6), round(emp.lat, 6)]},
+                "properties": {field: getattr(emp, field) for field in GEOJSON_PROPERTIES}
+            })
+        return {"type": "FeatureCollection", "features": features}
+
+    def map_key(self, filters: dict, limit: int = 500, after: str = None) -> str:
+        """
+        Calcule la clé d'une carte à partir des paramètres de recherche.
+        Args:
+            filters (dict): Filtres de la recherche.
+            limit (int): Nombre maximum d'emplacements de la recherche.
+            after (str): Curseur de la page affichée (optionnel).
+        Returns:
+            str: Empreinte hexadécimale identifiant la recherche.
+        """
+        payload = json.dumps({"filters": filters, "limit": limit, "after": after}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+    def get_or_create_map(self, key: str, results_loader, center=None):
+        """
+        Retourne le HTML de la carte associée à une clé, en la générant si besoin.
+        Les cartes sont conservées dans un cache mémoire borné : deux recherches identiques
+        partagent le même rendu.
+        Args:
+            key (str): Clé de la carte (voir map_key).
+            results_loader (Callable[[], List[Emplacement]]): Fonction fournissant les emplacements à afficher.
+            center (List[float]): Coordonnées [latitude, longitude] pour centrer la carte.
+        Returns:
+            str: Code HTML de la carte.
+        """
+        map_html = self.map_cache.get(key)
+        if map_html is MISSING:
+            map_html = self.create_map(results_loader(), center)
+            self.map_cache.set(key, map_html)
+        return map_html
+
+    @staticmethod
+    def map_center(results) -> List[float]:
+        """
+        Centre de la carte d'une page de résultats : le premier emplacement, ou Paris par défaut.
+        Args:
+            results (List[Emplacement]): Emplacements de la page.
+        Returns:
+            List[float]: Coordonnées [latitude, longitude].
+        """
+        if results and results[0].lat is not None:
+            return [results[0].lat, results[0].lon]
+        return [48.8566, 2.3522]
+
+    def remember_search_map(self, key: str, filters: dict, after: str = None):
+        """
+        Associe la clé de carte d'une page de recherche aux paramètres bruts de cette recherche.
+        Appelée à chaque recherche, que la page soit servie ou non depuis le cache des réponses :
+        l'association vit au moins aussi longtemps que la page qui référence /map/<key>.
+        Args:
+            key (str): Clé de la carte (map_key des paramètres bruts).
+            filters (dict): Filtres saisis dans le formulaire.
+            after (str): Curseur de la page affichée (optionnel).
+        """
+        self.map_requests.set(key, (filters, after))
+
+    def search_map(self, filters: dict, after: str = None) -> str:
+        """
+        Retourne la carte d'une page de recherche, reconstruite depuis le cache des résultats si besoin.
+        Args:
+            filters (dict): Filtres saisis dans le formulaire.
+            after (str): Curseur de la page affichée (un curseur invalide ramène à la première page).
+        Returns:
+            str: Code HTML de la carte.
+        """
+        normalized, results, _, after = self.cached_search_page_or_first(filters, SEARCH_PAGE_SIZE, after)
+        return self.page_map(normalized, results, after)
+
+    def page_map(self, normalized: dict, results, after: str = None) -> str:
+        """
+        Carte d'une page de recherche, partagée par les recherches de mêmes filtres normalisés.
+        Args:
+            normalized (dict): Filtres normalisés de la recherche.
+            results (List[Emplacement]): Emplacements de la page.
+            after (str): Curseur de la page affichée.
+        Returns:
+            str: Code HTML de la carte.
+        """
+        return self.get_or_create_map(self.map_key(normalized, SEARCH_PAGE_SIZE, after),
+                                      lambda: results, self.map_center(results))
+
+    def get_or_create_response(self, key, render):
+        """
+        Retourne une réponse compressée du cache des réponses, en la calculant si besoin.
+        Args:
+            key (Hashable): Clé de la réponse (route et paramètres bruts de la requête).
+            render (Callable[[], CompressedBody]): Fonction produisant la réponse compressée.
+        Returns:
+            CompressedBody: La réponse.
+        """
+        self.sync_data_version()
+        entry = self.response_cache.get(key)
+        if entry is MISSING:
+            entry = render()
+            self.response_cache.set(key, entry)
+        return entry
+
+    def get_map(self, key: str = None):
+        """
+        Retourne la carte d'une page de recherche, ou la carte par défaut centrée sur Paris.
+        Une carte évincée du cache est reconstruite tant que la page qui la référence peut être servie.
+        Args:
+            key (str): Clé de la carte (optionnelle, voir remember_search_map).
+        Returns:
+            str: Code HTML de la carte.
+        """
+        requested = self.map_requests.get(key) if key else MISSING
+        if requested is not MISSING:
+            return self.search_map(*requested)
+        return self.get_or_create_map("default", list)
@@ -1,71 +1,258 @@
-from neo4j import GraphDatabase
-from typing import List, Dict
-from config import NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD, NEO4J_DATABASE
+import hashlib
+import json
+import math
+import threading
+from typing import List, Dict, Optional, Tuple
+from config import PROCHE_DE_RADIUS
+from .connections import ConnectionRegistry, registry
+
+_NOT_LOADED = object()
+
+# Rayon terrestre de point.distance (WGS-84 2D) et longueur d'un degré de latitude correspondante
+_EARTH_RADIUS_M = 6378140.0
+_METERS_PER_DEG = math.pi * _EARTH_RADIUS_M / 180
+
+NEARBY_RETURN = """
+        MATCH (emp)-[:DE_TYPE]->(typ:Type)
+        MATCH (emp)-[:SOUMIS_A]->(reg:Reglement)
+        MATCH (emp)-[:SUR_VOIE]->(voie:Voie)
+        RETURN
+            emp.id as id,
+            voie.name as voie,
+            typ.name as type,
+            reg.name as reglement,
+            emp.places_calcul as places,
+            emp.latitude as lat,
+            emp.longitude as lon,
+            distance
+"""
+
+# Présélection par l'index de points (carré englobant), puis filtre sur la distance exacte
+NEARBY_MATCH = """
+        MATCH (emp:Emplacement)
+        WHERE point.withinBBox(emp.location,
+                               point({latitude: $south, longitude: $west}),
+                               point({latitude: $north, longitude: $east}))
+        WITH emp, point.distance(emp.location, center) AS distance
+        WHERE distance < $radius
+""" + NEARBY_RETURN
+
+
+# Zones de règlement de tous les arrondissements, en une seule requête
+ZONES_QUERY = """
+        MATCH (a:Arrondissement)<-[:APPARTIENT_A]-(z:Zone)
+        WHERE a.number IS NOT NULL
+        RETURN a.number as arrond, collect(DISTINCT z.name) as zones
+"""
+
+
+def bounding_box(lat: float, lon: float, radius: float) -> Dict[str, float]:
+    """
+    Calcule le carré englobant un cercle, avec une marge de 1 % pour les arrondis.
+    Args:
+        lat (float): Latitude du centre.
+        lon (float): Longitude du centre.
+        radius (float): Rayon en mètres.
+    Returns:
+        Dict[str, float]: Bornes south, west, north et east en degrés.
+    """
+    dlat = radius * 1.01 / _METERS_PER_DEG
+    dlon = dlat / max(math.cos(math.radians(lat)), 1e-6)
+    return {"south": lat - dlat, "west": lon - dlon, "north": lat + dlat, "east": lon + dlon}
 
 class Neo4jQueries:
-    def __init__(self):
+    def __init__(self, driver=None, connections: ConnectionRegistry = registry):
         """
-        Initialise la connexion à la base de données Neo4j.
+        Initialise l'accès à la base de données Neo4j.
+        Cet objet ne ferme pas le driver : celui du registre partagé est fermé par
+        ConnectionRegistry.close, un driver fourni explicitement par son créateur.
+        Args:
+            driver: Driver Neo4j à utiliser (optionnel, sinon celui du registre partagé,
+                créé à la première requête).
+            connections (ConnectionRegistry): Registre des connexions (registre de l'application par défaut).
         """
-        self.driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD), database=NEO4J_DATABASE)
+        self._driver = driver
+        self.connections = connections
+        self._zones: Dict[int, Tuple[bytes, str]] = {}
+        self._zones_version = _NOT_LOADED
+        self._zones_lock = threading.Lock()
+
+    @property
+    def driver(self):
+        return self._driver or self.connections.neo4j_driver
 
-    def get_nearby_alternatives(self, lat: float, lon: float, radius: int = 100) -> List[Dict]:
+    def get_nearby_alternatives(self, lat: float, lon: float, radius: int = 100, limit: int = 20) -> List[Dict]:
         """
         Récupère les emplacements de stationnement à proximité d'une position géographique donnée.
+        La recherche passe par l'index de points sur `emp.location` (point.withinBBox sur le
+        carré englobant le cercle), puis filtre sur la distance exacte.
         Args:
             lat (float): Latitude de la position.
             lon (float): Longitude de la position.
             radius (int): Rayon en mètres pour la recherche des emplacements à proximité.
+            limit (int): Nombre maximal d'emplacements retournés.
         Returns:
             List[Dict]: Liste de dictionnaires contenant les informations des emplacements à proximité.
         """
+        query = f"""
+        WITH point({{latitude: $lat, longitude: $lon}}) AS center
+        {NEARBY_MATCH}
+        ORDER BY distance ASC
+        LIMIT $limit
+        """
+        with self.driver.session() as session:
+            result = session.run(query, lat=lat, lon=lon, radius=radius, limit=limit, **bounding_box(lat, lon, radius))
+            return [dict(record) for record in result]
+
+    def get_nearby_alternatives_for(self, emp_id: str, radius: float = PROCHE_DE_RADIUS, limit: int = 20) -> List[Dict]:
+        """
+        Récupère les emplacements proches d'un emplacement connu.
+        Jusqu'à PROCHE_DE_RADIUS mètres, les voisins sont lus directement sur les relations
+        PROCHE_DE calculées au chargement ; au-delà, la recherche part des coordonnées de
+        l'emplacement et utilise l'index de points.
+        Args:
+            emp_id (str): Identifiant de l'emplacement de référence.
+            radius (float): Rayon en mètres.
+            limit (int): Nombre maximal d'emplacements retournés.
+        Returns:
+            List[Dict]: Liste des emplacements voisins (l'emplacement de référence exclu).
+        """
+        if radius <= PROCHE_DE_RADIUS:
+            query = f"""
+            MATCH (ref:Emplacement {{id: $emp_id}})-[near:PROCHE_DE]->(emp:Emplacement)
+            WHERE near.distance < $radius
+            WITH emp, near.distance AS distance
+            {NEARBY_RETURN}
+            ORDER BY distance ASC
+            LIMIT $limit
+            """
+            with self.driver.session() as session:
+                result = session.run(query, emp_id=emp_id, radius=radius, limit=limit)
+                return [dict(record) for record in result]
+
+        with self.driver.session() as session:
+            record = session.run("MATCH (e:Emplacement {id: $emp_id}) RETURN e.location AS location", emp_id=emp_id).single()
+        if record is None or record["location"] is None:
+            return []
+        center = record["location"]
+        results = self.get_nearby_alternatives(center.latitude, center.longitude, radius, limit + 1)
+        return [emp for emp in results if emp["id"] != emp_id][:limit]
+
+    def get_same_type_emplacements(self, emp_id: str, limit: int = 20) -> List[Dict]:
+        """
+        Récupère des emplacements du même type qu'un emplacement donné (relation MEME_TYPE).
+        La relation est déduite à la requête en passant par le nœud Type partagé : elle n'a pas
+        besoin d'être matérialisée (NEO4J_DERIVED_RELATIONS=query).
+        Args:
+            emp_id (str): Identifiant de l'emplacement de référence.
+            limit (int): Nombre maximal d'emplacements retournés.
+        Returns:
+            List[Dict]: Liste des emplacements du même type.
+        """
         query = """
-        MATCH (emp:Emplacement)
-        WHERE emp.latitude IS NOT NULL AND emp.longitude IS NOT NULL
-        AND point.distance(
-            point({latitude: $lat, longitude: $lon}),
-            point({latitude: emp.latitude, longitude: emp.longitude})
-        ) < $radius
-        MATCH (emp)-[:DE_TYPE]->(typ:Type)
-        MATCH (emp)-[:SOUMIS_A]->(reg:Reglement)
-        MATCH (emp)-[:SUR_VOIE]->(voie:Voie)
+        MATCH (e1:Emplacement {id: $emp_id})-[:DE_TYPE]->(typ:Type)<-[:DE_TYPE]-(e2:Emplacement)
+        WHERE e1 <> e2
+        WITH e2, typ LIMIT $limit
+        MATCH (e2)-[:SUR_VOIE]->(voie:Voie)
         RETURN
-            emp.id as id,
+            e2.id as id,
             voie.name as voie,
             typ.name as type,
-            reg.name as reglement,
-            emp.places_calcul as places,
-            emp.latitude as lat,
-            emp.longitude as lon,
-            point.distance(
-                point({latitude: $lat, longitude: $lon}),
-                point({latitude: emp.latitude, longitude: emp.longitude})
-            ) as distance
-        ORDER BY distance ASC
-        LIMIT 20
+            e2.places_calcul as places,
+            e2.latitude as lat,
+            e2.longitude as lon
         """
         with self.driver.session() as session:
-            result = session.run(query, lat=lat, lon=lon, radius=radius)
+            result = session.run(query, emp_id=emp_id, limit=limit)
+            return [dict(record) for record in result]
+
+    def get_complementary_emplacements(self, emp_id: str, limit: int = 20) -> List[Dict]:
+        """
+        Récupère les emplacements de la même voie mais d'un autre type (relation COMPLEMENTAIRE),
+        déduits à la requête via le nœud Voie partagé.
+        Args:
+            emp_id (str): Identifiant de l'emplacement de référence.
+            limit (int): Nombre maximal d'emplacements retournés.
+        Returns:
+            List[Dict]: Liste des emplacements complémentaires.
+        """
+        query = """
+        MATCH (e1:Emplacement {id: $emp_id})-[:SUR_VOIE]->(voie:Voie)<-[:SUR_VOIE]-(e2:Emplacement)
+        MATCH (e1)-[:DE_TYPE]->(t1:Type), (e2)-[:DE_TYPE]->(t2:Type)
+        WHERE e1 <> e2 AND t1 <> t2
+        WITH e2, voie, t2 LIMIT $limit
+        RETURN
+            e2.id as id,
+            voie.name as voie,
+            t2.name as type,
+            e2.places_calcul as places,
+            e2.latitude as lat,
+            e2.longitude as lon
+        """
+        with self.driver.session() as session:
+            result = session.run(query, emp_id=emp_id, limit=limit)
             return [dict(record) for record in result]
 
     def get_zones_by_arrondissement(self, arrondissement: int) -> List[Dict]:
         """
         Récupère les zones de règlement pour un arrondissement spécifique.
+        Les réponses déjà en mémoire sont réutilisées, quelle que soit leur version : seul
+        le premier appel interroge Neo4j (les rechargements suivent get_zones_response).
         Args:
             arrondissement (int): Le numéro de l'arrondissement pour lequel récupérer les zones.
         Returns:
             List[Dict]: Liste des zones de règlement pour l'arrondissement spécifié.
         """
-        query = """
-        MATCH (a:Arrondissement {number: $arrond})<-[:APPARTIENT_A]-(z:Zone)
-        RETURN z.name as zone
+        version = self._zones_version if self.zones_loaded(self._zones_version) else None
+        return json.loads(self.get_zones_response(arrondissement, version)[0])
+
+    def get_all_zones_by_arrondissement(self) -> Dict[int, List[str]]:
+        """
+        Récupère en une seule requête les zones de règlement de tous les arrondissements.
+        Returns:
+            Dict[int, List[str]]: Zones triées, par numéro d'arrondissement.
         """
         with self.driver.session() as session:
-            result = session.run(query, arrond=arrondissement)
-            return [record["zone"] for record in result]
+            result = session.run(ZONES_QUERY)
+            return {record["arrond"]: sorted(record["zones"]) for record in result}
+
+    def load_zones(self, version: Optional[str] = None):
+        """
+        Précalcule les réponses JSON et ETag de la route des zones pour les 20 arrondissements.
+        Args:
+            version (Optional[str]): Version du graphe publiée par l'ETL, associée aux réponses.
+        """
+        self.set_zones(self.get_all_zones_by_arrondissement(), version)
 
-    def close(self):
+    def set_zones(self, zones_by_arrondissement: Dict[int, List[str]], version: Optional[str] = None):
         """
-        Ferme la connexion à la base de données Neo4j.
+        Remplace les réponses précalculées de la route des zones.
+        Args:
+            zones_by_arrondissement (Dict[int, List[str]]): Zones triées, par numéro d'arrondissement.
+            version (Optional[str]): Version du graphe associée aux réponses.
+        """
+        zones = {}
+        for arrond, names in zones_by_arrondissement.items():
+            body = json.dumps(names, ensure_ascii=False).encode("utf-8")
+            zones[arrond] = (body, hashlib.sha1(body).hexdigest())
+        with self._zones_lock:
+            self._zones = zones
+            self._zones_version = version
+
+    def get_zones_response(self, arrondissement: int, version: Optional[str] = None) -> Tuple[bytes, str]:
         """
-        self.driver.close()
+        Retourne la réponse JSON précalculée des zones d'un arrondissement et son ETag.
+        Les zones sont rechargées uniquement lorsque `version` diffère de la version en mémoire.
+        Args:
+            arrondissement (int): Le numéro de l'arrondissement.
+            version (Optional[str]): Version courante du graphe publiée par l'ETL.
+        Returns:
+            Tuple[bytes, str]: Corps JSON et ETag.
+        """
+        if not self.zones_loaded(version):
+            self.load_zones(version)
+        return self._zones.get(arrondissement, (b"[]", hashlib.sha1(b"[]").hexdigest()))
+
+    def zones_loaded(self, version: Optional[str] = None) -> bool:
+        """Indique si les réponses des zones en mémoire correspondent à la version `version`."""
+        return self._zones_version is not _NOT_LOADED and version == self._zones_version
@@ -0,0 +1,63 @@
+from collections import namedtuple
+from typing import Dict, Iterable, List, Optional, Tuple
+
+EMPLACEMENT_FIELDS = ("key", "lat", "lon", "regpri", "typsta", "nomvoie", "arrond", "zoneres", "placal",
+                      "surface_calculee", "distance")
+
+
+class Emplacement(namedtuple("Emplacement", EMPLACEMENT_FIELDS, defaults=(None,) * len(EMPLACEMENT_FIELDS))):
+    """Emplacement de stationnement retourné par une recherche.
+    Tuple nommé sans dictionnaire d'instance (__slots__ vide) : seuls les champs lus par
+    la carte, le GeoJSON et la pagination sont conservés, avec des coordonnées à plat.
+    `key` est la clé `_key` du document ; `distance` n'est renseignée que pour une
+    recherche par adresse.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_document(cls, doc: Dict, distance: float = None) -> "Emplacement":
+        """
+        Construit un emplacement à partir d'un document MongoDB (projeté ou non).
+        Args:
+            doc (Dict): Document emplacement.
+            distance (float): Distance au point de recherche (par défaut celle du document).
+        Returns:
+            Emplacement: L'emplacement.
+        """
+        geo_point = doc.get("geo_point_2d") or {}
+        lat, lon = geo_point.get("lat"), geo_point.get("lon")
+        if lat is None or lon is None:
+            lat = lon = None
+        return cls(doc.get("_key"), lat, lon, doc.get("regpri"), doc.get("typsta"), doc.get("nomvoie"),
+                   doc.get("arrond"), doc.get("zoneres"), doc.get("placal"), doc.get("surface_calculee"),
+                   doc.get("distance") if distance is None else distance)
+
+    @classmethod
+    def from_cursor(cls, documents: Iterable[Dict]) -> List["Emplacement"]:
+        """
+        Construit les emplacements d'un curseur MongoDB ; chaque document est libéré aussitôt converti.
+        Args:
+            documents (Iterable[Dict]): Documents emplacements.
+        Returns:
+            List[Emplacement]: Les emplacements, dans l'ordre du curseur.
+        """
+        return [cls.from_document(doc) for doc in documents]
+
+    @property
+    def coords(self) -> Optional[Tuple[float, float]]:
+        """Coordonnées (lat, lon), ou None si absentes."""
+        return (self.lat, self.lon) if self.lat is not None else None
+
+    def to_dict(self) -> Dict:
+        """
+        Returns:
+            Dict: L'emplacement sous la forme d'un document (geo_point_2d, _key...), sans les champs absents.
+        """
+        doc = {"_key": self.key}
+        if self.lat is not None:
+            doc["geo_point_2d"] = {"lat": self.lat, "lon": self.lon}
+        for field in EMPLACEMENT_FIELDS[3:]:
+            value = getattr(self, field)
+            if value is not None:
+                doc[field] = value
+        return doc
@@ -0,0 +1,112 @@
+import gzip
+import json
+from typing import Dict, List, Optional
+from config import MAP_RENDERER, SEARCH_PAGE_SIZE
+from .cache import CompressedBody, compress_body
+from .records import Emplacement
+
+# Construction des réponses commune aux modes de service synchrone (app/main.py, Flask)
+# et asynchrone (app/async_main.py, Quart) : seules les entrées/sorties diffèrent entre les deux.
+
+
+def filter_choices(facets: dict) -> dict:
+    """
+    Valeurs proposées dans les listes déroulantes du formulaire, à partir des facettes.
+    Args:
+        facets (dict): Facettes de recherche (voir ParkingService.get_facets).
+    Returns:
+        dict: Variables de template (arrondissements, types_reglement, types_station, zones).
+    """
+    return {
+        "arrondissements": list(range(1, 21)),
+        "types_reglement": [facet["value"] for facet in facets["regpri"]],
+        "types_station": [facet["value"] for facet in facets["typsta"]],
+        "zones": [facet["value"] for facet in facets["zoneres"]]
+    }
+
+
+def read_limit(args, default: int = 500, maximum: int = 5000) -> int:
+    """
+    Taille de page demandée en query string, bornée à [1, maximum] : limit(0) signifierait
+    « sans limite » pour MongoDB.
+    Args:
+        args: Paramètres de la requête (MultiDict).
+        default (int): Taille par défaut.
+        maximum (int): Taille maximale.
+    Returns:
+        int: Taille de page.
+    """
+    return max(1, min(args.get("limit", default, type=int), maximum))
+
+
+def compressed_response(response_class, entry: CompressedBody, accepts_gzip: bool):
+    """
+    Construit la réponse d'une entrée du cache compressé : telle quelle (Content-Encoding: gzip)
+    si le client accepte gzip, décompressée sinon. L'ETag permet ensuite une réponse 304
+    (make_conditional, synchrone avec Flask, asynchrone avec Quart).
+    Args:
+        response_class: Classe de réponse (flask.Response ou quart.Response).
+        entry (CompressedBody): Réponse compressée.
+        accepts_gzip (bool): Le client accepte l'encodage gzip.
+    Returns:
+        Réponse à rendre conditionnelle.
+    """
+    if accepts_gzip:
+        response = response_class(entry.gzip_body, mimetype=entry.mimetype)
+        response.headers["Content-Encoding"] = "gzip"
+        response.set_etag(entry.etag + "-gzip")
+    else:
+        response = response_class(gzip.decompress(entry.gzip_body), mimetype=entry.mimetype)
+        response.set_etag(entry.etag)
+    for name, value in entry.headers:
+        response.headers[name] = value
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+def search_context(filters: dict, after: Optional[str], key: str, results: List[Emplacement],
+                   next_cursor: Optional[str]) -> Dict:
+    """
+    Variables de template de la page de résultats (hors listes déroulantes).
+    Args:
+        filters (dict): Filtres saisis dans le formulaire.
+        after (str): Curseur de la page affichée.
+        key (str): Clé de la page, qui identifie sa carte (/map/<key>).
+        results (List[Emplacement]): Emplacements de la page.
+        next_cursor (str): Curseur de la page suivante.
+    Returns:
+        Dict: Variables de template.
+    """
+    return {
+        # En mode geojson, la carte charge elle-même les résultats depuis /api/emplacements
+        "map_key": key if MAP_RENDERER == "folium" else None,
+        "map_renderer": MAP_RENDERER,
+        # Même taille de page pour la carte geojson (/light-map) que pour la liste
+        "page_size": SEARCH_PAGE_SIZE,
+        "results": results,
+        "nb_results": len(results),
+        "filters": filters,
+        "after": after,
+        "next_cursor": next_cursor
+    }
+
+
+def geojson_body(collection: dict, next_cursor: Optional[str], next_url: Optional[str]) -> CompressedBody:
+    """
+    Réponse GeoJSON compacte et compressée d'une page de résultats.
+    Args:
+        collection (dict): FeatureCollection (voir ParkingService.to_geojson).
+        next_cursor (str): Curseur de la page suivante.
+        next_url (str): URL de la page suivante (en-tête Link), si elle existe.
+    Returns:
+        CompressedBody: Réponse compressée.
+    """
+    collection["next"] = next_cursor
+    payload = json.dumps(collection, separators=(",", ":"), ensure_ascii=False)
+    headers = [("Link", f'<{next_url}>; rel="next"')] if next_cursor else []
+    return compress_body(payload, "application/geo+json", headers)
+
+
+def ndjson_line(emp: Emplacement) -> str:
+    """Ligne NDJSON d'un emplacement (voir Emplacement.to_dict)."""
+    return json.dumps(emp.to_dict(), ensure_ascii=False) + "\n"
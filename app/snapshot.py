@@ -0,0 +1,217 @@
+import json
+import math
+import os
+import threading
+from typing import List, Optional
+import numpy as np
+from etl.cleaning import normalize_text
+from etl.snapshot import CURRENT_FILE, DICTIONARY_FIELDS, MANIFEST_FILE, PLACAL_MISSING, SNAPSHOT_FORMAT
+from .distance import DistanceEngine
+from .records import Emplacement
+from .spatial_index import EARTH_RADIUS_M
+
+_COLUMNS = ("key", "lat", "lon", "arrond", "placal", "surface_calculee") + DICTIONARY_FIELDS
+
+
+class ParkingSnapshot:
+    """Instantané colonnaire des emplacements, ouvert en lecture seule par projection mémoire.
+    Les colonnes .npy écrites par etl.snapshot sont chargées avec mmap_mode="r" : les pages
+    du fichier sont partagées par tous les workers via le cache du système. Seuls les
+    dictionnaires de valeurs (quelques milliers de chaînes) sont copiés dans chaque processus.
+    Les filtres reproduisent ceux de ParkingService.build_query.
+    """
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): Répertoire de l'instantané (<SNAPSHOT_DIR>/<version>).
+        Raises:
+            ValueError: Si le format de l'instantané n'est pas pris en charge.
+        """
+        with open(os.path.join(path, MANIFEST_FILE), encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("format") != SNAPSHOT_FORMAT:
+            raise ValueError(f"Format d'instantané non pris en charge: {manifest.get('format')}")
+        self.path = path
+        self.version = manifest["version"]
+        self.columns = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in _COLUMNS}
+        self.values = manifest["dictionaries"]
+        self._codes = {field: {value: code for code, value in enumerate(values)} for field, values in self.values.items()}
+        # Valeurs normalisées pour les filtres regpri/typsta et noms de voie précédés d'une espace
+        # (un préfixe de mot est alors une sous-chaîne commençant par une espace)
+        self._normalized = {field: [normalize_text(v) if v else None for v in self.values[field]]
+                            for field in ("regpri", "typsta")}
+        self._streets = [" " + normalize_text(v) if v else "" for v in self.values["nomvoie"]]
+
+    @classmethod
+    def open(cls, directory: str) -> Optional["ParkingSnapshot"]:
+        """
+        Ouvre l'instantané courant d'un répertoire (fichier CURRENT).
+        Args:
+            directory (str): Répertoire des instantanés.
+        Returns:
+            Optional[ParkingSnapshot]: L'instantané, ou None s'il n'existe pas ou est illisible.
+        """
+        try:
+            with open(os.path.join(directory, CURRENT_FILE), encoding="utf-8") as f:
+                version = f.read().strip()
+            return cls(os.path.join(directory, version))
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ Instantané indisponible ({directory}): {e}")
+            return None
+
+    def __len__(self):
+        return len(self.columns["key"])
+
+    def _codes_where(self, field: str, predicate) -> np.ndarray:
+        return np.array([code for code, value in enumerate(self.values[field]) if value and predicate(code, value)],
+                        dtype=np.int64)
+
+    def match(self, filters: dict, rows: slice = slice(None)) -> Optional[np.ndarray]:
+        """
+        Évalue les filtres de recherche (hors adresse) sur une tranche de l'instantané.
+        Args:
+            filters (dict): Filtres de recherche.
+            rows (slice): Tranche de lignes évaluée.
+        Returns:
+            Optional[np.ndarray]: Masque booléen des lignes retenues, None si aucun filtre.
+        """
+        conditions = []
+        columns = self.columns
+        if filters.get("arrondissement"):
+            conditions.append(columns["arrond"][rows] == int(filters["arrondissement"]))
+        for field in ("regpri", "typsta"):
+            if filters.get(field):
+                wanted = normalize_text(filters[field])
+                codes = self._codes_where(field, lambda code, _: self._normalized[field][code] == wanted)
+                conditions.append(np.isin(columns[field][rows], codes))
+        if filters.get("zoneres"):
+            code = self._codes["zoneres"].get(filters["zoneres"], -1)
+            conditions.append(columns["zoneres"][rows] == code)
+        if filters.get("nomvoie"):
+            street = normalize_text(filters["nomvoie"])
+            if street:
+                codes = self._codes_where("nomvoie", lambda code, _: (" " + street) in self._streets[code])
+                conditions.append(np.isin(columns["nomvoie"][rows], codes))
+        if not conditions:
+            return None
+        mask = conditions[0]
+        for condition in conditions[1:]:
+            mask &= condition
+        return mask
+
+    def records(self, rows: np.ndarray, distances: np.ndarray = None) -> List[Emplacement]:
+        """
+        Reconstruit des emplacements à partir de lignes.
+        Chaque colonne est lue en une fois pour toutes les lignes.
+        Args:
+            rows (np.ndarray): Positions des lignes.
+            distances (np.ndarray): Distances au point de recherche (optionnelles).
+        Returns:
+            List[Emplacement]: Emplacements, dans l'ordre des lignes.
+        """
+        columns = self.columns
+        # Arrondi à 6 décimales (~10 cm) : précision du float32, sans ses décimales parasites
+        lats = np.round(columns["lat"][rows].astype(np.float64), 6).tolist()
+        lons = np.round(columns["lon"][rows].astype(np.float64), 6).tolist()
+        regpri, typsta, zoneres, nomvoie = ([self.values[field][code] for code in columns[field][rows].tolist()]
+                                            for field in DICTIONARY_FIELDS)
+        arronds = columns["arrond"][rows].tolist()
+        placals = columns["placal"][rows].tolist()
+        surfaces = columns["surface_calculee"][rows].astype(np.float64).tolist()
+        keys = columns["key"][rows].tolist()
+        distances = distances.tolist() if distances is not None else [None] * len(keys)
+
+        return [
+            Emplacement(keys[i].decode("utf-8"),
+                        None if math.isnan(lats[i]) else lats[i], None if math.isnan(lats[i]) else lons[i],
+                        regpri[i], typsta[i], nomvoie[i], arronds[i] or None, zoneres[i],
+                        None if placals[i] == PLACAL_MISSING else placals[i],
+                        None if math.isnan(surfaces[i]) else surfaces[i], distances[i])
+            for i in range(len(keys))
+        ]
+
+    def page(self, filters: dict, limit: int, after: str = None) -> List[Emplacement]:
+        """
+        Retourne les emplacements correspondant aux filtres, triés par `_key`, après la clé `after`.
+        Args:
+            filters (dict): Filtres de recherche (hors adresse).
+            limit (int): Nombre maximum d'emplacements.
+            after (str): Dernière clé de la page précédente (optionnelle).
+        Returns:
+            List[Emplacement]: Emplacements de la page.
+        """
+        start = int(np.searchsorted(self.columns["key"], after.encode("utf-8"), side="right")) if after else 0
+        mask = self.match(filters, slice(start, None))
+        rows = np.arange(start, min(start + limit, len(self))) if mask is None else np.flatnonzero(mask)[:limit] + start
+        return self.records(rows)
+
+    def near(self, lat: float, lon: float, radius: float, filters: dict, limit: int, cursor: list = None) -> List[Emplacement]:
+        """
+        Retourne les emplacements correspondant aux filtres à moins de `radius` mètres d'un point,
+        triés par (distance, _key), après le curseur [distance, _key] de la page précédente.
+        Args:
+            lat (float): Latitude du point.
+            lon (float): Longitude du point.
+            radius (float): Rayon en mètres.
+            filters (dict): Filtres de recherche (l'adresse est ignorée).
+            limit (int): Nombre maximum d'emplacements.
+            cursor (list): [distance, _key] du dernier résultat de la page précédente (optionnel).
+        Returns:
+            List[Emplacement]: Emplacements de la page, avec leur distance.
+        """
+        columns = self.columns
+        # Carré englobant sur les colonnes float32, puis distances exactes sur les seuls candidats
+        dlat = math.degrees(radius * 1.01 / EARTH_RADIUS_M)
+        dlon = dlat / max(math.cos(math.radians(lat)), 1e-6)
+        lats, lons = columns["lat"], columns["lon"]
+        candidates = np.flatnonzero((lats >= lat - dlat) & (lats <= lat + dlat) & (lons >= lon - dlon) & (lons <= lon + dlon))
+        mask = self.match(filters)
+        if mask is not None:
+            candidates = candidates[mask[candidates]]
+        if not len(candidates):
+            return []
+
+        engine = DistanceEngine(lats[candidates], lons[candidates])
+        positions, distances = engine.within(lat, lon, radius)
+        rows = candidates[positions]
+        keys = columns["key"][rows]
+        if cursor:
+            last_distance, last_key = cursor[0], cursor[1].encode("utf-8")
+            keep = (distances > last_distance) | ((distances == last_distance) & (keys > last_key))
+            rows, distances, keys = rows[keep], distances[keep], keys[keep]
+        order = np.lexsort((keys, distances))[:limit]
+        return self.records(rows[order], distances[order])
+
+
+class SnapshotHolder:
+    """Conteneur thread-safe de l'instantané correspondant à la version publiée des données.
+    L'instantané n'est utilisé que si sa version est celle publiée par l'ETL ; sinon
+    (absent, ancien, illisible) les recherches sont servies par MongoDB.
+    """
+    def __init__(self, directory: str):
+        """
+        Args:
+            directory (str): Répertoire des instantanés (vide : instantané désactivé).
+        """
+        self.directory = directory
+        self._snapshot: Optional[ParkingSnapshot] = None
+        self._version = None
+        self._lock = threading.Lock()
+
+    def get(self, version: str) -> Optional[ParkingSnapshot]:
+        """
+        Retourne l'instantané de la version demandée, en l'ouvrant au premier appel pour cette version.
+        Args:
+            version (str): Version des données publiée par l'ETL.
+        Returns:
+            Optional[ParkingSnapshot]: L'instantané, ou None s'il n'est pas disponible pour cette version.
+        """
+        if not self.directory or version is None:
+            return None
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    snapshot = ParkingSnapshot.open(self.directory)
+                    self._snapshot = snapshot if snapshot is not None and snapshot.version == version else None
+                    self._version = version
+        return self._snapshot
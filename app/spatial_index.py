@@ -0,0 +1,252 @@
+import math
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+from geopy.distance import geodesic
+from .records import Emplacement
+
+# Rayon moyen de la Terre (IUGG) utilisé pour la formule de haversine
+EARTH_RADIUS_M = 6371008.8
+
+# Latitude de référence pour la projection locale (centre de Paris)
+REFERENCE_LAT = 48.8566
+
+# Écart relatif maximal entre haversine (sphère) et geodesic (ellipsoïde WGS84)
+# à la latitude de Paris. Les candidats dont la distance haversine tombe dans
+# cette bande autour du rayon sont départagés avec geodesic.
+HAVERSINE_TOLERANCE = 0.005
+
+_METERS_PER_DEG_LAT = math.pi * EARTH_RADIUS_M / 180
+_METERS_PER_DEG_LON = _METERS_PER_DEG_LAT * math.cos(math.radians(REFERENCE_LAT))
+
+_GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def geohash(lat: float, lon: float, precision: int = 7) -> str:
+    """
+    Encode un point en geohash : les points d'une même cellule partagent le même code.
+    Args:
+        lat (float): Latitude.
+        lon (float): Longitude.
+        precision (int): Nombre de caractères (7 : cellule d'environ 150 m x 150 m à Paris).
+    Returns:
+        str: Geohash du point.
+    """
+    bounds = [[-90.0, 90.0], [-180.0, 180.0]]
+    value = (lat, lon)
+    code, bits, bit_count, axis = [], 0, 0, 1
+    while len(code) < precision:
+        low, high = bounds[axis]
+        middle = (low + high) / 2
+        bits <<= 1
+        if value[axis] >= middle:
+            bits |= 1
+            bounds[axis][0] = middle
+        else:
+            bounds[axis][1] = middle
+        axis = 1 - axis
+        bit_count += 1
+        if bit_count == 5:
+            code.append(_GEOHASH_ALPHABET[bits])
+            bits = bit_count = 0
+    return "".join(code)
+
+
+def geohash_center(code: str) -> Tuple[float, float]:
+    """
+    Décode un geohash.
+    Args:
+        code (str): Geohash.
+    Returns:
+        Tuple[float, float]: Centre (latitude, longitude) de la cellule.
+    Raises:
+        ValueError: Si le code contient un caractère invalide.
+    """
+    bounds = [[-90.0, 90.0], [-180.0, 180.0]]
+    axis = 1
+    for char in code:
+        position = _GEOHASH_ALPHABET.find(char)
+        if position < 0:
+            raise ValueError(f"Geohash invalide: {code}")
+        for shift in range(4, -1, -1):
+            middle = sum(bounds[axis]) / 2
+            bounds[axis][0 if (position >> shift) & 1 else 1] = middle
+            axis = 1 - axis
+    return sum(bounds[0]) / 2, sum(bounds[1]) / 2
+
+
+def haversine(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """
+    Calcule la distance orthodromique (en mètres) entre deux points.
+    Args:
+        lat1 (float): Latitude du premier point.
+        lon1 (float): Longitude du premier point.
+        lat2 (float): Latitude du second point.
+        lon2 (float): Longitude du second point.
+    Returns:
+        float: Distance en mètres.
+    """
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def get_coords(emplacement: Dict) -> Optional[Tuple[float, float]]:
+    """
+    Extrait les coordonnées (lat, lon) du champ geo_point_2d d'un emplacement.
+    Args:
+        emplacement (Union[Dict, Emplacement]): Document ou enregistrement emplacement.
+    Returns:
+        Optional[Tuple[float, float]]: Coordonnées ou None si absentes.
+    """
+    if isinstance(emplacement, Emplacement):
+        return emplacement.coords
+    geo_point = emplacement.get("geo_point_2d")
+    if geo_point and "lat" in geo_point and "lon" in geo_point:
+        return geo_point["lat"], geo_point["lon"]
+    return None
+
+
+class SpatialIndex:
+    """Index spatial en mémoire sous forme de grille régulière.
+    Les coordonnées geo_point_2d sont projetées sur un plan local (équirectangulaire
+    centré sur Paris) puis rangées dans des cellules carrées de `cell_size` mètres.
+    Une recherche par rayon ne parcourt que les cellules couvrant le cercle demandé.
+
+    Tolérance : le filtre final utilise haversine ; les candidats situés à moins de
+    HAVERSINE_TOLERANCE (0,5 %) du rayon sont vérifiés avec geodesic, de sorte que
+    l'ensemble retourné est identique à celui de l'ancien filtre geodesic. Les
+    distances retournées sont celles de haversine (écart < 0,5 %, soit < 2,5 m à 500 m).
+    """
+    def __init__(self, cell_size: float = 250):
+        """
+        Initialise un index vide.
+        Args:
+            cell_size (float): Taille des cellules de la grille en mètres.
+        """
+        self.cell_size = cell_size
+        self._cells: Dict[Tuple[int, int], List[int]] = {}
+        self._items: List[Dict] = []
+        self._coords: List[Tuple[float, float]] = []
+
+    def __len__(self):
+        return len(self._items)
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return (int(math.floor(lon * _METERS_PER_DEG_LON / self.cell_size)),
+                int(math.floor(lat * _METERS_PER_DEG_LAT / self.cell_size)))
+
+    def build(self, emplacements: Iterable[Dict]) -> "SpatialIndex":
+        """
+        Construit l'index à partir d'une liste d'emplacements.
+        Les emplacements sans coordonnées sont ignorés.
+        Args:
+            emplacements (Iterable[Dict]): Documents emplacements.
+        Returns:
+            SpatialIndex: L'index lui-même.
+        """
+        cells: Dict[Tuple[int, int], List[int]] = {}
+        items, coords = [], []
+        for emp in emplacements:
+            point = get_coords(emp)
+            if point is None:
+                continue
+            cells.setdefault(self._cell(*point), []).append(len(items))
+            items.append(emp)
+            coords.append(point)
+
+        self._cells, self._items, self._coords = cells, items, coords
+        return self
+
+    def candidates(self, lat: float, lon: float, radius: float) -> List[int]:
+        """
+        Retourne les positions des emplacements situés dans les cellules couvrant le cercle.
+        Args:
+            lat (float): Latitude du centre.
+            lon (float): Longitude du centre.
+            radius (float): Rayon en mètres.
+        Returns:
+            List[int]: Positions des emplacements candidats.
+        """
+        # Marge pour compenser l'écart de la projection locale loin de la latitude de référence
+        margin = radius * (1 + HAVERSINE_TOLERANCE) + 1
+        lat_margin = margin / _METERS_PER_DEG_LAT
+        lon_margin = margin / (_METERS_PER_DEG_LAT * max(math.cos(math.radians(lat)), 1e-6))
+        x_min, y_min = self._cell(lat - lat_margin, lon - lon_margin)
+        x_max, y_max = self._cell(lat + lat_margin, lon + lon_margin)
+
+        positions = []
+        for x in range(x_min, x_max + 1):
+            for y in range(y_min, y_max + 1):
+                positions.extend(self._cells.get((x, y), ()))
+        return positions
+
+    def query_radius(self, lat: float, lon: float, radius: float) -> List[Tuple[float, Dict]]:
+        """
+        Recherche les emplacements situés à moins de `radius` mètres d'un point.
+        Args:
+            lat (float): Latitude du centre.
+            lon (float): Longitude du centre.
+            radius (float): Rayon en mètres.
+        Returns:
+            List[Tuple[float, Dict]]: Couples (distance, emplacement) triés par distance.
+        """
+        lower = radius * (1 - HAVERSINE_TOLERANCE)
+        upper = radius * (1 + HAVERSINE_TOLERANCE)
+        results = []
+        for pos in self.candidates(lat, lon, radius):
+            emp_lat, emp_lon = self._coords[pos]
+            distance = haversine(lat, lon, emp_lat, emp_lon)
+            if distance > upper:
+                continue
+            if distance > lower and geodesic((lat, lon), (emp_lat, emp_lon)).meters > radius:
+                continue
+            results.append((distance, self._items[pos]))
+
+        results.sort(key=lambda pair: pair[0])
+        return results
+
+
+class SpatialIndexHolder:
+    """Conteneur thread-safe d'un SpatialIndex, reconstruit à la demande.
+    La construction se fait hors verrou de lecture : le nouvel index remplace
+    l'ancien en une seule affectation, les requêtes en cours continuent sur l'ancien.
+    """
+    def __init__(self, loader, cell_size: float = 250):
+        """
+        Args:
+            loader (Callable[[], Iterable[Dict]]): Fonction retournant les emplacements à indexer.
+            cell_size (float): Taille des cellules de la grille en mètres.
+        """
+        self._loader = loader
+        self._cell_size = cell_size
+        self._index: Optional[SpatialIndex] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> SpatialIndex:
+        """
+        Retourne l'index courant, en le construisant au premier appel.
+        Returns:
+            SpatialIndex: L'index courant.
+        """
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    self._index = SpatialIndex(self._cell_size).build(self._loader())
+        return self._index
+
+    def invalidate(self):
+        """Oublie l'index courant : il sera reconstruit au prochain appel de get()."""
+        with self._lock:
+            self._index = None
+
+    def refresh(self) -> SpatialIndex:
+        """
+        Reconstruit l'index (par exemple après un chargement ETL).
+        Returns:
+            SpatialIndex: Le nouvel index.
+        """
+        with self._lock:
+            self._index = SpatialIndex(self._cell_size).build(self._loader())
+        return self._index
@@ -0,0 +1,3 @@
+"""Benchmarks de performance de ParkInParis.
+Chaque module s'exécute avec `python -m benchmarks.<module>`.
+"""
@@ -0,0 +1,125 @@
+import argparse
+import copy
+import hashlib
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+from etl.cleaning import clean_batch, fingerprint, normalize_fields
+from etl.fetch_emplacements import EmplacementsFetcher
+from benchmarks.bench_export import write_fixture
+
+
+def clean_data_reference(data):
+    """Nettoyage ligne par ligne d'origine (MongoLoader.clean_data et fingerprint avant le passage par lots),
+    complété des champs de filtre normalisés."""
+    cleaned_data = []
+    for item in data:
+        if "geo_point_2d" in item and item["geo_point_2d"]:
+            geo_point = item["geo_point_2d"]
+            if isinstance(geo_point, dict) and "lat" in geo_point and "lon" in geo_point:
+                lat, lon = geo_point["lat"], geo_point["lon"]
+                if 48.8 <= lat <= 48.9 and 2.2 <= lon <= 2.5:
+                    item["location"] = {
+                        "type": "Point",
+                        "coordinates": [lon, lat]
+                    }
+
+        item["loaded_at"] = datetime.utcnow()
+        item["arrond"] = int(item.get("arrond", 0)) if item.get("arrond") else None
+
+        for field in ["regpri", "typsta", "nomvoie", "zoneres"]:
+            if field in item and item[field]:
+                item[field] = str(item[field]).strip()
+
+        normalize_fields(item)
+        content = {k: v for k, v in item.items() if k not in ("_id", "_key", "_hash", "loaded_at")}
+        item["_hash"] = hashlib.sha1(json.dumps(content, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+        item["_key"] = str(item["id"]) if item.get("id") is not None else item["_hash"]
+        cleaned_data.append(item)
+
+    return cleaned_data
+
+
+def without_loaded_at(docs):
+    """Documents nettoyés sans l'horodatage (le seul champ qui diffère légitimement)."""
+    return [{k: v for k, v in doc.items() if k != "loaded_at"} for doc in docs]
+
+
+def check_identical(records):
+    """
+    Vérifie que le nettoyage par lots produit exactement les mêmes documents que le
+    nettoyage ligne par ligne d'origine (valeurs, types et empreintes, hors loaded_at).
+    Args:
+        records (List[Dict]): Enregistrements bruts.
+    """
+    expected = without_loaded_at(clean_data_reference(copy.deepcopy(records)))
+    actual, _ = clean_batch(copy.deepcopy(records))
+    actual = without_loaded_at(actual)
+    assert len(actual) == len(expected), "nombre de documents différent"
+    for exp, act in zip(expected, actual):
+        assert exp == act, f"document différent: {exp.get('id')}"
+        assert all(type(exp[k]) is type(act[k]) for k in exp), f"types différents: {exp.get('id')}"
+
+
+def timed(clean, records, batch_size, repeat):
+    """Meilleure durée de nettoyage de tous les lots sur `repeat` essais (copie des lots hors mesure)."""
+    best = float("inf")
+    for _ in range(repeat):
+        batches = [copy.deepcopy(records[i:i + batch_size]) for i in range(0, len(records), batch_size)]
+        start = time.perf_counter()
+        for batch in batches:
+            clean(batch)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(source: str = None, synthetic: int = 0, batch_size: int = 500, repeat: int = 3):
+    """
+    Compare les deux nettoyages sur le jeu complet des emplacements.
+    Args:
+        source (str): Export JSON Lines (URL ou fichier) ; par défaut l'export de l'API.
+        synthetic (int): Nombre d'emplacements fictifs à générer à la place de l'export.
+        batch_size (int): Taille des lots (celle de load_emplacements).
+        repeat (int): Nombre d'essais par implémentation.
+    """
+    fixture = None
+    if synthetic:
+        fd, fixture = tempfile.mkstemp(suffix=".jsonl")
+        os.close(fd)
+        write_fixture(fixture, synthetic)
+        source = fixture
+    try:
+        records = list(EmplacementsFetcher(fetch_mode="export", export_source=source).iter_all_emplacements())
+    finally:
+        if fixture:
+            os.remove(fixture)
+    print(f"📊 {len(records)} emplacements, lots de {batch_size}")
+
+    check_identical(records)
+    print("  ✅ Résultats identiques (hors loaded_at)")
+
+    rows_time = timed(clean_data_reference, records, batch_size, repeat)
+    columns_time = timed(lambda batch: clean_batch(batch)[0], records, batch_size, repeat)
+    print(f"  Ligne par ligne : {rows_time:.2f}s ({len(records) / rows_time:,.0f} docs/s)")
+    print(f"  Par lots        : {columns_time:.2f}s ({len(records) / columns_time:,.0f} docs/s, x{rows_time / columns_time:.1f})")
+
+    # Part des empreintes de contenu (sha1 du JSON de chaque document), calculées document par document
+    cleaned, report = clean_batch(copy.deepcopy(records))
+    start = time.perf_counter()
+    for doc in cleaned:
+        fingerprint(doc)
+    print(f"  dont empreintes : {time.perf_counter() - start:.2f}s")
+    print(f"  Rapport : {report['missing_geo']} sans coordonnées, {report['out_of_bbox']} hors emprise, "
+          f"{report['missing_arrond']} sans arrondissement")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark du nettoyage des emplacements")
+    parser.add_argument("--source", help="Export JSON Lines (URL ou fichier local)")
+    parser.add_argument("--synthetic", type=int, default=0, help="Générer N emplacements fictifs")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    run(args.source, args.synthetic, args.batch_size, args.repeat)
@@ -0,0 +1,68 @@
+import argparse
+import random
+import time
+import numpy as np
+from geopy.distance import geodesic
+from pymongo import MongoClient
+from config import MONGO_URI, DB_NAME, COLLECTION_EMPLACEMENTS
+from app.distance import DistanceEngine
+from app.spatial_index import get_coords
+
+
+def geodesic_loop(coords, user_coords, radius):
+    """Reproduit l'ancienne boucle de filter_by_proximity (un appel geodesic par emplacement)."""
+    return [i for i, point in enumerate(coords) if geodesic(user_coords, point).meters <= radius]
+
+
+def run(nb_queries: int = 10, radius: float = 500, seed: int = 42):
+    """
+    Compare la boucle geodesic et le moteur vectorisé sur tout le jeu des emplacements.
+    Args:
+        nb_queries (int): Nombre de points de recherche tirés au hasard dans Paris.
+        radius (float): Rayon de recherche en mètres.
+        seed (int): Graine du générateur aléatoire.
+    """
+    client = MongoClient(MONGO_URI)
+    emplacements = list(client[DB_NAME][COLLECTION_EMPLACEMENTS].find({}, {"geo_point_2d": 1}))
+    client.close()
+    coords = [point for point in map(get_coords, emplacements) if point is not None]
+    print(f"📊 {len(coords)} emplacements géolocalisés, {nb_queries} requêtes, rayon {radius} m")
+
+    rng = random.Random(seed)
+    queries = [(rng.uniform(48.83, 48.89), rng.uniform(2.28, 2.40)) for _ in range(nb_queries)]
+
+    start = time.perf_counter()
+    reference = [set(geodesic_loop(coords, q, radius)) for q in queries]
+    loop_time = (time.perf_counter() - start) / nb_queries
+    print(f"  Boucle geodesic : {loop_time * 1000:.1f} ms/requête")
+
+    for method in DistanceEngine.METHODS:
+        engine = DistanceEngine([c[0] for c in coords], [c[1] for c in coords], method=method)
+
+        start = time.perf_counter()
+        vectorized = [set(engine.within(lat, lon, radius)[0].tolist()) for lat, lon in queries]
+        vec_time = (time.perf_counter() - start) / nb_queries
+
+        # Erreur de distance par rapport à geodesic, sur un échantillon d'emplacements
+        sample = rng.sample(range(len(coords)), min(2000, len(coords)))
+        errors, relative = [], []
+        for lat, lon in queries:
+            dist = engine.distances(lat, lon)
+            for i in sample:
+                exact = geodesic((lat, lon), coords[i]).meters
+                errors.append(abs(dist[i] - exact))
+                relative.append(abs(dist[i] - exact) / exact if exact else 0.0)
+        errors, relative = np.asarray(errors), np.asarray(relative)
+
+        print(f"\n🔹 Méthode {method}")
+        print(f"  Vectorisé       : {vec_time * 1000:.2f} ms/requête (x{loop_time / vec_time:.0f})")
+        print(f"  Erreur distance : moyenne {errors.mean():.2f} m, max {errors.max():.2f} m ({relative.max() * 100:.3f} %)")
+        print(f"  Résultats identiques : {all(a == b for a, b in zip(vectorized, reference))}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark du calcul de distances")
+    parser.add_argument("--queries", type=int, default=10)
+    parser.add_argument("--radius", type=float, default=500)
+    args = parser.parse_args()
+    run(args.queries, args.radius)
@@ -0,0 +1,73 @@
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from etl.fetch_emplacements import EmplacementsFetcher
+from etl.load_to_mongo import MongoLoader
+from benchmarks.synthetic import SyntheticParis, write_jsonl
+
+
+def write_fixture(path: str, size: int, seed: int = 42):
+    """Écrit un export JSON Lines d'emplacements synthétiques (voir benchmarks.synthetic)."""
+    write_jsonl(path, SyntheticParis(seed).emplacement_pages(size))
+
+
+class NullCollection:
+    """Collection factice qui compte les documents sans les conserver (mesure mémoire hors base)."""
+    def __init__(self):
+        self.count = 0
+
+    def insert_many(self, documents):
+        self.count += len(documents)
+
+
+def load(fixture: str, streamed: bool):
+    """
+    Ingère un export et mesure le pic d'allocation Python.
+    Args:
+        fixture (str): Fichier JSON Lines.
+        streamed (bool): Insérer au fil de la lecture (True) ou tout lire avant d'insérer (False).
+    Returns:
+        Tuple[int, float, float]: Nombre de documents, pic mémoire (Mo), durée (s).
+    """
+    loader = MongoLoader.__new__(MongoLoader)
+    loader.db = {"emplacements": NullCollection()}
+    loader.clean_reports = []
+    fetcher = EmplacementsFetcher(fetch_mode="export", export_source=fixture)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    records = fetcher.iter_all_emplacements()
+    if not streamed:
+        records = list(records)
+    count = loader.insert_batches("emplacements", records, batch_size=500)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] / 1e6
+    tracemalloc.stop()
+    return count, peak, elapsed
+
+
+def run(sizes=(10000, 50000)):
+    """
+    Vérifie l'ingestion d'un export JSON Lines local et compare le pic mémoire
+    d'une ingestion en flux et d'une ingestion après lecture complète.
+    Args:
+        sizes (Iterable[int]): Tailles des exports de test.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            fixture = os.path.join(tmp, f"emplacements_{size}.jsonl")
+            write_fixture(fixture, size)
+            for streamed in (False, True):
+                count, peak, elapsed = load(fixture, streamed)
+                assert count == size
+                mode = "flux" if streamed else "liste"
+                print(f"{size:>8} enregistrements | {mode:>5} | pic {peak:8.1f} Mo | {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de l'ingestion d'un export JSON Lines")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 50000])
+    args = parser.parse_args()
+    run(args.sizes)
@@ -0,0 +1,123 @@
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from etl.concurrent_fetch import ConcurrentFetcher
+from etl.fetch_emplacements import EmplacementsFetcher
+
+
+class FakeOpenDataHandler(BaseHTTPRequestHandler):
+    """Réplique locale du point d'accès /records (limit, offset, total_count).
+    Le serveur ajoute une latence par requête et peut échouer aléatoirement (HTTP 503).
+    """
+    def do_GET(self):
+        server = self.server
+        params = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+        time.sleep(server.latency)
+        if server.failure_rate and random.random() < server.failure_rate:
+            self.send_response(503)
+            self.end_headers()
+            return
+
+        offset, limit = int(params.get("offset", 0)), int(params.get("limit", 10))
+        body = json.dumps({
+            "total_count": server.total,
+            "results": [{"id": str(i), "arrond": i % 20 + 1, "regpri": "PAYANT"}
+                        for i in range(offset, min(offset + limit, server.total))]
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server(total: int, latency: float, failure_rate: float = 0.0) -> ThreadingHTTPServer:
+    """Démarre le serveur de substitution sur un port libre, dans un thread."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOpenDataHandler)
+    server.total, server.latency, server.failure_rate = total, latency, failure_rate
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run(total: int = 5000, page_size: int = 100, latency: float = 0.05, workers=(1, 4, 8), rate_limit: float = 50):
+    """
+    Mesure le débit (pages/s) de la récupération séquentielle et parallèle, puis vérifie
+    la reprise après interruption et la tolérance aux erreurs du serveur.
+    Args:
+        total (int): Nombre d'enregistrements servis.
+        page_size (int): Taille des pages.
+        latency (float): Latence simulée par requête (secondes).
+        workers (Iterable[int]): Nombres de workers testés.
+        rate_limit (float): Limite de débit du fetcher parallèle (requêtes/s).
+    """
+    server = start_server(total, latency)
+    url = f"http://127.0.0.1:{server.server_port}/records"
+    nb_pages = -(-total // page_size)
+
+    print(f"📊 {total} enregistrements, {nb_pages} pages, latence {latency * 1000:.0f} ms")
+    for nb_workers in workers:
+        fetcher = EmplacementsFetcher(api_url=url)
+        start = time.perf_counter()
+        if nb_workers == 1:
+            # Boucle historique, y compris la pause de 0,1 s entre les pages
+            records = fetcher.fetch_all_emplacements(batch_size=page_size, workers=1)
+        else:
+            records = ConcurrentFetcher(url, page_size=page_size, workers=nb_workers,
+                                        rate_limit=rate_limit).fetch_all()
+        elapsed = time.perf_counter() - start
+        assert len(records) == total, f"{len(records)} != {total}"
+        print(f"  {nb_workers:>2} worker(s) : {nb_pages / elapsed:7.1f} pages/s ({elapsed:.2f}s)")
+
+    # Reprise : une première exécution échoue à mi-parcours, la seconde repart du fichier de reprise
+    with tempfile.TemporaryDirectory() as tmp:
+        checkpoint = os.path.join(tmp, "checkpoint.jsonl")
+        fetcher = ConcurrentFetcher(url, page_size=page_size, workers=4, rate_limit=0, checkpoint_path=checkpoint)
+        original_fetch_page = fetcher.fetch_page
+        calls = {"n": 0}
+
+        def flaky_fetch_page(offset):
+            calls["n"] += 1
+            if calls["n"] > nb_pages // 2:
+                raise KeyboardInterrupt("interruption simulée")
+            return original_fetch_page(offset)
+
+        fetcher.fetch_page = flaky_fetch_page
+        try:
+            fetcher.fetch_all()
+        except KeyboardInterrupt:
+            pass
+        fetcher.fetch_page = original_fetch_page
+        records = fetcher.fetch_all()
+        assert [r["id"] for r in records] == [str(i) for i in range(total)]
+        print(f"  Reprise après interruption : OK ({len(records)} enregistrements, fichier supprimé: "
+              f"{not os.path.exists(checkpoint)})")
+
+    server.shutdown()
+
+    # Tolérance aux erreurs : 10 % de réponses 503
+    server = start_server(total, latency=0.0, failure_rate=0.1)
+    url = f"http://127.0.0.1:{server.server_port}/records"
+    records = ConcurrentFetcher(url, page_size=page_size, workers=8, rate_limit=0, backoff=0.01).fetch_all()
+    assert len(records) == total
+    print(f"  Erreurs 503 (10 %) : OK ({len(records)} enregistrements)")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de la récupération des données Open Data")
+    parser.add_argument("--total", type=int, default=5000)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--rate-limit", type=float, default=50)
+    args = parser.parse_args()
+    run(args.total, args.page_size, args.latency, args.workers, args.rate_limit)
@@ -0,0 +1,50 @@
+import argparse
+import gzip
+import json
+import time
+from pymongo import MongoClient
+from config import MONGO_URI, DB_NAME, COLLECTION_EMPLACEMENTS
+from app.map import SEARCH_PROJECTION, ParkingService
+from app.records import Emplacement
+
+
+def measure(func, repeat: int):
+    """Exécute `func` `repeat` fois et retourne (dernier résultat, temps moyen en secondes)."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return result, (time.perf_counter() - start) / repeat
+
+
+def run(sizes=(50, 500, 5000), repeat: int = 3):
+    """
+    Compare la carte Folium générée côté serveur et la réponse GeoJSON compacte.
+    Args:
+        sizes (Iterable[int]): Nombres de résultats testés.
+        repeat (int): Nombre de répétitions par mesure.
+    """
+    client = MongoClient(MONGO_URI)
+    emplacements = Emplacement.from_cursor(
+        client[DB_NAME][COLLECTION_EMPLACEMENTS].find({"geo_point_2d": {"$ne": None}}, SEARCH_PROJECTION).limit(max(sizes)))
+    client.close()
+    service = ParkingService()
+
+    print(f"{'résultats':>10} | {'rendu':>8} | {'temps (ms)':>10} | {'taille (Ko)':>11} | {'gzip (Ko)':>9}")
+    for size in sizes:
+        subset = emplacements[:size]
+        html, html_time = measure(lambda: service.create_map(subset), repeat)
+        payload, geojson_time = measure(
+            lambda: json.dumps(service.to_geojson(subset), separators=(",", ":"), ensure_ascii=False), repeat)
+
+        for name, body, elapsed in (("folium", html, html_time), ("geojson", payload, geojson_time)):
+            raw = body.encode("utf-8")
+            print(f"{len(subset):>10} | {name:>8} | {elapsed * 1000:>10.1f} | "
+                  f"{len(raw) / 1024:>11.1f} | {len(gzip.compress(raw)) / 1024:>9.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark du rendu des résultats (Folium vs GeoJSON)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 500, 5000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    run(args.sizes, args.repeat)
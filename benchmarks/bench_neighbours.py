@@ -0,0 +1,64 @@
+import argparse
+import math
+import time
+import numpy as np
+from etl.neighbours import haversine_many, neighbour_pairs
+
+# Emprise et volume approximatifs du jeu des emplacements parisiens
+PARIS_LAT = (48.815, 48.902)
+PARIS_LON = (2.224, 2.470)
+PARIS_SIZE = 150000
+
+
+def synthetic_points(size: int, seed: int = 42):
+    """
+    Tire des points uniformes à densité constante : l'emprise s'étend avec le nombre de points
+    (celle de Paris pour PARIS_SIZE points), de sorte que chaque point a en moyenne le même
+    nombre de voisins quelle que soit la taille.
+    """
+    rng = np.random.default_rng(seed)
+    scale = math.sqrt(size / PARIS_SIZE)
+    lat_span = (PARIS_LAT[1] - PARIS_LAT[0]) * scale
+    lon_span = (PARIS_LON[1] - PARIS_LON[0]) * scale
+    lats = PARIS_LAT[0] + rng.random(size) * lat_span
+    lons = PARIS_LON[0] + rng.random(size) * lon_span
+    return lats, lons
+
+
+def check_brute_force(size: int = 3000, radius: float = 50):
+    """Compare la jointure sur grille au produit cartésien complet (ce que faisait la requête Cypher)."""
+    rng = np.random.default_rng(0)
+    lats = 48.85 + rng.random(size) * 0.003
+    lons = 2.33 + rng.random(size) * 0.005
+    found = set()
+    for first, second, _ in neighbour_pairs(lats, lons, radius, chunk_size=500):
+        found.update(zip(np.minimum(first, second).tolist(), np.maximum(first, second).tolist()))
+    distances = haversine_many(lats[:, None], lons[:, None], lats[None, :], lons[None, :])
+    expected = set(zip(*(a.tolist() for a in np.nonzero(np.triu(distances < radius, 1)))))
+    assert found == expected, f"{len(found)} couples trouvés, {len(expected)} attendus"
+    print(f"  ✅ Identique au produit cartésien ({size} points, {len(expected)} couples)")
+
+
+def run(sizes=(10000, 100000, 1000000), radius: float = 50):
+    """
+    Mesure la recherche des couples PROCHE_DE pour plusieurs volumes à densité constante.
+    Args:
+        sizes: Nombres de points à tester.
+        radius (float): Distance maximale en mètres.
+    """
+    check_brute_force(radius=radius)
+    for size in sizes:
+        lats, lons = synthetic_points(size)
+        start = time.perf_counter()
+        count = sum(len(first) for first, _, _ in neighbour_pairs(lats, lons, radius))
+        elapsed = time.perf_counter() - start
+        print(f"  {size:>9,} points : {count:>10,} couples en {elapsed:.2f}s "
+              f"({elapsed / size * 1e6:.2f} µs/point, produit cartésien : {size * (size - 1) // 2:,} couples)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de la recherche des couples PROCHE_DE")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--radius", type=float, default=50)
+    args = parser.parse_args()
+    run(args.sizes, args.radius)
@@ -0,0 +1,87 @@
+import argparse
+import time
+from neo4j import GraphDatabase
+from config import NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD, COLLECTION_EMPLACEMENTS
+from etl.load_to_neo4j import Neo4jLoader
+from .synthetic import synthetic_emplacements
+
+# Requête d'origine : un MERGE complet par emplacement, en auto-commit
+LEGACY_QUERY = """
+MERGE (arr:Arrondissement {name: $arrond})
+ON CREATE SET arr.number = toInteger($arrond)
+MERGE (reg:Reglement {name: $regpri})
+ON CREATE SET reg.description = $regpri
+MERGE (typ:Type {name: $typsta})
+ON CREATE SET typ.category = $typsta
+MERGE (zone:Zone {name: $zoneres})
+ON CREATE SET zone.code = $zoneres
+MERGE (voie:Voie {name: $nomvoie})
+ON CREATE SET voie.full_name = $nomvoie
+MERGE (emp:Emplacement {id: $emp_id})
+ON CREATE SET
+    emp.places_calcul = $placal,
+    emp.surface = $surface,
+    emp.signalisation_verticale = $signvert,
+    emp.date_releve = $datereleve,
+    emp.latitude = $lat,
+    emp.longitude = $lon
+MERGE (emp)-[:SITUE_DANS]->(arr)
+MERGE (emp)-[:SOUMIS_A]->(reg)
+MERGE (emp)-[:DE_TYPE]->(typ)
+MERGE (emp)-[:DANS_ZONE]->(zone)
+MERGE (emp)-[:SUR_VOIE]->(voie)
+MERGE (zone)-[:APPARTIENT_A]->(arr)
+MERGE (voie)-[:TRAVERSE]->(arr)
+"""
+
+
+class ListCollection:
+    """Collection factice servant une liste de documents (find ignore filtre et projection)."""
+    def __init__(self, documents):
+        self.documents = documents
+
+    def find(self, *args, **kwargs):
+        return iter(self.documents)
+
+
+def run(size: int = 5000, batch_size: int = 2000):
+    """
+    Compare le chargement d'origine (une requête par emplacement) et le chargement par lots.
+    Attention : vide la base Neo4j configurée (NEO4J_URI) avant chaque mesure.
+    Args:
+        size (int): Nombre d'emplacements synthétiques.
+        batch_size (int): Nombre d'emplacements par transaction.
+    """
+    documents = synthetic_emplacements(size)
+    loader = Neo4jLoader.__new__(Neo4jLoader)
+    loader.driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+    loader.db = {COLLECTION_EMPLACEMENTS: ListCollection(documents)}
+    print(f"📊 {size} emplacements synthétiques")
+    try:
+        loader.clean_database()
+        loader.create_constraints()
+        start = time.perf_counter()
+        with loader.driver.session() as session:
+            for document in documents:
+                session.run(LEGACY_QUERY, loader._emplacement_row(document)).consume()
+        legacy_time = time.perf_counter() - start
+
+        loader.clean_database()
+        start = time.perf_counter()
+        loader.load_nodes(batch_size=batch_size)
+        batched_time = time.perf_counter() - start
+
+        print(f"  Une requête par emplacement : {legacy_time:.1f}s ({size / legacy_time:,.0f} emplacements/s)")
+        print(f"  UNWIND par lots de {batch_size} : {batched_time:.1f}s "
+              f"({size / batched_time:,.0f} emplacements/s, x{legacy_time / batched_time:.0f})")
+    finally:
+        loader.clean_database()
+        loader.driver.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark du chargement du graphe Neo4j (vide la base configurée)")
+    parser.add_argument("--size", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=2000)
+    args = parser.parse_args()
+    run(args.size, args.batch_size)
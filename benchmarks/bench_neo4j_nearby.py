@@ -0,0 +1,100 @@
+import argparse
+import random
+import statistics
+import time
+from neo4j import GraphDatabase
+from config import NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD, COLLECTION_EMPLACEMENTS
+from app.neo4j_queries import Neo4jQueries
+from etl.load_to_neo4j import Neo4jLoader
+from benchmarks.bench_neighbours import synthetic_points
+from benchmarks.bench_neo4j_load import ListCollection
+from benchmarks.synthetic import synthetic_emplacements
+
+# Requête d'origine : point.distance calculé sur tous les nœuds Emplacement
+LEGACY_QUERY = """
+MATCH (emp:Emplacement)
+WHERE emp.latitude IS NOT NULL AND emp.longitude IS NOT NULL
+AND point.distance(
+    point({latitude: $lat, longitude: $lon}),
+    point({latitude: emp.latitude, longitude: emp.longitude})
+) < $radius
+MATCH (emp)-[:DE_TYPE]->(typ:Type)
+MATCH (emp)-[:SOUMIS_A]->(reg:Reglement)
+MATCH (emp)-[:SUR_VOIE]->(voie:Voie)
+RETURN emp.id as id, voie.name as voie, typ.name as type, reg.name as reglement,
+       emp.places_calcul as places, emp.latitude as lat, emp.longitude as lon,
+       point.distance(
+           point({latitude: $lat, longitude: $lon}),
+           point({latitude: emp.latitude, longitude: emp.longitude})
+       ) as distance
+ORDER BY distance ASC
+LIMIT 20
+"""
+
+
+def latency(call, arguments):
+    """Exécute `call` pour chaque jeu d'arguments ; retourne les latences médiane et p95 en ms."""
+    timings = []
+    for args in arguments:
+        start = time.perf_counter()
+        call(*args)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.95) - 1]
+
+
+def run(sizes=(10000, 100000, 1000000), nb_queries: int = 50, radius: float = 100, legacy_max: int = 100000):
+    """
+    Mesure la latence de la recherche de proximité sur des graphes synthétiques.
+    Attention : vide la base Neo4j configurée (NEO4J_URI) avant chaque taille.
+    Args:
+        sizes: Nombres d'emplacements synthétiques.
+        nb_queries (int): Nombre de requêtes par mesure.
+        radius (float): Rayon de recherche en mètres.
+        legacy_max (int): Taille au-delà de laquelle la requête d'origine (balayage complet) n'est plus mesurée.
+    """
+    driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+    loader = Neo4jLoader.__new__(Neo4jLoader)
+    loader.driver = driver
+    queries = Neo4jQueries(driver=driver)
+    rng = random.Random(42)
+    try:
+        for size in sizes:
+            documents = synthetic_emplacements(size)
+            lats, lons = synthetic_points(size)
+            for document, lat, lon in zip(documents, lats.tolist(), lons.tolist()):
+                document["geo_point_2d"] = {"lat": lat, "lon": lon}
+            loader.db = {COLLECTION_EMPLACEMENTS: ListCollection(documents)}
+
+            loader.clean_database()
+            loader.create_constraints()
+            with driver.session() as session:
+                session.run("CALL db.awaitIndexes(300)").consume()
+            loader.load_nodes()
+            loader.create_proximity_relationships()
+
+            sample = rng.sample(documents, nb_queries)
+            points = [(d["geo_point_2d"]["lat"], d["geo_point_2d"]["lon"], radius) for d in sample]
+            print(f"\n📊 {size:,} emplacements, {nb_queries} requêtes, rayon {radius:g} m")
+            if size <= legacy_max:
+                def legacy(lat, lon, r):
+                    with driver.session() as session:
+                        session.run(LEGACY_QUERY, lat=lat, lon=lon, radius=r).data()
+                print("  Balayage complet (origine) : médiane {:.1f} ms, p95 {:.1f} ms".format(*latency(legacy, points)))
+            print("  Index de points            : médiane {:.1f} ms, p95 {:.1f} ms".format(
+                *latency(queries.get_nearby_alternatives, points)))
+            print("  Voisins PROCHE_DE          : médiane {:.1f} ms, p95 {:.1f} ms".format(
+                *latency(queries.get_nearby_alternatives_for, [(d["id"],) for d in sample])))
+    finally:
+        loader.clean_database()
+        driver.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de la recherche de proximité Neo4j (vide la base configurée)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--radius", type=float, default=100)
+    parser.add_argument("--legacy-max", type=int, default=100000)
+    args = parser.parse_args()
+    run(args.sizes, args.queries, args.radius, args.legacy_max)
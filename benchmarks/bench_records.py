@@ -0,0 +1,99 @@
+import argparse
+import time
+import tracemalloc
+import bson
+from bson import ObjectId
+from etl.cleaning import clean_batch
+from app.map import SEARCH_PROJECTION, ParkingService
+from app.records import Emplacement
+from .synthetic import synthetic_emplacements
+
+
+def encode_results(size: int, projected: bool) -> bytes:
+    """
+    Encode en BSON les documents d'une réponse MongoDB, tels que le pilote les reçoit.
+    Args:
+        size (int): Nombre de documents.
+        projected (bool): Documents réduits aux champs de SEARCH_PROJECTION.
+    Returns:
+        bytes: Documents BSON concaténés (décodés par bson.decode_all comme un lot de curseur).
+    """
+    documents = clean_batch(synthetic_emplacements(size))[0]
+    encoded = []
+    for doc in documents:
+        doc = dict(doc, _id=ObjectId())
+        if projected:
+            doc = {field: doc[field] for field in SEARCH_PROJECTION if SEARCH_PROJECTION[field] and field in doc}
+        encoded.append(bson.encode(doc))
+    return b"".join(encoded)
+
+
+def measure(build, consume, repeat: int):
+    """
+    Mesure la construction des résultats (mémoire retenue, pic, nombre d'allocations) puis leur lecture.
+    Returns:
+        Tuple[float, float, int, float, float]: Retenu (Ko), pic (Ko), blocs alloués, construction (ms), lecture (ms).
+    """
+    tracemalloc.start()
+    results = build()
+    retained, peak = tracemalloc.get_traced_memory()
+    blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+    tracemalloc.stop()
+    del results
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        results = build()
+    build_time = (time.perf_counter() - start) / repeat
+    start = time.perf_counter()
+    for _ in range(repeat):
+        consume(results)
+    return retained / 1024, peak / 1024, blocks, build_time * 1000, (time.perf_counter() - start) / repeat * 1000
+
+
+def legacy_geojson(emplacements):
+    """to_geojson d'origine, sur des dictionnaires (appels .get répétés)."""
+    features = []
+    for emp in emplacements:
+        geo_point = emp.get("geo_point_2d")
+        if not geo_point or "lat" not in geo_point or "lon" not in geo_point:
+            continue
+        features.append({
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": [round(geo_point["lon"], 6), round(geo_point["lat"], 6)]},
+            "properties": {field: emp.get(field) for field in ("regpri", "typsta", "placal")}
+        })
+    return features
+
+
+def run(sizes=(500, 50000), repeat: int = 5):
+    """
+    Compare, pour des recherches de 500 et 50 000 résultats, les documents complets (avant la
+    projection), les documents projetés et les enregistrements Emplacement construits
+    depuis le même curseur projeté : mémoire retenue, pic, allocations et temps de lecture (GeoJSON).
+    Args:
+        sizes (Iterable[int]): Nombres de résultats.
+        repeat (int): Nombre de répétitions des mesures de temps.
+    """
+    service = ParkingService()
+    print(f"{'résultats':>9} | {'format':>9} | {'retenu (Ko)':>11} | {'pic (Ko)':>9} | {'blocs':>8} | "
+          f"{'décodage (ms)':>13} | {'GeoJSON (ms)':>12}")
+    for size in sizes:
+        full, projected = encode_results(size, False), encode_results(size, True)
+        cases = (
+            ("complet", lambda: bson.decode_all(full), legacy_geojson),
+            ("projeté", lambda: bson.decode_all(projected), legacy_geojson),
+            ("records", lambda: Emplacement.from_cursor(bson.decode_all(projected)), service.to_geojson),
+        )
+        for name, build, consume in cases:
+            retained, peak, blocks, build_time, read_time = measure(build, consume, repeat)
+            print(f"{size:>9} | {name:>9} | {retained:>11.0f} | {peak:>9.0f} | {blocks:>8} | "
+                  f"{build_time:>13.1f} | {read_time:>12.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark mémoire et allocations des résultats de recherche")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500, 50000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run(args.sizes, args.repeat)
@@ -0,0 +1,154 @@
+import argparse
+import multiprocessing
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from collections import namedtuple
+from pymongo import MongoClient
+from config import MONGO_URI, DB_NAME, COLLECTION_EMPLACEMENTS, PROXIMITY_RADIUS
+from etl.cleaning import clean_batch
+from etl.snapshot import SNAPSHOT_PROJECTION, write_snapshot
+from app.map import ParkingService
+from app.snapshot import ParkingSnapshot, SnapshotHolder
+from app.spatial_index import SpatialIndex
+from .synthetic import synthetic_emplacements
+
+# Filtres des recherches sans adresse (celles avec adresse utilisent les mêmes filtres autour d'un point)
+SAMPLE_FILTERS = [{}, {"arrondissement": "11"}, {"regpri": "payant"}, {"typsta": "epi", "arrondissement": "5"},
+                  {"nomvoie": "rivoli"}]
+
+Location = namedtuple("Location", ["latitude", "longitude"])
+
+
+def memory_mb() -> dict:
+    """
+    Mémoire du processus courant (Linux) : RSS, et PSS qui répartit les pages partagées
+    (instantané mmap) entre les processus qui les utilisent.
+    Returns:
+        dict: {"rss": Mo, "pss": Mo}.
+    """
+    values = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            name, _, rest = line.partition(":")
+            if name in ("Rss", "Pss"):
+                values[name.lower()] = int(rest.split()[0]) / 1024
+    return values
+
+
+def sample_queries(count: int, seed: int = 7):
+    """Tire des recherches : un tiers par adresse (point dans Paris), le reste par filtres."""
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        filters = dict(rng.choice(SAMPLE_FILTERS))
+        point = (rng.uniform(48.83, 48.88), rng.uniform(2.28, 2.39)) if rng.random() < 1 / 3 else None
+        queries.append((filters, point))
+    return queries
+
+
+def load_documents(source: str, size: int):
+    """Documents emplacements nettoyés : synthétiques, ou lus dans la collection MongoDB."""
+    if source == "mongo":
+        client = MongoClient(MONGO_URI)
+        documents = list(client[DB_NAME][COLLECTION_EMPLACEMENTS].find({}, SNAPSHOT_PROJECTION))
+        client.close()
+        return documents
+    return clean_batch(synthetic_emplacements(size))[0]
+
+
+def dict_search(documents, index, service, filters, point, limit):
+    """Recherche sur des dictionnaires Python (comportement du mode mémoire avant l'instantané)."""
+    query = service.build_query(filters)
+    equal = {field: value for field, value in query.items() if not isinstance(value, dict)}
+    prefix = query.get("nomvoie_words", {}).get("$regex", "^")[1:].replace("\\", "")
+
+    def keep(emp):
+        return (all(emp.get(field) == value for field, value in equal.items())
+                and (not prefix or any(word.startswith(prefix) for word in emp.get("nomvoie_words", ()))))
+
+    if point:
+        return [emp for _, emp in index.query_radius(*point, PROXIMITY_RADIUS) if keep(emp)][:limit]
+    return [emp for emp in documents if keep(emp)][:limit]
+
+
+def worker(mode: str, source: str, size: int, directory: str, queries, limit: int, results):
+    """Processus servant les recherches dans un mode donné ; renvoie sa mémoire et ses latences."""
+    service = ParkingService()
+    if mode == "dicts":
+        documents = load_documents(source, size)
+        index = SpatialIndex().build(documents)
+        search = lambda filters, point: dict_search(documents, index, service, filters, point, limit)
+    elif mode == "snapshot":
+        snapshot = ParkingSnapshot.open(directory)
+        search = lambda filters, point: (snapshot.near(*point, PROXIMITY_RADIUS, filters, limit) if point
+                                         else snapshot.page(filters, limit))
+    else:
+        service.snapshot = SnapshotHolder("")
+        # L'adresse est directement le point tiré : pas de géocodage dans la mesure
+        service.geocoder.geocode = lambda address: Location(*address)
+        search = lambda filters, point: service.search_page(dict(filters, address=point) if point else filters, limit)[0]
+
+    latencies = []
+    for filters, point in queries:
+        start = time.perf_counter()
+        search(filters, point)
+        latencies.append(time.perf_counter() - start)
+    results.put((mode, memory_mb(), latencies))
+
+
+def run(source: str = "synthetic", size: int = 150000, workers: int = 4, queries: int = 200, limit: int = 500,
+        modes=("dicts", "snapshot")):
+    """
+    Compare la mémoire par worker et la latence des recherches : MongoDB, dictionnaires en mémoire
+    (mode mémoire avant l'instantané) et instantané colonnaire partagé en mmap.
+    Args:
+        source (str): "synthetic" ou "mongo" (documents de la collection configurée).
+        size (int): Nombre d'emplacements synthétiques.
+        workers (int): Nombre de processus par mode (comme des workers gunicorn).
+        queries (int): Nombre de recherches par worker.
+        limit (int): Nombre maximum de résultats par recherche.
+        modes (Iterable[str]): Modes mesurés parmi "mongo", "dicts" et "snapshot".
+    """
+    directory = tempfile.mkdtemp(prefix="snapshot-")
+    try:
+        start = time.perf_counter()
+        documents = load_documents(source, size)
+        path = write_snapshot(documents, directory, "bench")
+        print(f"📊 {len(documents)} emplacements, instantané écrit en {time.perf_counter() - start:.1f}s ({path})")
+        del documents
+
+        sample = sample_queries(queries)
+        context = multiprocessing.get_context("fork")
+        print(f"{'mode':>9} | {'RSS/worker (Mo)':>15} | {'PSS/worker (Mo)':>15} | {'p50 (ms)':>8} | {'p95 (ms)':>8}")
+        for mode in modes:
+            results = context.Queue()
+            processes = [context.Process(target=worker, args=(mode, source, size, directory, sample, limit, results))
+                         for _ in range(workers)]
+            for process in processes:
+                process.start()
+            measures = [results.get() for _ in processes]
+            for process in processes:
+                process.join()
+            latencies = sorted(latency for _, _, worker_latencies in measures for latency in worker_latencies)
+            rss = statistics.mean(memory["rss"] for _, memory, _ in measures)
+            pss = statistics.mean(memory["pss"] for _, memory, _ in measures)
+            p95 = latencies[int(len(latencies) * 0.95) - 1]
+            print(f"{mode:>9} | {rss:>15.1f} | {pss:>15.1f} | {statistics.median(latencies) * 1000:>8.2f} | "
+                  f"{p95 * 1000:>8.2f}")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de l'instantané colonnaire (mémoire par worker, latence)")
+    parser.add_argument("--source", choices=["synthetic", "mongo"], default="synthetic")
+    parser.add_argument("--size", type=int, default=150000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=500)
+    parser.add_argument("--modes", nargs="+", choices=["mongo", "dicts", "snapshot"], default=["dicts", "snapshot"])
+    args = parser.parse_args()
+    run(args.source, args.size, args.workers, args.queries, args.limit, args.modes)
@@ -0,0 +1,361 @@
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from collections import namedtuple
+import mongomock
+import requests
+from mongomock.filtering import filter_applies
+from etl.cleaning import clean_batch
+from .synthetic import synthetic_emplacements
+
+# Paramètres des serveurs lancés par le test de charge (lus dans chaque worker)
+SIZE_ENV = "LOAD_TEST_SIZE"
+MONGO_LATENCY_ENV = "LOAD_TEST_MONGO_LATENCY"
+GEOCODE_LATENCY_ENV = "LOAD_TEST_GEOCODE_LATENCY"
+
+Location = namedtuple("Location", ["latitude", "longitude"])
+
+
+class StandInCollection:
+    """Collection simulée en mémoire, servie sans coût notable pour le worker (comme un serveur MongoDB distant).
+    Les filtres sont évalués par mongomock, sur les seuls documents de l'arrondissement demandé
+    (comme l'index (arrond, _key)) et mémorisés ; $geoNear est émulé par un calcul vectorisé des distances.
+    """
+    def __init__(self, documents: list):
+        from app.distance import DistanceEngine
+
+        self.documents = documents
+        self.by_arrond = {}
+        for doc in documents:
+            self.by_arrond.setdefault(doc.get("arrond"), []).append(doc)
+        located = [doc for doc in documents if "location" in doc]
+        self.without_location = [doc for doc in documents if "location" not in doc]
+        self.engine, self.located = DistanceEngine.from_emplacements(located)
+        self._results = {}
+
+    def find(self, query: dict = None) -> list:
+        query = query or {}
+        key = repr(query)
+        results = self._results.get(key)
+        if results is None:
+            if query.get("location") == {"$exists": False}:
+                candidates = self.without_location
+            elif isinstance(query.get("arrond"), int):
+                candidates = self.by_arrond.get(query["arrond"], [])
+            else:
+                candidates = self.documents
+            results = self._results[key] = [doc for doc in candidates if filter_applies(query, doc)]
+        return results
+
+    def geo_near(self, pipeline: list) -> list:
+        """
+        Émule un pipeline $geoNear (produit par ParkingService.near_pipeline) : distances des
+        documents ayant un champ `location`, puis étapes $match, $sort et $limit.
+        Args:
+            pipeline (list): Pipeline d'agrégation.
+        Returns:
+            list: Documents, avec leur distance.
+        """
+        stage = pipeline[0]["$geoNear"]
+        lon, lat = stage["near"]["coordinates"]
+        results = []
+        if self.located:
+            indices, distances = self.engine.within(lat, lon, stage["maxDistance"])
+            results = [dict(self.located[i], distance=distance)
+                       for i, distance in zip(indices.tolist(), distances.tolist())
+                       if distance >= stage.get("minDistance", 0) and filter_applies(stage["query"], self.located[i])]
+        for stage in pipeline[1:]:
+            if "$match" in stage:
+                results = [doc for doc in results if filter_applies(stage["$match"], doc)]
+            elif "$sort" in stage:
+                results.sort(key=lambda doc: tuple(doc.get(field) for field in stage["$sort"]))
+            elif "$limit" in stage:
+                results = results[:stage["$limit"]]
+        return results
+
+    def aggregate(self, pipeline: list) -> list:
+        if "$geoNear" in pipeline[0]:
+            return self.geo_near(pipeline)
+        key = repr(pipeline)
+        if key not in self._results:
+            collection = mongomock.MongoClient().db.stand_in
+            collection.insert_many([dict(doc) for doc in self.documents])
+            self._results[key] = list(collection.aggregate(pipeline))
+        return self._results[key]
+
+
+class StandInCursor:
+    """Curseur sur des résultats simulés (sort, limit), itérable ou lu par `await to_list()` après `latency` secondes."""
+    def __init__(self, documents: list, latency: float = 0):
+        self.documents = documents
+        self.latency = latency
+
+    def sort(self, field: str, direction: int = 1):
+        self.documents = sorted(self.documents, key=lambda doc: doc.get(field), reverse=direction < 0)
+        return self
+
+    def limit(self, limit: int):
+        self.documents = self.documents[:limit]
+        return self
+
+    def __iter__(self):
+        return iter(self.documents)
+
+    async def to_list(self, length=None):
+        await asyncio.sleep(self.latency)
+        return list(self.documents)
+
+
+class LatentCollection:
+    """Accès synchrone à une collection simulée : chaque requête attend `latency` secondes (aller-retour réseau)."""
+    def __init__(self, collection: StandInCollection, latency: float):
+        self.collection = collection
+        self.latency = latency
+
+    def find_one(self, query: dict = None, projection=None):
+        time.sleep(self.latency)
+        return next(iter(self.collection.find(query)), None)
+
+    def find(self, query: dict = None, projection=None):
+        time.sleep(self.latency)
+        return StandInCursor(self.collection.find(query))
+
+    def aggregate(self, pipeline: list):
+        time.sleep(self.latency)
+        return iter(self.collection.aggregate(pipeline))
+
+
+class AsyncLatentCollection:
+    """Équivalent asynchrone de LatentCollection (API asynchrone de PyMongo) : l'attente ne bloque pas la boucle."""
+    def __init__(self, collection: StandInCollection, latency: float):
+        self.collection = collection
+        self.latency = latency
+
+    async def find_one(self, query: dict = None, projection=None):
+        await asyncio.sleep(self.latency)
+        return next(iter(self.collection.find(query)), None)
+
+    def find(self, query: dict = None, projection=None):
+        return StandInCursor(self.collection.find(query), self.latency)
+
+    async def aggregate(self, pipeline: list):
+        return StandInCursor(self.collection.aggregate(pipeline), self.latency)
+
+
+class LatentDatabase:
+    """Base simulée : collections enveloppées par `wrapper` (accès synchrone ou asynchrone)."""
+    def __init__(self, collections: dict, wrapper, latency: float):
+        self.collections = collections
+        self.wrapper = wrapper
+        self.latency = latency
+
+    def __getitem__(self, name: str):
+        return self.wrapper(self.collections.setdefault(name, StandInCollection([])), self.latency)
+
+
+class StandInConnections:
+    """Remplace le registre des connexions : mêmes collections simulées en accès synchrone et asynchrone."""
+    def __init__(self, collections: dict, latency: float):
+        self.db = LatentDatabase(collections, LatentCollection, latency)
+        self.async_db = LatentDatabase(collections, AsyncLatentCollection, latency)
+
+
+class LatentGeolocator:
+    """Géolocalisateur simulé : point de Paris déterministe par adresse, après `latency` secondes."""
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def geocode(self, address: str):
+        time.sleep(self.latency)
+        rng = random.Random(address)
+        return Location(rng.uniform(48.83, 48.88), rng.uniform(2.28, 2.39))
+
+
+def stand_in_service(service):
+    """
+    Branche un ParkingService sur les bases simulées (paramètres lus dans l'environnement).
+    Args:
+        service (ParkingService): Service de l'application servie.
+    Returns:
+        StandInConnections: Connexions simulées.
+    """
+    from config import COLLECTION_EMPLACEMENTS, COLLECTION_METADATA
+
+    size = int(os.getenv(SIZE_ENV, 20000))
+    collections = {
+        COLLECTION_EMPLACEMENTS: StandInCollection(clean_batch(synthetic_emplacements(size))[0]),
+        COLLECTION_METADATA: StandInCollection([{"_id": "mongo", "version": "load-test"}])
+    }
+    connections = StandInConnections(collections, float(os.getenv(MONGO_LATENCY_ENV, 0.005)))
+    service.connections = connections
+    service.geocoder.geolocator = LatentGeolocator(float(os.getenv(GEOCODE_LATENCY_ENV, 0.05)))
+    service.geocoder.store = None
+    service.geocoder._gazetteer_loader = None
+    # Facettes du formulaire calculées au démarrage du worker (agrégation $facet de mongomock, lente)
+    service.get_facets()
+    return connections
+
+
+def sync_app():
+    """Application Flask (app.main) servie par les bases simulées."""
+    from app import main
+
+    stand_in_service(main.parking_service)
+    return main.app
+
+
+def async_app():
+    """Application Quart (app.async_main) servie par les bases simulées."""
+    from app import async_main
+
+    async_main.async_service.connections = stand_in_service(async_main.parking_service)
+    return async_main.app
+
+
+def __getattr__(name: str):
+    # Cibles des serveurs : gunicorn benchmarks.load_test:wsgi / hypercorn benchmarks.load_test:asgi
+    factories = {"wsgi": sync_app, "asgi": async_app}
+    if name not in factories:
+        raise AttributeError(name)
+    app = globals()[name] = factories[name]()
+    return app
+
+
+def sample_request(rng: random.Random):
+    """
+    Tire une requête : un tiers de recherches par adresse (géocodage puis $geoNear et requête de
+    repli), un tiers de recherches par filtres en GeoJSON, un tiers de pages de recherche.
+    Returns:
+        Tuple[str, str, dict]: Méthode, chemin et paramètres.
+    """
+    draw = rng.random()
+    if draw < 1 / 3:
+        return "GET", "/api/emplacements", {"address": f"{rng.randint(1, 200000)} rue de test", "limit": 100}
+    filters = {"arrondissement": str(rng.randint(1, 20)), "regpri": rng.choice(["PAYANT", "GRATUIT", "LIVRAISON"])}
+    if draw < 2 / 3:
+        return "GET", "/api/emplacements", dict(filters, limit=100)
+    return "POST", "/search", filters
+
+
+def generate_load(base_url: str, concurrency: int, duration: float, seed: int = 7) -> dict:
+    """
+    Envoie des requêtes depuis `concurrency` clients pendant `duration` secondes.
+    Returns:
+        dict: Nombre de requêtes, erreurs, débit (req/s) et latences (s).
+    """
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client(index: int):
+        rng = random.Random(seed + index)
+        session = requests.Session()
+        while time.perf_counter() < deadline:
+            method, path, params = sample_request(rng)
+            start = time.perf_counter()
+            try:
+                if method == "GET":
+                    response = session.get(base_url + path, params=params)
+                else:
+                    response = session.post(base_url + path, data=params)
+                ok = response.status_code == 200
+            except requests.RequestException:
+                ok = False
+            elapsed = time.perf_counter() - start
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors[0] += 1
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    latencies.sort()
+    return {"requests": len(latencies), "errors": errors[0],
+            "throughput": len(latencies) / (time.perf_counter() - start), "latencies": latencies}
+
+
+def wait_until_ready(base_url: str, process: subprocess.Popen, timeout: float = 120):
+    """Attend que le serveur réponde (chargement des données simulées dans chaque worker)."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Le serveur s'est arrêté (code {process.returncode})")
+        try:
+            requests.get(base_url + "/api/geocoding/stats", timeout=1)
+            return
+        except requests.RequestException:
+            time.sleep(0.5)
+    raise RuntimeError(f"Le serveur ne répond pas après {timeout}s")
+
+
+def run(workers: int = 4, threads: int = 1, concurrency: int = 64, duration: float = 20, size: int = 20000,
+        mongo_latency: float = 0.005, geocode_latency: float = 0.05, port: int = 8099, modes=("sync", "async")):
+    """
+    Compare le mode synchrone (gunicorn, app.main) et le mode asynchrone (hypercorn, app.async_main)
+    à nombre de workers égal. Les bases sont simulées dans chaque worker (collections en mémoire avec latence,
+    géocodage simulé) et les caches de recherche désactivés : chaque requête fait ses entrées/sorties.
+    Args:
+        workers (int): Nombre de workers de chaque serveur.
+        threads (int): Threads par worker gunicorn (mode synchrone).
+        concurrency (int): Nombre de clients simultanés.
+        duration (float): Durée de mesure par mode, en secondes.
+        size (int): Nombre d'emplacements simulés.
+        mongo_latency (float): Latence simulée de chaque requête MongoDB, en secondes.
+        geocode_latency (float): Latence simulée d'un géocodage réseau, en secondes.
+        port (int): Port d'écoute des serveurs.
+        modes (Iterable[str]): Modes mesurés parmi "sync" et "async".
+    """
+    bind = f"127.0.0.1:{port}"
+    base_url = f"http://{bind}"
+    commands = {
+        "sync": [sys.executable, "-m", "gunicorn", "-w", str(workers), "--threads", str(threads), "-b", bind,
+                 "benchmarks.load_test:wsgi"],
+        "async": [sys.executable, "-m", "hypercorn", "-w", str(workers), "-b", bind, "benchmarks.load_test:asgi"],
+    }
+    env = dict(os.environ, SEARCH_CACHE_SIZE="0", MAP_RENDERER="geojson", SNAPSHOT_DIR="", GEO_SEARCH_MODE="mongo",
+               **{SIZE_ENV: str(size), MONGO_LATENCY_ENV: str(mongo_latency), GEOCODE_LATENCY_ENV: str(geocode_latency)})
+    print(f"📊 {workers} workers, {concurrency} clients, {duration:.0f}s par mode, {size} emplacements, "
+          f"latences MongoDB {mongo_latency * 1000:.0f} ms / géocodage {geocode_latency * 1000:.0f} ms")
+    print(f"{'mode':>6} | {'requêtes':>8} | {'erreurs':>7} | {'req/s':>7} | {'p50 (ms)':>8} | {'p95 (ms)':>8} | "
+          f"{'p99 (ms)':>8}")
+    for mode in modes:
+        process = subprocess.Popen(commands[mode], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_until_ready(base_url, process)
+            generate_load(base_url, concurrency, min(duration, 3), seed=1)
+            result = generate_load(base_url, concurrency, duration)
+        finally:
+            process.terminate()
+            process.wait()
+        latencies = result["latencies"] or [0.0]
+        p95 = latencies[max(int(len(latencies) * 0.95) - 1, 0)]
+        p99 = latencies[max(int(len(latencies) * 0.99) - 1, 0)]
+        print(f"{mode:>6} | {result['requests']:>8} | {result['errors']:>7} | {result['throughput']:>7.1f} | "
+              f"{statistics.median(latencies) * 1000:>8.1f} | {p95 * 1000:>8.1f} | {p99 * 1000:>8.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Test de charge : mode synchrone (gunicorn) et asynchrone (hypercorn)")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--size", type=int, default=20000)
+    parser.add_argument("--mongo-latency", type=float, default=0.005)
+    parser.add_argument("--geocode-latency", type=float, default=0.05)
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--modes", nargs="+", choices=["sync", "async"], default=["sync", "async"])
+    args = parser.parse_args()
+    run(args.workers, args.threads, args.concurrency, args.duration, args.size, args.mongo_latency,
+        args.geocode_latency, args.port, args.modes)
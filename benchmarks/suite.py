@@ -0,0 +1,342 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+from collections import namedtuple
+from datetime import datetime
+from typing import Callable, Dict, List
+import numpy as np
+from config import MONGO_URI, DB_NAME, COLLECTION_EMPLACEMENTS, PROXIMITY_RADIUS, SEARCH_PAGE_SIZE
+from etl.cleaning import clean_batch
+from etl.load_to_mongo import MongoLoader
+from etl.snapshot import write_snapshot
+from app.map import ParkingService
+from app.records import Emplacement
+from app.snapshot import ParkingSnapshot, SnapshotHolder
+from .synthetic import SyntheticParis, weights_from_collection
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+# Recherches sans adresse mesurées (celles par adresse utilisent des points tirés dans Paris)
+SEARCH_FILTERS = [{"arrondissement": "11"}, {"regpri": "payant"}, {"typsta": "epi", "arrondissement": "5"},
+                  {"nomvoie": "rivoli"}, {"regpri": "livraison", "arrondissement": "3"}]
+
+# Connexions minimales attendues par ParkingService (base de benchmark)
+Connections = namedtuple("Connections", ["db"])
+
+
+def timed(func: Callable, repeat: int, setup: Callable = None) -> Dict[str, float]:
+    """
+    Mesure `func` sur `repeat` exécutions ; `setup` prépare hors mesure l'argument de chaque exécution.
+    Returns:
+        Dict[str, float]: Meilleure et médiane des durées, en millisecondes.
+    """
+    timings = []
+    for _ in range(repeat):
+        argument = setup() if setup else None
+        start = time.perf_counter()
+        func(argument) if setup else func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {"best_ms": min(timings), "median_ms": statistics.median(timings), "runs": repeat}
+
+
+class BenchContext:
+    """Jeu synthétique, base de mesure et paramètres partagés par les benchmarks d'une exécution.
+    Les documents nettoyés et les enregistrements d'une taille sont construits une fois
+    et réutilisés par les benchmarks de cette taille.
+    """
+    def __init__(self, seed: int = 42, distributions: Dict = None, backend: str = "mongomock",
+                 mongo_uri: str = MONGO_URI, repeat: int = 5, queries: int = 20, dirty: float = 0.01):
+        """
+        Args:
+            seed (int): Graine du jeu synthétique.
+            distributions (Dict): Répartitions des régimes et types (voir SyntheticParis).
+            backend (str): "mongomock" (en mémoire) ou "mongo" (mongod local, base <DB_NAME>_bench).
+            mongo_uri (str): URI du mongod pour le backend "mongo".
+            repeat (int): Nombre de répétitions des mesures.
+            queries (int): Nombre de points de recherche par adresse.
+            dirty (float): Fraction d'enregistrements incomplets du jeu nettoyé par le benchmark clean.
+        """
+        self.distributions = distributions or {}
+        self.generator = SyntheticParis(seed, **self.distributions)
+        self.backend = backend
+        self.repeat = repeat
+        self.dirty = dirty
+        if backend == "mongo":
+            from pymongo import MongoClient
+            self.client = MongoClient(mongo_uri)
+        else:
+            import mongomock
+            self.client = mongomock.MongoClient()
+        self.db = self.client[f"{DB_NAME}_bench"]
+        self.client.drop_database(self.db.name)
+        rng = np.random.default_rng(seed)
+        self.points = [tuple(point) for point in np.column_stack(
+            (rng.uniform(48.83, 48.88, queries), rng.uniform(2.28, 2.39, queries))).tolist()]
+        self._size = None
+        self._documents = self._records = None
+        self.inserted = 0
+
+    def documents(self, size: int) -> List[Dict]:
+        """Documents nettoyés (tels que stockés dans MongoDB) du jeu de `size` emplacements."""
+        if self._size != size:
+            self._size, self._records = size, None
+            self._documents = clean_batch([r for page in self.generator.emplacement_pages(size) for r in page])[0]
+        return self._documents
+
+    def records(self, size: int) -> List[Emplacement]:
+        """Enregistrements Emplacement du jeu de `size` emplacements (résultats de recherche)."""
+        documents = self.documents(size)
+        if self._records is None:
+            self._records = Emplacement.from_cursor(doc for doc in documents if doc.get("location"))
+        return self._records
+
+    def raw_pages(self, size: int, dirty: float = None, page_size: int = 500) -> List[List[Dict]]:
+        """Pages d'enregistrements bruts (avant nettoyage), régénérées à chaque appel."""
+        generator = SyntheticParis(self.generator.seed, self.dirty if dirty is None else dirty, **self.distributions)
+        return list(generator.emplacement_pages(size, page_size))
+
+    def service(self) -> ParkingService:
+        """ParkingService servi par la base de mesure (instantané désactivé : requêtes MongoDB)."""
+        service = ParkingService(Connections(self.db))
+        service.snapshot = SnapshotHolder("")
+        return service
+
+    def close(self):
+        self.client.drop_database(self.db.name)
+        self.client.close()
+
+
+def bench_generate(ctx: BenchContext, size: int) -> List[Dict]:
+    """Génération du jeu synthétique brut (à retrancher des mesures d'insertion, qui l'incluent)."""
+    result = timed(lambda: sum(len(page) for page in ctx.generator.emplacement_pages(size)), min(ctx.repeat, 3))
+    return [dict(result, rate=size / result["best_ms"] * 1000, unit="emplacements/s")]
+
+
+def bench_clean(ctx: BenchContext, size: int) -> List[Dict]:
+    """Nettoyage par lots (etl.cleaning.clean_batch) d'enregistrements bruts, dont une fraction incomplète."""
+    result = timed(lambda pages: [clean_batch(page) for page in pages], ctx.repeat, lambda: ctx.raw_pages(size))
+    return [dict(result, rate=size / result["best_ms"] * 1000, unit="docs/s")]
+
+
+def bench_proximity(ctx: BenchContext, size: int) -> List[Dict]:
+    """Filtre de proximité (ParkingService.filter_by_proximity) sur tous les emplacements, par point de recherche."""
+    records, service = ctx.records(size), ParkingService(Connections(ctx.db))
+    result = timed(lambda: [service.filter_by_proximity(records, point, PROXIMITY_RADIUS) for point in ctx.points],
+                   ctx.repeat)
+    return [dict(result, per_query_ms=result["best_ms"] / len(ctx.points), queries=len(ctx.points))]
+
+
+def bench_geojson(ctx: BenchContext, size: int) -> List[Dict]:
+    """Réponse GeoJSON compacte (to_geojson puis json.dumps) d'au plus 5000 résultats."""
+    records, service = ctx.records(size)[:5000], ParkingService(Connections(ctx.db))
+    result = timed(lambda: json.dumps(service.to_geojson(records), separators=(",", ":"), ensure_ascii=False),
+                   ctx.repeat)
+    return [dict(result, results=len(records))]
+
+
+def bench_folium(ctx: BenchContext, size: int) -> List[Dict]:
+    """Carte Folium (ParkingService.create_map) d'une page de résultats."""
+    records, service = ctx.records(size)[:SEARCH_PAGE_SIZE], ParkingService(Connections(ctx.db))
+    result = timed(lambda: service.create_map(records), min(ctx.repeat, 3))
+    return [dict(result, results=len(records))]
+
+
+def bench_snapshot(ctx: BenchContext, size: int) -> List[Dict]:
+    """Écriture de l'instantané colonnaire, puis recherches par filtres et par adresse servies par celui-ci."""
+    directory = tempfile.mkdtemp(prefix="snapshot-")
+    try:
+        documents = ctx.documents(size)
+        write = timed(lambda: write_snapshot(documents, directory, "bench"), min(ctx.repeat, 3))
+        snapshot = ParkingSnapshot.open(directory)
+        pages = timed(lambda: [snapshot.page(filters, SEARCH_PAGE_SIZE) for filters in SEARCH_FILTERS], ctx.repeat)
+        near = timed(lambda: [snapshot.near(*point, PROXIMITY_RADIUS, {}, SEARCH_PAGE_SIZE) for point in ctx.points],
+                     ctx.repeat)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return [dict(write, step="write", rate=size / write["best_ms"] * 1000, unit="docs/s"),
+            dict(pages, step="filters", per_query_ms=pages["best_ms"] / len(SEARCH_FILTERS)),
+            dict(near, step="address", per_query_ms=near["best_ms"] / len(ctx.points))]
+
+
+def bench_insert(ctx: BenchContext, size: int) -> List[Dict]:
+    """
+    Chargement ETL complet d'une collection vide (génération, nettoyage et insert_many en pipeline,
+    voir MongoLoader.insert_pages), index créés au préalable sur un mongod.
+    """
+    loader = MongoLoader.__new__(MongoLoader)
+    loader.db = ctx.db
+
+    def setup():
+        ctx.db.drop_collection(COLLECTION_EMPLACEMENTS)
+        if ctx.backend == "mongo":
+            loader.create_indexes()
+        loader.clean_reports = []
+        return ctx.raw_pages(size, dirty=0.0)
+
+    # Une seule exécution au-delà de 100 000 documents (chaque exécution recharge toute la collection)
+    result = timed(lambda pages: loader.insert_pages(COLLECTION_EMPLACEMENTS, iter(pages), batch_size=500),
+                   1 if size > 100000 else min(ctx.repeat, 3), setup)
+    ctx.inserted = size
+    return [dict(result, rate=size / result["best_ms"] * 1000, unit="docs/s", indexes=ctx.backend == "mongo")]
+
+
+def bench_search(ctx: BenchContext, size: int) -> List[Dict]:
+    """
+    Recherches servies par MongoDB (ParkingService.search_page, instantané désactivé) : par filtres,
+    page suivante par curseur, et par adresse ($geoNear, mongod uniquement).
+    """
+    if ctx.inserted != size:
+        bench_insert(ctx, size)
+    service = ctx.service()
+    first = timed(lambda: [service.search_page(filters, SEARCH_PAGE_SIZE) for filters in SEARCH_FILTERS], ctx.repeat)
+    cursors = [service.search_page(filters, SEARCH_PAGE_SIZE)[1] for filters in SEARCH_FILTERS]
+    following = timed(lambda: [service.search_page(filters, SEARCH_PAGE_SIZE, cursor)
+                               for filters, cursor in zip(SEARCH_FILTERS, cursors) if cursor], ctx.repeat)
+    results = [dict(first, step="filters", per_query_ms=first["best_ms"] / len(SEARCH_FILTERS)),
+               dict(following, step="next_page", per_query_ms=following["best_ms"] / max(1, sum(map(bool, cursors))))]
+    if ctx.backend == "mongo":
+        query = service.build_query({})
+        near = timed(lambda: [service.search_near(point, query, PROXIMITY_RADIUS, SEARCH_PAGE_SIZE)
+                              for point in ctx.points], ctx.repeat)
+        results.append(dict(near, step="address", per_query_ms=near["best_ms"] / len(ctx.points)))
+    else:
+        results.append({"step": "address", "skipped": "$geoNear non pris en charge par mongomock"})
+    return results
+
+
+# Benchmarks disponibles : nom -> (catégorie, fonction)
+BENCHMARKS = {
+    "generate": ("micro", bench_generate),
+    "clean": ("micro", bench_clean),
+    "proximity": ("micro", bench_proximity),
+    "geojson": ("micro", bench_geojson),
+    "folium": ("micro", bench_folium),
+    "snapshot": ("micro", bench_snapshot),
+    "insert": ("macro", bench_insert),
+    "search": ("macro", bench_search),
+}
+
+
+def environment(ctx: BenchContext) -> Dict:
+    """Contexte de l'exécution enregistré avec les résultats (commit, versions, machine, paramètres)."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(RESULTS_DIR)).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.platform(),
+        "cpus": os.cpu_count(),
+        "backend": ctx.backend,
+        "seed": ctx.generator.seed,
+        "repeat": ctx.repeat,
+        "regpri_weights": dict(zip(ctx.generator.regpri, ctx.generator.regpri_p.round(4).tolist())),
+        "typsta_weights": dict(zip(ctx.generator.typsta, ctx.generator.typsta_p.round(4).tolist())),
+    }
+
+
+def compare(results: List[Dict], baseline_path: str):
+    """
+    Affiche l'évolution de chaque mesure par rapport à une exécution précédente (meilleure durée).
+    Args:
+        results (List[Dict]): Résultats de l'exécution courante.
+        baseline_path (str): Fichier JSON d'une exécution précédente.
+    """
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["benchmark"], r["size"], r.get("step")): r for r in json.load(f)["results"]}
+    print(f"\n📈 Comparaison avec {baseline_path}")
+    print(f"{'benchmark':>18} | {'taille':>9} | {'avant (ms)':>10} | {'après (ms)':>10} | {'évolution':>9}")
+    for result in results:
+        key = (result["benchmark"], result["size"], result.get("step"))
+        previous = baseline.get(key)
+        if previous is None or "best_ms" not in result or "best_ms" not in previous:
+            continue
+        change = (result["best_ms"] / previous["best_ms"] - 1) * 100
+        name = result["benchmark"] + (f".{result['step']}" if result.get("step") else "")
+        print(f"{name:>18} | {result['size']:>9} | {previous['best_ms']:>10.1f} | {result['best_ms']:>10.1f} | "
+              f"{change:>+8.1f}%")
+
+
+def run(sizes=(1000, 10000), benchmarks=tuple(BENCHMARKS), backend: str = "mongomock", mongo_uri: str = MONGO_URI,
+        repeat: int = 5, seed: int = 42, weights: str = "default", output: str = None, baseline: str = None) -> str:
+    """
+    Exécute les benchmarks pour chaque taille et enregistre les résultats en JSON.
+    Args:
+        sizes (Iterable[int]): Nombres d'emplacements synthétiques (de 1 000 à 1 000 000).
+        benchmarks (Iterable[str]): Benchmarks à exécuter (voir BENCHMARKS).
+        backend (str): "mongomock" ou "mongo" (mongod local, base <DB_NAME>_bench supprimée à la fin).
+        mongo_uri (str): URI du mongod pour le backend "mongo".
+        repeat (int): Nombre de répétitions des mesures.
+        seed (int): Graine du jeu synthétique.
+        weights (str): "default" (répartitions de benchmarks.synthetic) ou "mongo" (effectifs de la base configurée).
+        output (str): Fichier de résultats (par défaut benchmarks/results/<date>-<backend>.json).
+        baseline (str): Résultats d'une exécution précédente à comparer (optionnel).
+    Returns:
+        str: Chemin du fichier de résultats.
+    """
+    distributions = {}
+    if weights == "mongo":
+        from pymongo import MongoClient
+        client = MongoClient(MONGO_URI)
+        distributions = weights_from_collection(client[DB_NAME]) or {}
+        client.close()
+        if not distributions:
+            print("⚠️ Collection des emplacements vide : répartitions par défaut")
+    ctx = BenchContext(seed, distributions, backend, mongo_uri, repeat)
+
+    results = []
+    try:
+        print(f"{'benchmark':>18} | {'taille':>9} | {'meilleur (ms)':>13} | {'médiane (ms)':>12} | {'débit':>22}")
+        for size in sizes:
+            for name in benchmarks:
+                kind, bench = BENCHMARKS[name]
+                for result in bench(ctx, size):
+                    result = dict(result, benchmark=name, kind=kind, size=size)
+                    results.append(result)
+                    label = name + (f".{result['step']}" if result.get("step") else "")
+                    if "skipped" in result:
+                        print(f"{label:>18} | {size:>9} | ignoré : {result['skipped']}")
+                        continue
+                    rate = (f"{result['rate']:,.0f} {result['unit']}" if "rate" in result
+                            else f"{result['per_query_ms']:.2f} ms/requête" if "per_query_ms" in result else "")
+                    print(f"{label:>18} | {size:>9} | {result['best_ms']:>13.1f} | {result['median_ms']:>12.1f} | "
+                          f"{rate:>22}")
+        meta = environment(ctx)
+    finally:
+        ctx.close()
+
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}-{backend}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({"meta": meta, "results": results}, f, ensure_ascii=False, indent=2)
+    print(f"💾 Résultats enregistrés dans {output}")
+    if baseline:
+        compare(results, baseline)
+    return output
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Suite de benchmarks sur un jeu synthétique d'emplacements parisiens")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--benchmarks", nargs="+", choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument("--backend", choices=["mongomock", "mongo"], default="mongomock")
+    parser.add_argument("--mongo-uri", default=MONGO_URI)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--weights", choices=["default", "mongo"], default="default")
+    parser.add_argument("--output")
+    parser.add_argument("--compare", dest="baseline")
+    args = parser.parse_args()
+    run(args.sizes, args.benchmarks, args.backend, args.mongo_uri, args.repeat, args.seed, args.weights, args.output,
+        args.baseline)
@@ -0,0 +1,311 @@
+import argparse
+import json
+import math
+from typing import Dict, Iterator, List, Optional
+import numpy as np
+
+# Arrondissements : centre approximatif (lat, lon) et superficie bâtie en km² (bois exclus),
+# qui fixe à la fois le rayon du disque de tirage et la part des emplacements
+ARRONDISSEMENTS = {
+    1: (48.8625, 2.3363, 1.83), 2: (48.8683, 2.3428, 0.99), 3: (48.8630, 2.3601, 1.17),
+    4: (48.8543, 2.3576, 1.60), 5: (48.8445, 2.3507, 2.54), 6: (48.8491, 2.3328, 2.15),
+    7: (48.8562, 2.3122, 4.09), 8: (48.8727, 2.3125, 3.88), 9: (48.8770, 2.3375, 2.18),
+    10: (48.8761, 2.3608, 2.89), 11: (48.8591, 2.3800, 3.67), 12: (48.8396, 2.3958, 6.37),
+    13: (48.8283, 2.3623, 7.15), 14: (48.8292, 2.3265, 5.64), 15: (48.8401, 2.2930, 8.48),
+    16: (48.8637, 2.2769, 7.85), 17: (48.8873, 2.3067, 5.67), 18: (48.8925, 2.3484, 6.01),
+    19: (48.8871, 2.3848, 6.79), 20: (48.8634, 2.4012, 5.98)
+}
+
+# Répartition des régimes et types de stationnement (ordre de grandeur du jeu de la Ville de Paris ;
+# remplaçable par les effectifs d'une base chargée, voir weights_from_collection)
+REGPRI_WEIGHTS = {
+    "PAYANT": 0.58, "2 ROUES": 0.14, "LIVRAISON": 0.11, "GIG/GIC": 0.05, "GRATUIT": 0.04,
+    "AUTOLIB": 0.03, "TAXI": 0.01, "AUTOCAR": 0.01, "AUTRE REGIME": 0.03
+}
+TYPSTA_WEIGHTS = {"LONGITUDINAL": 0.77, "EPI": 0.13, "BATAILLE": 0.08, "AUTRE": 0.02}
+
+# Places par emplacement (bornes incluses) et surface d'une place (m²) selon le type de stationnement
+PLACES_RANGE = {"LONGITUDINAL": (1, 6), "EPI": (3, 15), "BATAILLE": (3, 12), "AUTRE": (1, 4)}
+PLACE_SURFACE = {"LONGITUDINAL": 10.0, "EPI": 12.5, "BATAILLE": 12.5, "AUTRE": 10.0}
+
+SIGNVERT_VALUES = ["PANNEAU", "MARQUAGE", "INCONNU"]
+STREET_TYPES = {"RUE": 0.6, "AVENUE": 0.12, "BOULEVARD": 0.1, "PLACE": 0.05, "QUAI": 0.04, "IMPASSE": 0.04,
+                "PASSAGE": 0.03, "VILLA": 0.02}
+STREET_NAMES = [
+    "DE RIVOLI", "SAINT-HONORÉ", "DU FAUBOURG SAINT-ANTOINE", "DE LA ROQUETTE", "OBERKAMPF", "DE BELLEVILLE",
+    "DES PYRÉNÉES", "DE MÉNILMONTANT", "DE CHARONNE", "DE BERCY", "DAUMESNIL", "DE PICPUS", "DE TOLBIAC",
+    "D'ITALIE", "DE LA GLACIÈRE", "DE VAUGIRARD", "LECOURBE", "DE GRENELLE", "SAINT-DOMINIQUE", "DE SÈVRES",
+    "DU BAC", "DE RENNES", "D'ASSAS", "MONGE", "MOUFFETARD", "DES ÉCOLES", "SAINT-JACQUES", "D'ALÉSIA",
+    "DU MAINE", "RAYMOND LOSSERAND", "DE LA CONVENTION", "DE PASSY", "DE LA POMPE", "VICTOR HUGO", "KLÉBER",
+    "DE COURCELLES", "DE LÉVIS", "DES BATIGNOLLES", "DE CLICHY", "LEPIC", "ORDENER", "MARCADET", "DE FLANDRE",
+    "DE CRIMÉE", "SECRÉTAN", "DE LA VILLETTE", "LAFAYETTE", "DE MAUBEUGE", "DES MARTYRS", "DE PROVENCE",
+    "MONTMARTRE", "RÉAUMUR", "DE TURBIGO", "DE BRETAGNE", "VIEILLE DU TEMPLE", "DES ROSIERS", "DE BUCI",
+    "DU CHERCHE-MIDI", "DE LA GAÎTÉ", "DES PLANTES", "DE LA SANTÉ", "CLAUDE BERNARD", "GAY-LUSSAC",
+    "DU CHÂTEAU D'EAU", "DE LANCRY", "DES VINAIGRIERS", "DE PARADIS", "D'HAUTEVILLE", "DES PETITES ÉCURIES",
+    "PARMENTIER", "JEAN-PIERRE TIMBAUD", "VOLTAIRE", "DE LA RÉPUBLIQUE", "GAMBETTA", "DES MARAÎCHERS",
+    "DE BAGNOLET", "D'AVRON", "DE LA PLAINE", "DE REUILLY", "DIDEROT", "LEDRU-ROLLIN", "DE LYON"
+]
+# Nombre de noms de voie par arrondissement (fenêtre glissante dans la liste des noms)
+STREETS_PER_ARROND = 24
+ZONE_LETTERS = "ABCDEF"
+
+# Lignes générées par bloc : chaque bloc a son propre générateur aléatoire, de sorte que
+# les données ne dépendent que de la graine et de la taille, pas de la taille des pages lues
+CHUNK_SIZE = 10000
+METERS_PER_DEGREE = 111320.0
+
+
+class SyntheticParis:
+    """Générateur déterministe d'emplacements et d'emprises de stationnement parisiens.
+    Les points sont tirés uniformément dans un disque par arrondissement (centre et superficie
+    réels), en proportion de sa superficie ; régimes, types, places, surfaces, voies et zones
+    suivent des répartitions proches des données ouvertes. Les enregistrements ont la forme
+    de ceux de l'API (avant nettoyage) et une fraction `dirty` est volontairement incomplète
+    (sans coordonnées, hors emprise, sans arrondissement, espaces parasites) pour exercer le
+    nettoyage. La génération est vectorisée par blocs et tient 1M de lignes sans difficulté.
+    """
+    def __init__(self, seed: int = 42, dirty: float = 0.0, regpri_weights: Dict[str, float] = None,
+                 typsta_weights: Dict[str, float] = None):
+        """
+        Args:
+            seed (int): Graine du jeu de données.
+            dirty (float): Fraction des enregistrements volontairement incomplets.
+            regpri_weights (Dict[str, float]): Répartition des régimes (REGPRI_WEIGHTS par défaut).
+            typsta_weights (Dict[str, float]): Répartition des types (TYPSTA_WEIGHTS par défaut).
+        """
+        self.seed = seed
+        self.dirty = dirty
+        self.regpri, self.regpri_p = self._distribution(regpri_weights or REGPRI_WEIGHTS)
+        self.typsta, self.typsta_p = self._distribution(typsta_weights or TYPSTA_WEIGHTS)
+        self.arronds = np.array(list(ARRONDISSEMENTS), dtype=np.int64)
+        centers = np.array([(lat, lon) for lat, lon, _ in ARRONDISSEMENTS.values()])
+        areas = np.array([area for _, _, area in ARRONDISSEMENTS.values()])
+        self.centers = centers
+        self.arrond_p = areas / areas.sum()
+        self.radii = np.sqrt(areas / math.pi) * 1000
+        self.street_types, self.street_types_p = self._distribution(STREET_TYPES)
+
+    @staticmethod
+    def _distribution(weights: Dict[str, float]):
+        values = list(weights)
+        p = np.array([weights[value] for value in values], dtype=float)
+        return values, p / p.sum()
+
+    def _rng(self, kind: int, chunk: int) -> np.random.Generator:
+        return np.random.default_rng([self.seed, kind, chunk])
+
+    def _columns(self, rng: np.random.Generator, size: int) -> dict:
+        """Colonnes communes aux emplacements et aux emprises (position, régime, type, voie, zone, date)."""
+        arrond_idx = rng.choice(len(self.arronds), size, p=self.arrond_p)
+        # Tirage uniforme dans le disque de l'arrondissement
+        distance = self.radii[arrond_idx] * np.sqrt(rng.random(size))
+        angle = rng.random(size) * 2 * math.pi
+        lats = self.centers[arrond_idx, 0] + distance * np.cos(angle) / METERS_PER_DEGREE
+        lons = self.centers[arrond_idx, 1] + distance * np.sin(angle) / (
+            METERS_PER_DEGREE * np.cos(np.radians(self.centers[arrond_idx, 0])))
+        # Noms voisins d'un arrondissement à l'autre : les voies longues en traversent plusieurs
+        name = (arrond_idx * (len(STREET_NAMES) // len(self.arronds))
+                + rng.integers(0, STREETS_PER_ARROND, size)) % len(STREET_NAMES)
+        street_type = rng.choice(len(self.street_types), size, p=self.street_types_p)
+        days = rng.integers(0, 6 * 365, size)
+        return {
+            "arrond": self.arronds[arrond_idx].tolist(),
+            "lat": np.round(lats, 7).tolist(),
+            "lon": np.round(lons, 7).tolist(),
+            "regpri": [self.regpri[i] for i in rng.choice(len(self.regpri), size, p=self.regpri_p).tolist()],
+            "typsta": [self.typsta[i] for i in rng.choice(len(self.typsta), size, p=self.typsta_p).tolist()],
+            "nomvoie": [f"{self.street_types[t]} {STREET_NAMES[n]}" for t, n in zip(street_type.tolist(), name.tolist())],
+            "zone": rng.integers(0, len(ZONE_LETTERS), size).tolist(),
+            "signvert": [SIGNVERT_VALUES[i] for i in rng.integers(0, len(SIGNVERT_VALUES), size).tolist()],
+            "datereleve": np.datetime_as_string(np.datetime64("2019-01-01") + days, unit="D").tolist(),
+            "defect": np.where(rng.random(size) < self.dirty, rng.integers(1, 5, size), 0).tolist(),
+        }
+
+    @staticmethod
+    def _degrade(record: dict, defect: int):
+        # 1 : sans coordonnées, 2 : hors emprise, 3 : sans arrondissement, 4 : espaces parasites
+        if defect == 1:
+            record["geo_point_2d"] = None
+        elif defect == 2:
+            record["geo_point_2d"] = {"lat": record["geo_point_2d"]["lat"] + 0.5, "lon": record["geo_point_2d"]["lon"]}
+        elif defect == 3:
+            record["arrond"] = None
+        elif defect == 4:
+            record["regpri"] = f" {record['regpri']}  "
+            record["nomvoie"] = f"{record['nomvoie']} "
+
+    def _sizes(self, size: int, page_size: int) -> Iterator[tuple]:
+        """Découpe [0, size) en pages de `page_size` lignes, chacune rattachée à son bloc de génération."""
+        for chunk_start in range(0, size, CHUNK_SIZE):
+            chunk_size = min(CHUNK_SIZE, size - chunk_start)
+            for offset in range(0, chunk_size, page_size):
+                yield chunk_start // CHUNK_SIZE, chunk_start, chunk_size, offset, min(page_size, chunk_size - offset)
+
+    def emplacement_pages(self, size: int, page_size: int = CHUNK_SIZE) -> Iterator[List[Dict]]:
+        """
+        Génère les emplacements par pages, comme EmplacementsFetcher.iter_emplacements_pages.
+        Args:
+            size (int): Nombre total d'emplacements.
+            page_size (int): Nombre d'emplacements par page.
+        Returns:
+            Iterator[List[Dict]]: Pages d'enregistrements bruts.
+        """
+        chunk, records = None, None
+        for index, chunk_start, chunk_size, offset, count in self._sizes(size, page_size):
+            if index != chunk:
+                chunk, records = index, self._emplacements(index, chunk_start, chunk_size)
+            yield records[offset:offset + count]
+
+    def _emplacements(self, chunk: int, start: int, size: int) -> List[Dict]:
+        rng = self._rng(1, chunk)
+        columns = self._columns(rng, size)
+        ranges = np.array([PLACES_RANGE.get(typsta, (1, 6)) for typsta in self.typsta])
+        typsta_idx = np.array([self.typsta.index(typsta) for typsta in columns["typsta"]], dtype=np.int64)
+        placal = rng.integers(ranges[typsta_idx, 0], ranges[typsta_idx, 1] + 1)
+        place_surface = np.array([PLACE_SURFACE.get(typsta, 10.0) for typsta in self.typsta])[typsta_idx]
+        surface = np.round(placal * place_surface * rng.uniform(0.9, 1.1, size), 2)
+
+        records = []
+        for i, (arrond, lat, lon, regpri, typsta, nomvoie, zone, signvert, datereleve, defect, places, area) in enumerate(zip(
+                columns["arrond"], columns["lat"], columns["lon"], columns["regpri"], columns["typsta"],
+                columns["nomvoie"], columns["zone"], columns["signvert"], columns["datereleve"], columns["defect"],
+                placal.tolist(), surface.tolist())):
+            record = {
+                "id": str(start + i),
+                "arrond": arrond,
+                "regpri": regpri,
+                "typsta": typsta,
+                "zoneres": f"{arrond}{ZONE_LETTERS[zone]}",
+                "nomvoie": nomvoie,
+                "placal": places,
+                "surface_calculee": area,
+                "signvert": signvert,
+                "datereleve": datereleve,
+                "geo_point_2d": {"lat": lat, "lon": lon}
+            }
+            if defect:
+                self._degrade(record, defect)
+            records.append(record)
+        return records
+
+    def emprise_pages(self, size: int, page_size: int = CHUNK_SIZE) -> Iterator[List[Dict]]:
+        """
+        Génère les emprises par pages, comme EmprisesFetcher.iter_emprises_pages : portions de
+        voie (LineString de 5 à 60 m) regroupant plusieurs places.
+        Args:
+            size (int): Nombre total d'emprises.
+            page_size (int): Nombre d'emprises par page.
+        Returns:
+            Iterator[List[Dict]]: Pages d'enregistrements bruts.
+        """
+        chunk, records = None, None
+        for index, chunk_start, chunk_size, offset, count in self._sizes(size, page_size):
+            if index != chunk:
+                chunk, records = index, self._emprises(index, chunk_start, chunk_size)
+            yield records[offset:offset + count]
+
+    def _emprises(self, chunk: int, start: int, size: int) -> List[Dict]:
+        rng = self._rng(2, chunk)
+        columns = self._columns(rng, size)
+        length = np.round(rng.uniform(5, 60, size), 2)
+        bearing = rng.random(size) * math.pi
+        half_lat = length / 2 * np.cos(bearing) / METERS_PER_DEGREE
+        half_lon = length / 2 * np.sin(bearing) / (METERS_PER_DEGREE * math.cos(math.radians(48.86)))
+        placal = np.maximum(1, (length / 5.5).astype(np.int64))
+
+        records = []
+        for i, (arrond, lat, lon, regpri, typsta, nomvoie, zone, datereleve, defect, dlat, dlon, places, meters) in enumerate(zip(
+                columns["arrond"], columns["lat"], columns["lon"], columns["regpri"], columns["typsta"],
+                columns["nomvoie"], columns["zone"], columns["datereleve"], columns["defect"],
+                half_lat.tolist(), half_lon.tolist(), placal.tolist(), length.tolist())):
+            record = {
+                "id": f"E{start + i}",
+                "arrond": arrond,
+                "regpri": regpri,
+                "typsta": typsta,
+                "zoneres": f"{arrond}{ZONE_LETTERS[zone]}",
+                "nomvoie": nomvoie,
+                "placal": places,
+                "longueur_calculee": meters,
+                "surface_calculee": round(meters * 2.0, 2),
+                "datereleve": datereleve,
+                "geo_point_2d": {"lat": lat, "lon": lon},
+                "geo_shape": {"type": "LineString", "coordinates": [
+                    [round(lon - dlon, 7), round(lat - dlat, 7)], [round(lon + dlon, 7), round(lat + dlat, 7)]]}
+            }
+            if defect:
+                self._degrade(record, defect)
+            records.append(record)
+        return records
+
+
+def synthetic_emplacements(size: int, seed: int = 42, dirty: float = 0.0) -> List[Dict]:
+    """
+    Génère des emplacements tels que renvoyés par l'API (voir SyntheticParis).
+    Args:
+        size (int): Nombre d'emplacements.
+        seed (int): Graine du jeu de données.
+        dirty (float): Fraction des enregistrements volontairement incomplets.
+    Returns:
+        List[Dict]: Enregistrements bruts (nettoyés par etl.cleaning.clean_batch avant insertion).
+    """
+    return [record for page in SyntheticParis(seed, dirty).emplacement_pages(size) for record in page]
+
+
+def synthetic_emprises(size: int, seed: int = 42, dirty: float = 0.0) -> List[Dict]:
+    """
+    Génère des emprises telles que renvoyées par l'API (voir SyntheticParis).
+    Args:
+        size (int): Nombre d'emprises.
+        seed (int): Graine du jeu de données.
+        dirty (float): Fraction des enregistrements volontairement incomplets.
+    Returns:
+        List[Dict]: Enregistrements bruts.
+    """
+    return [record for page in SyntheticParis(seed, dirty).emprise_pages(size) for record in page]
+
+
+def weights_from_collection(db) -> Optional[Dict[str, Dict[str, float]]]:
+    """
+    Répartitions réelles des régimes et types, lues dans la collection des emplacements chargée par l'ETL.
+    Args:
+        db: Base MongoDB.
+    Returns:
+        Optional[Dict[str, Dict[str, float]]]: {"regpri_weights": ..., "typsta_weights": ...}, ou None si la collection est vide.
+    """
+    from config import COLLECTION_EMPLACEMENTS
+    from app.map import FACETS_PIPELINE, facets_from_result
+
+    facets = facets_from_result(next(db[COLLECTION_EMPLACEMENTS].aggregate(FACETS_PIPELINE), {}))
+    if not facets["regpri"] or not facets["typsta"]:
+        return None
+    return {f"{field}_weights": {facet["value"]: facet["count"] for facet in facets[field]}
+            for field in ("regpri", "typsta")}
+
+
+def write_jsonl(path: str, pages: Iterator[List[Dict]]) -> int:
+    """
+    Écrit des pages d'enregistrements en JSON Lines (format d'export de l'API).
+    Returns:
+        int: Nombre d'enregistrements écrits.
+    """
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for page in pages:
+            for record in page:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            count += len(page)
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Génère un jeu synthétique d'emplacements ou d'emprises (JSON Lines)")
+    parser.add_argument("output")
+    parser.add_argument("--kind", choices=["emplacements", "emprises"], default="emplacements")
+    parser.add_argument("--size", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--dirty", type=float, default=0.01)
+    args = parser.parse_args()
+    generator = SyntheticParis(args.seed, args.dirty)
+    pages = generator.emplacement_pages(args.size) if args.kind == "emplacements" else generator.emprise_pages(args.size)
+    print(f"✅ {write_jsonl(args.output, pages)} {args.kind} écrits dans {args.output}")
@@ -9,17 +9,75 @@ MONGO_URI = os.getenv("MONGO_URI")
 DB_NAME = os.getenv("DB_NAME")
 COLLECTION_EMPRISES = "emprises"
 COLLECTION_EMPLACEMENTS = "emplacements"
+COLLECTION_METADATA = "etl_metadata"
+DATA_VERSION_CHECK_INTERVAL = int(os.getenv("DATA_VERSION_CHECK_INTERVAL", 30))
 
 # Neo4j Configuration
 NEO4J_URI = os.getenv("NEO4J_URI")
 NEO4J_DATABASE = os.getenv("NEO4J_DATABASE")
 NEO4J_USER = os.getenv("NEO4J_USER")
 NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD")
+# Taille maximale des pools de connexions partagés par l'application (app/connections.py)
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", 50))
+NEO4J_MAX_POOL_SIZE = int(os.getenv("NEO4J_MAX_POOL_SIZE", 50))
+# Nombre d'emplacements écrits par transaction lors du chargement du graphe
+NEO4J_BATCH_SIZE = int(os.getenv("NEO4J_BATCH_SIZE", 2000))
+# Distance maximale (mètres) entre deux emplacements reliés par PROCHE_DE
+PROCHE_DE_RADIUS = float(os.getenv("PROCHE_DE_RADIUS", 50))
+# Relations MEME_TYPE/COMPLEMENTAIRE : "query" (déduites à la requête via les nœuds Type/Voie)
+# ou "materialize" (créées par lots, au plus NEO4J_DERIVED_LIMIT par emplacement et par relation)
+NEO4J_DERIVED_RELATIONS = os.getenv("NEO4J_DERIVED_RELATIONS", "query")
+NEO4J_DERIVED_LIMIT = int(os.getenv("NEO4J_DERIVED_LIMIT", 20))
 
 # API Configuration
 API_URL_EMPRISES = "https://opendata.iledefrance.fr/api/explore/v2.1/catalog/datasets/stationnement-sur-voie-publique-emprises/records"
 API_URL_EMPLACEMENTS = "https://opendata.iledefrance.fr/api/explore/v2.1/catalog/datasets/stationnement-sur-voie-publique-emplacements/records"
 
+# Recherche par proximité
+# "mongo" : $geoNear sur l'index 2dsphere ; "memory" : index spatial en mémoire
+GEO_SEARCH_MODE = os.getenv("GEO_SEARCH_MODE", "mongo")
+PROXIMITY_RADIUS = int(os.getenv("PROXIMITY_RADIUS", 500))
+# Nombre d'emplacements par page de résultats (/search)
+SEARCH_PAGE_SIZE = int(os.getenv("SEARCH_PAGE_SIZE", 200))
+SPATIAL_INDEX_CELL_SIZE = int(os.getenv("SPATIAL_INDEX_CELL_SIZE", 250))
+# Instantané colonnaire des emplacements écrit par l'ETL et partagé en mmap par les workers
+# (vide : recherches servies uniquement par MongoDB)
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "data/snapshot")
+
+# Géocodage
+GEOCODE_CACHE_SIZE = int(os.getenv("GEOCODE_CACHE_SIZE", 2048))
+GEOCODE_CACHE_TTL = int(os.getenv("GEOCODE_CACHE_TTL", 24 * 3600))
+GEOCODE_DB_PATH = os.getenv("GEOCODE_DB_PATH", "data/geocode_cache.sqlite")
+GEOCODE_DISK_TTL = int(os.getenv("GEOCODE_DISK_TTL", 30 * 24 * 3600))
+
+# Cartes rendues en mémoire
+MAP_CACHE_SIZE = int(os.getenv("MAP_CACHE_SIZE", 64))
+MAP_CACHE_TTL = int(os.getenv("MAP_CACHE_TTL", 3600))
+# "folium" : carte HTML générée côté serveur ; "geojson" : carte Leaflet alimentée par /api/emplacements
+MAP_RENDERER = os.getenv("MAP_RENDERER", "folium")
+
+# Cache des résultats de recherche et des réponses compressées (/search, /api/emplacements)
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", 256))
+SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", 600))
+# Précision du geohash des recherches par adresse (7 : cellules d'environ 150 m x 150 m à Paris)
+SEARCH_CACHE_GEOHASH_PRECISION = int(os.getenv("SEARCH_CACHE_GEOHASH_PRECISION", 7))
+
+# Durée de mise en cache navigateur de la liste des zones (secondes)
+ZONES_MAX_AGE = int(os.getenv("ZONES_MAX_AGE", 300))
+
+# Récupération des données Open Data
+FETCH_WORKERS = int(os.getenv("FETCH_WORKERS", 4))
+FETCH_RATE_LIMIT = float(os.getenv("FETCH_RATE_LIMIT", 10))
+FETCH_MAX_RETRIES = int(os.getenv("FETCH_MAX_RETRIES", 5))
+FETCH_CHECKPOINT_DIR = os.getenv("FETCH_CHECKPOINT_DIR", "data/checkpoints")
+# "records" : pagination de l'API /records ; "export" : export complet du jeu de données en flux
+FETCH_MODE = os.getenv("FETCH_MODE", "records")
+EXPORT_FORMAT = os.getenv("EXPORT_FORMAT", "jsonl")
+# Nombre de pages/lots en attente entre les étapes du pipeline ETL
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", 4))
+# "swap" : staging + renameCollection ; "incremental" : upserts des différences ; "replace" : vidage puis réinsertion
+MONGO_REFRESH_MODE = os.getenv("MONGO_REFRESH_MODE", "swap")
+
 # Application Configuration
 FLASK_HOST = "127.0.0.1"
 FLASK_PORT = 8080
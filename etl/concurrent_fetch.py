@@ -0,0 +1,263 @@
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Tuple
+import requests
+
+# L'API /records refuse toute requête dont offset + limit dépasse cette fenêtre
+RECORDS_WINDOW = 10000
+
+
+class FetchError(Exception):
+    """Erreur définitive lors de la récupération d'une page de l'API (après toutes les tentatives)."""
+
+
+class RateLimiter:
+    """Limiteur de débit thread-safe : au plus `rate` appels par seconde, répartis régulièrement."""
+    def __init__(self, rate: float):
+        """
+        Args:
+            rate (float): Nombre maximal d'appels par seconde (0 ou moins : pas de limite).
+        """
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """Bloque jusqu'à ce qu'un nouvel appel soit autorisé."""
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next, now)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def get_json(session: requests.Session, url: str, params: Dict, max_retries: int = 5, backoff: float = 0.5,
+             timeout: float = 30, rate_limiter: Optional[RateLimiter] = None) -> Dict:
+    """
+    Requête GET décodée en JSON, réessayée avec un backoff exponentiel.
+    Args:
+        session (requests.Session): Session HTTP.
+        url (str): URL du point d'accès.
+        params (Dict): Paramètres de la requête.
+        max_retries (int): Nombre de tentatives supplémentaires.
+        backoff (float): Délai initial (secondes) avant une nouvelle tentative, doublé à chaque échec.
+        timeout (float): Délai maximal d'une requête HTTP en secondes.
+        rate_limiter (Optional[RateLimiter]): Limiteur de débit partagé (optionnel).
+    Returns:
+        Dict: Réponse décodée.
+    Raises:
+        FetchError: Si toutes les tentatives ont échoué.
+    """
+    for attempt in range(max_retries + 1):
+        if rate_limiter:
+            rate_limiter.wait()
+        try:
+            response = session.get(url, params=params, timeout=timeout)
+            response.raise_for_status()
+            return response.json()
+        except (requests.RequestException, ValueError) as e:
+            if attempt == max_retries:
+                raise FetchError(f"Échec après {attempt + 1} tentatives ({params}): {e}") from e
+            delay = backoff * 2 ** attempt * (1 + random.random() / 2)
+            print(f"  ⚠️  Tentative {attempt + 1} échouée ({params}): {e}, nouvel essai dans {delay:.1f}s")
+            time.sleep(delay)
+
+
+class Checkpoint:
+    """Fichier de reprise au format JSON Lines.
+    La première ligne décrit le jeu de données (URL, nombre total, taille de page) ;
+    chaque ligne suivante contient une page déjà récupérée. Une exécution interrompue
+    repart des pages manquantes.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def load(self, header: Dict) -> Dict[int, List[Dict]]:
+        """
+        Relit les pages déjà récupérées si le fichier correspond au même jeu de données.
+        Args:
+            header (Dict): Description attendue (URL, nombre total, taille de page).
+        Returns:
+            Dict[int, List[Dict]]: Enregistrements par offset.
+        """
+        pages = {}
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                lines = iter(f)
+                try:
+                    saved_header = json.loads(next(lines))
+                except (StopIteration, ValueError):
+                    saved_header = None
+                if saved_header == header:
+                    for line in lines:
+                        try:
+                            page = json.loads(line)
+                        except ValueError:
+                            # Dernière ligne tronquée par l'interruption
+                            break
+                        pages[page["offset"]] = page["records"]
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(header) + "\n")
+            for offset, records in pages.items():
+                f.write(json.dumps({"offset": offset, "records": records}, default=str) + "\n")
+        return pages
+
+    def save_page(self, offset: int, records: List[Dict]):
+        """Ajoute une page récupérée au fichier de reprise."""
+        line = json.dumps({"offset": offset, "records": records}, default=str) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+    def remove(self):
+        """Supprime le fichier de reprise une fois la récupération terminée."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class ConcurrentFetcher:
+    """Récupération parallèle et reprenable d'un jeu de données de l'API Open Data (Opendatasoft v2.1).
+    Le nombre total d'enregistrements est demandé d'abord, puis les fenêtres d'offset sont
+    récupérées en parallèle par un pool de threads, sous une limite de débit commune.
+    Chaque page est réessayée avec un backoff exponentiel ; un échec définitif lève FetchError
+    au lieu de tronquer silencieusement le jeu de données.
+    L'API /records limite offset + limit à RECORDS_WINDOW : au-delà, utiliser l'export du jeu de données.
+    """
+    def __init__(self, api_url: str, page_size: int = 100, workers: int = 4, rate_limit: float = 10.0,
+                 max_retries: int = 5, backoff: float = 0.5, checkpoint_path: Optional[str] = None,
+                 params: Optional[Dict] = None, timeout: float = 30):
+        """
+        Args:
+            api_url (str): URL du point d'accès /records.
+            page_size (int): Nombre d'enregistrements par page.
+            workers (int): Nombre de requêtes simultanées.
+            rate_limit (float): Nombre maximal de requêtes par seconde.
+            max_retries (int): Nombre de tentatives supplémentaires par page.
+            backoff (float): Délai initial (secondes) avant une nouvelle tentative, doublé à chaque échec.
+            checkpoint_path (Optional[str]): Fichier de reprise (optionnel).
+            params (Optional[Dict]): Paramètres de requête additionnels (where...).
+            timeout (float): Délai maximal d'une requête HTTP en secondes.
+        """
+        self.api_url = api_url
+        self.page_size = page_size
+        self.workers = workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.params = params or {}
+        self.timeout = timeout
+        self.rate_limiter = RateLimiter(rate_limit)
+        self.checkpoint = Checkpoint(checkpoint_path) if checkpoint_path else None
+        self._local = threading.local()
+
+    @property
+    def session(self) -> requests.Session:
+        """Session HTTP propre à chaque thread du pool."""
+        if not hasattr(self._local, "session"):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def _get(self, params: Dict) -> Dict:
+        return get_json(self.session, self.api_url, dict(self.params, **params), self.max_retries, self.backoff,
+                        self.timeout, self.rate_limiter)
+
+    def fetch_total_count(self) -> int:
+        """
+        Returns:
+            int: Nombre total d'enregistrements annoncé par l'API.
+        """
+        return int(self._get({"limit": 0}).get("total_count", 0))
+
+    def fetch_page(self, offset: int) -> List[Dict]:
+        """
+        Récupère une page d'enregistrements.
+        Args:
+            offset (int): Décalage de la page.
+        Returns:
+            List[Dict]: Enregistrements de la page.
+        """
+        return self._get({"limit": self.page_size, "offset": offset}).get("results", [])
+
+    def iter_pages(self, total: Optional[int] = None) -> Iterator[Tuple[int, List[Dict]]]:
+        """
+        Récupère le jeu de données page par page, en reprenant depuis le fichier de reprise s'il existe.
+        Au plus 2 × workers requêtes sont en cours ou en attente de consommation : la mémoire
+        reste bornée si le consommateur (insertion MongoDB) est plus lent que l'API.
+        Args:
+            total (Optional[int]): Nombre total d'enregistrements, s'il est déjà connu (demandé à l'API sinon).
+        Returns:
+            Iterator[Tuple[int, List[Dict]]]: Couples (offset, enregistrements), dans l'ordre d'arrivée.
+        Raises:
+            FetchError: Si le jeu de données dépasse la fenêtre de /records, ou si une page échoue définitivement.
+        """
+        if total is None:
+            total = self.fetch_total_count()
+        if total > RECORDS_WINDOW:
+            raise FetchError(f"{total} enregistrements : /records ne sert que les {RECORDS_WINDOW} premiers, "
+                             f"utiliser l'export du jeu de données (FETCH_MODE=export)")
+        offsets = list(range(0, total, self.page_size))
+        done_offsets = set()
+        if self.checkpoint:
+            header = {"api_url": self.api_url, "params": self.params, "total_count": total, "page_size": self.page_size}
+            saved = self.checkpoint.load(header)
+            if saved:
+                print(f"↩️  Reprise : {len(saved)}/{len(offsets)} pages déjà récupérées")
+            for offset, records in saved.items():
+                done_offsets.add(offset)
+                yield offset, records
+            del saved
+
+        remaining = iter([offset for offset in offsets if offset not in done_offsets])
+        start = time.perf_counter()
+        fetched = 0
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            pending = {}
+            for offset in islice(remaining, 2 * self.workers):
+                pending[executor.submit(self.fetch_page, offset)] = offset
+            while pending:
+                completed, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in completed:
+                    offset = pending.pop(future)
+                    try:
+                        records = future.result()
+                    except FetchError:
+                        # Les pages déjà récupérées restent dans le fichier de reprise
+                        for other in pending:
+                            other.cancel()
+                        raise
+                    if self.checkpoint:
+                        self.checkpoint.save_page(offset, records)
+                    fetched += 1
+                    done_offsets.add(offset)
+                    if fetched % 10 == 0 or len(done_offsets) == len(offsets):
+                        elapsed = time.perf_counter() - start
+                        print(f"Récupéré {len(done_offsets)}/{len(offsets)} pages ({fetched / elapsed:.1f} pages/s)...")
+                    yield offset, records
+                    for next_offset in islice(remaining, 1):
+                        pending[executor.submit(self.fetch_page, next_offset)] = next_offset
+
+        if self.checkpoint:
+            self.checkpoint.remove()
+
+    def fetch_all(self, total: Optional[int] = None) -> List[Dict]:
+        """
+        Récupère tout le jeu de données, en reprenant depuis le fichier de reprise s'il existe.
+        Args:
+            total (Optional[int]): Nombre total d'enregistrements, s'il est déjà connu (demandé à l'API sinon).
+        Returns:
+            List[Dict]: Enregistrements dans l'ordre des offsets.
+        """
+        pages = dict(self.iter_pages(total))
+        return [record for offset in sorted(pages) for record in pages[offset]]
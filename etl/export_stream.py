@@ -0,0 +1,106 @@
+import json
+import os
+import tempfile
+from typing import Dict, Iterable, Iterator, Optional
+from urllib.parse import urlparse
+import requests
+
+EXPORT_FORMATS = ("jsonl", "parquet")
+
+
+def export_url(records_url: str, fmt: str = "jsonl") -> str:
+    """
+    Déduit l'URL d'export d'un jeu de données à partir de son point d'accès /records.
+    Args:
+        records_url (str): URL .../datasets/<id>/records.
+        fmt (str): Format d'export ("jsonl" ou "parquet").
+    Returns:
+        str: URL .../datasets/<id>/exports/<fmt>.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Format d'export non supporté: {fmt}")
+    base = records_url.rstrip("/")
+    if base.endswith("/records"):
+        base = base[:-len("/records")]
+    return f"{base}/exports/{fmt}"
+
+
+def iter_jsonl(lines: Iterable) -> Iterator[Dict]:
+    """
+    Décode des lignes JSON une à une.
+    Args:
+        lines (Iterable[str | bytes]): Lignes au format JSON Lines.
+    Returns:
+        Iterator[Dict]: Enregistrements décodés (les lignes vides sont ignorées).
+    """
+    for line in lines:
+        if line and line.strip():
+            yield json.loads(line)
+
+
+def iter_parquet(path: str, batch_size: int = 1000) -> Iterator[Dict]:
+    """
+    Lit un fichier Parquet par lots de lignes.
+    Args:
+        path (str): Chemin du fichier Parquet.
+        batch_size (int): Nombre de lignes décodées à la fois.
+    Returns:
+        Iterator[Dict]: Enregistrements décodés.
+    """
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Le format parquet nécessite pyarrow (pip install pyarrow)") from e
+
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+        yield from batch.to_pylist()
+
+
+def _local_path(source: str) -> Optional[str]:
+    parsed = urlparse(source)
+    if parsed.scheme == "file":
+        return parsed.path
+    if parsed.scheme in ("", None) and os.path.exists(source):
+        return source
+    return None
+
+
+def stream_export(source: str, fmt: str = "jsonl", session: requests.Session = None,
+                  params: Optional[Dict] = None, timeout: float = 60) -> Iterator[Dict]:
+    """
+    Parcourt un export complet enregistrement par enregistrement, sans le charger en mémoire.
+    En JSON Lines, la réponse HTTP est décodée au fil de l'eau. En Parquet, le format exige
+    un accès aléatoire : la réponse est écrite par blocs dans un fichier temporaire puis lue par lots.
+    Args:
+        source (str): URL d'export, chemin local ou URL file:// (fichiers de test).
+        fmt (str): Format d'export ("jsonl" ou "parquet").
+        session (requests.Session): Session HTTP à utiliser (optionnelle).
+        params (Optional[Dict]): Paramètres de requête (where, select...).
+        timeout (float): Délai maximal de connexion/lecture en secondes.
+    Returns:
+        Iterator[Dict]: Enregistrements de l'export.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Format d'export non supporté: {fmt}")
+
+    path = _local_path(source)
+    if path is not None:
+        if fmt == "parquet":
+            yield from iter_parquet(path)
+        else:
+            with open(path, "rb") as f:
+                yield from iter_jsonl(f)
+        return
+
+    session = session or requests.Session()
+    with session.get(source, params=params, stream=True, timeout=timeout) as response:
+        response.raise_for_status()
+        if fmt == "jsonl":
+            yield from iter_jsonl(response.iter_lines())
+            return
+
+        with tempfile.NamedTemporaryFile(suffix=".parquet") as tmp:
+            for chunk in response.iter_content(chunk_size=1 << 20):
+                tmp.write(chunk)
+            tmp.flush()
+            yield from iter_parquet(tmp.name)
@@ -1,12 +1,29 @@
+import os
 import requests
 import time
-from typing import List, Dict, Optional
-from config import API_URL_EMPLACEMENTS
+from itertools import chain
+from typing import Iterator, List, Dict, Optional
+from config import (API_URL_EMPLACEMENTS, FETCH_WORKERS, FETCH_RATE_LIMIT, FETCH_MAX_RETRIES, FETCH_CHECKPOINT_DIR,
+                    FETCH_MODE, EXPORT_FORMAT)
+from .concurrent_fetch import RECORDS_WINDOW, ConcurrentFetcher, get_json
+from .export_stream import export_url, stream_export
+from .pipeline import chunked
 
 class EmplacementsFetcher:
-    def __init__(self, api_url: str = API_URL_EMPLACEMENTS):
+    def __init__(self, api_url: str = API_URL_EMPLACEMENTS, fetch_mode: str = FETCH_MODE,
+                 export_format: str = EXPORT_FORMAT, export_source: Optional[str] = None):
+        """
+        Args:
+            api_url (str): L'URL du point d'accès /records.
+            fetch_mode (str): "records" (pagination de /records) ou "export" (export complet en flux).
+            export_format (str): Format de l'export ("jsonl" ou "parquet").
+            export_source (Optional[str]): URL ou fichier local de l'export (déduit de api_url par défaut).
+        """
         self.api_url = api_url
         self.session = requests.Session()
+        self.fetch_mode = fetch_mode
+        self.export_format = export_format
+        self.export_source = export_source or export_url(api_url, export_format)
 
     def fetch_emplacements(self, limit: Optional[int] = None, offset: int = 0, filters: Dict = None) -> List[Dict]:
         params = {"offset": offset}
@@ -27,14 +44,31 @@ class EmplacementsFetcher:
             if where_clauses:
                 params["where"] = " AND ".join(where_clauses)
 
-        try:
-            response = self.session.get(self.api_url, params=params)
-            response.raise_for_status()
-            data = response.json()
-            return data.get("results", [])
-        except requests.RequestException as e:
-            print(f"Erreur lors de la récupération des emplacements: {e}")
-            return []
+        # Un échec définitif lève FetchError : une page vide marquerait à tort la fin des données
+        return get_json(self.session, self.api_url, params, max_retries=FETCH_MAX_RETRIES).get("results", [])
+
+    def count_emplacements(self) -> int:
+        """
+        Returns:
+            int: Nombre total d'emplacements annoncé par l'API.
+        Raises:
+            FetchError: Si la requête échoue après toutes les tentatives.
+        """
+        return int(get_json(self.session, self.api_url, {"limit": 0}, max_retries=FETCH_MAX_RETRIES)
+                   .get("total_count", 0))
+
+    def _exceeds_records_window(self, total: int) -> bool:
+        """
+        Indique si le jeu de données dépasse la fenêtre de pagination de /records (RECORDS_WINDOW).
+        Args:
+            total (int): Nombre total d'emplacements annoncé par l'API (voir count_emplacements).
+        Returns:
+            bool: True si les emplacements doivent être récupérés par l'export.
+        """
+        if total > RECORDS_WINDOW:
+            print(f"↪️  {total} emplacements : au-delà des {RECORDS_WINDOW} servis par /records, récupération par l'export")
+            return True
+        return False
 
     """
     Récupère tous les emplacements en effectuant des requêtes par lots.
@@ -42,23 +76,53 @@ class EmplacementsFetcher:
     successives avec un paramètre de taille de lot (batch_size).
     Cette approche est utile pour éviter de surcharger le serveur avec une seule requête massive
     et pour gérer les limites d'API ou de mémoire.
+    Avec plusieurs workers, les pages sont récupérées en parallèle par ConcurrentFetcher
+    (limite de débit, nouvelles tentatives et fichier de reprise).
     
     Args:
         batch_size (int): Nombre d'emplacements à récupérer par requête.
+        workers (int): Nombre de requêtes simultanées (1 : récupération séquentielle).
+        total (Optional[int]): Nombre total annoncé par l'API, s'il est déjà connu (demandé sinon).
     Returns:
         List[Dict]: Liste de tous les emplacements récupérés.
     """
-    def fetch_all_emplacements(self, batch_size: int = 100) -> List[Dict]:
+    def fetch_all_emplacements(self, batch_size: int = 100, workers: int = FETCH_WORKERS,
+                               total: Optional[int] = None) -> List[Dict]:
+        if self.fetch_mode != "export" and total is None:
+            total = self.count_emplacements()
+        if self.fetch_mode == "export" or self._exceeds_records_window(total):
+            return list(self.iter_export_emplacements())
+        if workers > 1:
+            return self._concurrent_fetcher(batch_size, workers).fetch_all(total)
+
         all_emplacements = []
+        for page in self._iter_record_pages(batch_size):
+            all_emplacements.extend(page)
+
+        return all_emplacements
+
+    def _concurrent_fetcher(self, batch_size: int, workers: int) -> ConcurrentFetcher:
+        return ConcurrentFetcher(
+            self.api_url,
+            page_size=batch_size,
+            workers=workers,
+            rate_limit=FETCH_RATE_LIMIT,
+            max_retries=FETCH_MAX_RETRIES,
+            checkpoint_path=os.path.join(FETCH_CHECKPOINT_DIR, "emplacements.jsonl")
+        )
+
+    def _iter_record_pages(self, batch_size: int) -> Iterator[List[Dict]]:
         offset = 0
+        total = 0
 
         while True:
             batch = self.fetch_emplacements(limit=batch_size, offset=offset)
             if not batch:
                 break
 
-            all_emplacements.extend(batch)
-            print(f"Récupéré {len(all_emplacements)} emplacements...")
+            total += len(batch)
+            print(f"Récupéré {total} emplacements...")
+            yield batch
 
             if len(batch) < batch_size:
                 break
@@ -66,7 +130,44 @@ class EmplacementsFetcher:
             offset += batch_size
             time.sleep(0.1)
 
-        return all_emplacements
+    def iter_emplacements_pages(self, batch_size: int = 100, workers: int = FETCH_WORKERS,
+                                total: Optional[int] = None) -> Iterator[List[Dict]]:
+        """
+        Parcourt les emplacements page par page, selon le mode de récupération configuré :
+        export en flux, pages parallèles (ConcurrentFetcher) ou pagination séquentielle.
+        Les pages sont produites au fur et à mesure, sans attendre la fin de la récupération.
+        Args:
+            batch_size (int): Nombre d'enregistrements par page.
+            workers (int): Nombre de requêtes simultanées (mode "records").
+            total (Optional[int]): Nombre total annoncé par l'API, s'il est déjà connu (demandé sinon).
+        Returns:
+            Iterator[List[Dict]]: Pages d'enregistrements.
+        """
+        if self.fetch_mode != "export" and total is None:
+            total = self.count_emplacements()
+        if self.fetch_mode == "export" or self._exceeds_records_window(total):
+            return chunked(self.iter_export_emplacements(), batch_size)
+        if workers > 1:
+            return (records for _, records in self._concurrent_fetcher(batch_size, workers).iter_pages(total))
+        return self._iter_record_pages(batch_size)
+
+    def iter_export_emplacements(self) -> Iterator[Dict]:
+        """
+        Parcourt l'export complet des emplacements en une seule requête HTTP,
+        décodé enregistrement par enregistrement.
+        Returns:
+            Iterator[Dict]: Emplacements de l'export.
+        """
+        return stream_export(self.export_source, fmt=self.export_format, session=self.session)
+
+    def iter_all_emplacements(self) -> Iterator[Dict]:
+        """
+        Parcourt tous les emplacements selon le mode de récupération configuré.
+        Les enregistrements sont produits page par page, au fil de la récupération.
+        Returns:
+            Iterator[Dict]: Emplacements récupérés.
+        """
+        return chain.from_iterable(self.iter_emplacements_pages())
 
     def get_unique_values(self, field: str) -> List[str]:
         try:
@@ -1,18 +1,31 @@
+import os
 import requests
 import time
-from typing import List, Dict, Optional
-from config import API_URL_EMPRISES
+from itertools import chain
+from typing import Iterator, List, Dict, Optional
+from config import (API_URL_EMPRISES, FETCH_WORKERS, FETCH_RATE_LIMIT, FETCH_MAX_RETRIES, FETCH_CHECKPOINT_DIR,
+                    FETCH_MODE, EXPORT_FORMAT)
+from .concurrent_fetch import RECORDS_WINDOW, ConcurrentFetcher, get_json
+from .export_stream import export_url, stream_export
+from .pipeline import chunked
 
 class EmprisesFetcher:
-    def __init__(self, api_url: str = API_URL_EMPRISES):
+    def __init__(self, api_url: str = API_URL_EMPRISES, fetch_mode: str = FETCH_MODE,
+                 export_format: str = EXPORT_FORMAT, export_source: Optional[str] = None):
         """
         Initialise le récupérateur d'emprises avec l'URL de l'API.
 
         Args:
             api_url (str): L'URL de l'API pour récupérer les emprises.
+            fetch_mode (str): "records" (pagination de /records) ou "export" (export complet en flux).
+            export_format (str): Format de l'export ("jsonl" ou "parquet").
+            export_source (Optional[str]): URL ou fichier local de l'export (déduit de api_url par défaut).
         """
         self.api_url = api_url
         self.session = requests.Session()
+        self.fetch_mode = fetch_mode
+        self.export_format = export_format
+        self.export_source = export_source or export_url(api_url, export_format)
 
     def fetch_emprises(self, limit: Optional[int] = None, offset: int = 0, filters: Dict = None) -> List[Dict]:
         """
@@ -25,6 +38,9 @@ class EmprisesFetcher:
 
         Returns:
             List[Dict]: Liste des emprises récupérées.
+
+        Raises:
+            FetchError: Si la requête échoue après toutes les tentatives.
         """
         params = {"offset": offset}
         if limit:
@@ -40,35 +56,82 @@ class EmprisesFetcher:
                 else:
                     params["where"] = regpri_filter
 
-        try:
-            response = self.session.get(self.api_url, params=params)
-            response.raise_for_status()
-            data = response.json()
-            return data.get("results", [])
-        except requests.RequestException as e:
-            print(f"Erreur lors de la récupération des emprises: {e}")
-            return []
+        # Un échec définitif lève FetchError : une page vide marquerait à tort la fin des données
+        return get_json(self.session, self.api_url, params, max_retries=FETCH_MAX_RETRIES).get("results", [])
+
+    def count_emprises(self) -> int:
+        """
+        Returns:
+            int: Nombre total d'emprises annoncé par l'API.
+        Raises:
+            FetchError: Si la requête échoue après toutes les tentatives.
+        """
+        return int(get_json(self.session, self.api_url, {"limit": 0}, max_retries=FETCH_MAX_RETRIES)
+                   .get("total_count", 0))
+
+    def _exceeds_records_window(self, total: int) -> bool:
+        """
+        Indique si le jeu de données dépasse la fenêtre de pagination de /records (RECORDS_WINDOW).
+        Args:
+            total (int): Nombre total d'emprises annoncé par l'API (voir count_emprises).
+        Returns:
+            bool: True si les emprises doivent être récupérées par l'export.
+        """
+        if total > RECORDS_WINDOW:
+            print(f"↪️  {total} emprises : au-delà des {RECORDS_WINDOW} servis par /records, récupération par l'export")
+            return True
+        return False
 
-    def fetch_all_emprises(self, batch_size: int = 100) -> List[Dict]:
+    def fetch_all_emprises(self, batch_size: int = 100, workers: int = FETCH_WORKERS,
+                           total: Optional[int] = None) -> List[Dict]:
         """
         Récupère toutes les emprises par batches.
+        Avec plusieurs workers, les pages sont récupérées en parallèle par ConcurrentFetcher
+        (limite de débit, nouvelles tentatives et fichier de reprise).
 
         Args:
             batch_size (int): Taille des batches pour la récupération des données.
+            workers (int): Nombre de requêtes simultanées (1 : récupération séquentielle).
+            total (Optional[int]): Nombre total annoncé par l'API, s'il est déjà connu (demandé sinon).
 
         Returns:
             List[Dict]: Liste complète des emprises récupérées.
         """
+        if self.fetch_mode != "export" and total is None:
+            total = self.count_emprises()
+        if self.fetch_mode == "export" or self._exceeds_records_window(total):
+            return list(self.iter_export_emprises())
+        if workers > 1:
+            return self._concurrent_fetcher(batch_size, workers).fetch_all(total)
+
         all_emprises = []
+        for page in self._iter_record_pages(batch_size):
+            all_emprises.extend(page)
+
+        return all_emprises
+
+    def _concurrent_fetcher(self, batch_size: int, workers: int) -> ConcurrentFetcher:
+        return ConcurrentFetcher(
+            self.api_url,
+            page_size=batch_size,
+            workers=workers,
+            rate_limit=FETCH_RATE_LIMIT,
+            max_retries=FETCH_MAX_RETRIES,
+            checkpoint_path=os.path.join(FETCH_CHECKPOINT_DIR, "emprises.jsonl")
+        )
+
+    def _iter_record_pages(self, batch_size: int) -> Iterator[List[Dict]]:
         offset = 0
+        total = 0
 
         while True:
             batch = self.fetch_emprises(limit=batch_size, offset=offset)
             if not batch:
                 break
 
-            all_emprises.extend(batch)
-            print(f"Récupéré {len(all_emprises)} emprises...")
+            total += len(batch)
+            print(f"Récupéré {total} emprises...")
+            yield batch
 
             if len(batch) < batch_size:
                 break
@@ -76,4 +139,45 @@ class EmprisesFetcher:
             offset += batch_size
             time.sleep(0.1)  # Éviter de surcharger l'API
 
-        return all_emprises
+    def iter_emprises_pages(self, batch_size: int = 100, workers: int = FETCH_WORKERS,
+                            total: Optional[int] = None) -> Iterator[List[Dict]]:
+        """
+        Parcourt les emprises page par page, selon le mode de récupération configuré :
+        export en flux, pages parallèles (ConcurrentFetcher) ou pagination séquentielle.
+        Les pages sont produites au fur et à mesure, sans attendre la fin de la récupération.
+
+        Args:
+            batch_size (int): Nombre d'enregistrements par page.
+            workers (int): Nombre de requêtes simultanées (mode "records").
+            total (Optional[int]): Nombre total annoncé par l'API, s'il est déjà connu (demandé sinon).
+
+        Returns:
+            Iterator[List[Dict]]: Pages d'enregistrements.
+        """
+        if self.fetch_mode != "export" and total is None:
+            total = self.count_emprises()
+        if self.fetch_mode == "export" or self._exceeds_records_window(total):
+            return chunked(self.iter_export_emprises(), batch_size)
+        if workers > 1:
+            return (records for _, records in self._concurrent_fetcher(batch_size, workers).iter_pages(total))
+        return self._iter_record_pages(batch_size)
+
+    def iter_export_emprises(self) -> Iterator[Dict]:
+        """
+        Parcourt l'export complet des emprises en une seule requête HTTP,
+        décodé enregistrement par enregistrement.
+
+        Returns:
+            Iterator[Dict]: Emprises de l'export.
+        """
+        return stream_export(self.export_source, fmt=self.export_format, session=self.session)
+
+    def iter_all_emprises(self) -> Iterator[Dict]:
+        """
+        Parcourt toutes les emprises selon le mode de récupération configuré.
+        Les enregistrements sont produits page par page, au fil de la récupération.
+
+        Returns:
+            Iterator[Dict]: Emprises récupérées.
+        """
+        return chain.from_iterable(self.iter_emprises_pages())
@@ -1,27 +1,38 @@
-from pymongo import MongoClient, IndexModel
-from datetime import datetime
-from typing import List, Dict
-from config import MONGO_URI, DB_NAME, COLLECTION_EMPRISES, COLLECTION_EMPLACEMENTS
+from pymongo import MongoClient, IndexModel, ReplaceOne
+import time
+from typing import Iterable, List, Dict, Optional
+from config import (MONGO_URI, DB_NAME, COLLECTION_EMPRISES, COLLECTION_EMPLACEMENTS, PIPELINE_QUEUE_SIZE,
+                    MONGO_REFRESH_MODE, SNAPSHOT_DIR)
 from .fetch_emprises import EmprisesFetcher
 from .fetch_emplacements import EmplacementsFetcher
+from .cleaning import clean_batch
+from .metadata import new_version, publish_version
+from .pipeline import PipelineStats, chunked, peak_rss_mb, run_pipeline
+from .snapshot import SNAPSHOT_PROJECTION, write_snapshot
 
 class MongoLoader:
     def __init__(self):
         self.client = MongoClient(MONGO_URI)
         self.db = self.client[DB_NAME]
+        self.clean_reports = []
         self.emprises_fetcher = EmprisesFetcher()
         self.emplacements_fetcher = EmplacementsFetcher()
 
-    def create_indexes(self):
+    @staticmethod
+    def index_models(collection: str) -> List[IndexModel]:
         """
-        Crée les index pour optimiser les requêtes dans MongoDB.
+        Retourne les index à créer pour une collection.
+        Args:
+            collection (str): COLLECTION_EMPRISES ou COLLECTION_EMPLACEMENTS.
+        Returns:
+            List[IndexModel]: Index de la collection.
         """
         emprises_indexes = [
             IndexModel([("arrond", 1)]),
             IndexModel([("regpri", 1)]),
             IndexModel([("typsta", 1)]),
             IndexModel([("zoneres", 1)]),
-            IndexModel([("geo_point_2d", "2dsphere")]),
+            IndexModel([("location", "2dsphere")]),
             IndexModel([("arrond", 1), ("regpri", 1)]),
             IndexModel([("datereleve", -1)])
         ]
@@ -31,14 +42,36 @@ class MongoLoader:
             IndexModel([("regpri", 1)]),
             IndexModel([("typsta", 1)]),
             IndexModel([("zoneres", 1)]),
-            IndexModel([("geo_point_2d", "2dsphere")]),
+            IndexModel([("location", "2dsphere")]),
             IndexModel([("arrond", 1), ("regpri", 1)]),
             IndexModel([("nomvoie", "text")]),
-            IndexModel([("datereleve", -1)])
+            IndexModel([("datereleve", -1)]),
+            # Champs normalisés utilisés par les filtres de recherche (égalité et préfixe ancré)
+            IndexModel([("regpri_norm", 1)]),
+            IndexModel([("typsta_norm", 1)]),
+            IndexModel([("nomvoie_words", 1)]),
+            # Repli de la recherche par adresse sur les documents sans location (carré englobant)
+            IndexModel([("geo_point_2d.lat", 1), ("geo_point_2d.lon", 1)]),
+            # Pagination par _key des recherches par arrondissement (sans tri en mémoire)
+            IndexModel([("arrond", 1), ("_key", 1)])
         ]
 
-        self.db[COLLECTION_EMPRISES].create_indexes(emprises_indexes)
-        self.db[COLLECTION_EMPLACEMENTS].create_indexes(emplacements_indexes)
+        # Clé utilisée par le rafraîchissement incrémental (absente des documents antérieurs)
+        key_index = IndexModel([("_key", 1)], unique=True, partialFilterExpression={"_key": {"$exists": True}})
+        indexes = emprises_indexes if collection == COLLECTION_EMPRISES else emplacements_indexes
+        return indexes + [key_index]
+
+    def create_indexes(self):
+        """
+        Crée les index pour optimiser les requêtes dans MongoDB.
+        """
+        # L'ancien index 2dsphere sur geo_point_2d ({lat, lon}) est inutilisable : on le remplace par celui sur location
+        for collection in (COLLECTION_EMPRISES, COLLECTION_EMPLACEMENTS):
+            if "geo_point_2d_2dsphere" in self.db[collection].index_information():
+                self.db[collection].drop_index("geo_point_2d_2dsphere")
+
+        self.db[COLLECTION_EMPRISES].create_indexes(self.index_models(COLLECTION_EMPRISES))
+        self.db[COLLECTION_EMPLACEMENTS].create_indexes(self.index_models(COLLECTION_EMPLACEMENTS))
         print("✅ Index créés avec succès")
 
     def clean_data(self, data: List[Dict]) -> List[Dict]:
@@ -48,30 +81,33 @@ class MongoLoader:
             data (List[Dict]): Liste des documents à nettoyer.
         Returns:
             List[Dict]: Liste des documents nettoyés.
+        Chaque document reçoit aussi sa clé `_key` et son empreinte `_hash` (voir etl.cleaning.fingerprint).
+        Le nettoyage est fait par colonnes sur tout le lot (voir etl.cleaning.clean_batch) ;
+        le rapport des lignes écartées du lot est ajouté à `clean_reports`.
         """
-        cleaned_data = []
-        for item in data:
-            if "geo_point_2d" in item and item["geo_point_2d"]:
-                geo_point = item["geo_point_2d"]
-                if isinstance(geo_point, dict) and "lat" in geo_point and "lon" in geo_point:
-                    lat, lon = geo_point["lat"], geo_point["lon"]
-                    if 48.8 <= lat <= 48.9 and 2.2 <= lon <= 2.5:
-                        item["location"] = {
-                            "type": "Point",
-                            "coordinates": [lon, lat]
-                        }
-
-            item["loaded_at"] = datetime.utcnow()
-            item["arrond"] = int(item.get("arrond", 0)) if item.get("arrond") else None
-
-            for field in ["regpri", "typsta", "nomvoie", "zoneres"]:
-                if field in item and item[field]:
-                    item[field] = str(item[field]).strip()
-
-            cleaned_data.append(item)
-
+        cleaned_data, report = clean_batch(data)
+        self.clean_reports.append(report)
         return cleaned_data
 
+    def report_rejections(self, collection: str):
+        """
+        Affiche le bilan des lignes écartées lors du nettoyage d'une collection.
+        Args:
+            collection (str): Nom de la collection chargée.
+        """
+        totals = {"rows": 0, "missing_geo": 0, "out_of_bbox": 0, "missing_arrond": 0}
+        samples = {}
+        for report in self.clean_reports:
+            for reason in totals:
+                totals[reason] += report[reason]
+            for reason, ids in report["samples"].items():
+                samples.setdefault(reason, ids)
+        print(f"  🧹 {collection} : {totals['rows']} lignes en {len(self.clean_reports)} lots, "
+              f"{totals['missing_geo']} sans coordonnées, {totals['out_of_bbox']} hors emprise, "
+              f"{totals['missing_arrond']} sans arrondissement")
+        for reason, ids in samples.items():
+            print(f"    - {reason} (ex. {', '.join(str(i) for i in ids)})")
+
     def load_emprises(self, use_cache: bool = True) -> int:
         """
         Charge les emprises dans MongoDB.
@@ -81,18 +117,10 @@ class MongoLoader:
             int: Nombre d'emprises chargées.
         """
         print("🔄 Chargement des emprises...")
-        self.db[COLLECTION_EMPRISES].delete_many({})
-        emprises = self.emprises_fetcher.fetch_all_emprises()
-
-        if emprises:
-            clean_emprises = self.clean_data(emprises)
-            batch_size = 100
-            for i in range(0, len(clean_emprises), batch_size):
-                batch = clean_emprises[i:i + batch_size]
-                self.db[COLLECTION_EMPRISES].insert_many(batch)
-                print(f"  Inséré {min(i + batch_size, len(clean_emprises))}/{len(clean_emprises)} emprises")
-
-        return len(emprises)
+        # Nombre total demandé une seule fois : choix du mode de récupération et garde des suppressions
+        total = self.emprises_fetcher.count_emprises()
+        pages = self.emprises_fetcher.iter_emprises_pages(total=total)
+        return self.refresh_collection(COLLECTION_EMPRISES, pages, batch_size=100, expected=total)
 
     def load_emplacements(self, use_cache: bool = True) -> int:
         """
@@ -103,31 +131,177 @@ class MongoLoader:
             int: Nombre d'emplacements chargés.
         """
         print("🔄 Chargement des emplacements...")
-        self.db[COLLECTION_EMPLACEMENTS].delete_many({})
-        emplacements = self.emplacements_fetcher.fetch_all_emplacements()
+        total = self.emplacements_fetcher.count_emplacements()
+        pages = self.emplacements_fetcher.iter_emplacements_pages(total=total)
+        return self.refresh_collection(COLLECTION_EMPLACEMENTS, pages, batch_size=500, expected=total)
 
-        if emplacements:
-            clean_emplacements = self.clean_data(emplacements)
-            batch_size = 500
-            for i in range(0, len(clean_emplacements), batch_size):
-                batch = clean_emplacements[i:i + batch_size]
-                self.db[COLLECTION_EMPLACEMENTS].insert_many(batch)
-                print(f"  Inséré {min(i + batch_size, len(clean_emplacements))}/{len(clean_emplacements)} emplacements")
+    def refresh_collection(self, collection: str, pages: Iterable[List[Dict]], batch_size: int,
+                           mode: str = MONGO_REFRESH_MODE, expected: Optional[int] = None) -> int:
+        """
+        Remplace le contenu d'une collection par les enregistrements récupérés.
+        Modes disponibles :
+        - "swap" : chargement dans une collection de staging indexée, puis renameCollection
+          atomique ; l'application ne voit jamais de collection vide ou partielle ;
+        - "incremental" : upserts des seuls documents nouveaux ou modifiés (empreinte de contenu)
+          et suppression des documents disparus, si la récupération est complète ;
+        - "replace" : vidage puis réinsertion de la collection en place.
+        Args:
+            collection (str): Nom de la collection.
+            pages (Iterable[List[Dict]]): Pages d'enregistrements bruts.
+            batch_size (int): Nombre de documents par écriture.
+            mode (str): Mode de rafraîchissement.
+            expected (Optional[int]): Nombre d'enregistrements annoncé par la source (mode "incremental").
+        Returns:
+            int: Nombre d'enregistrements récupérés.
+        """
+        self.clean_reports = []
+        if mode == "incremental":
+            count = self.refresh_incremental(collection, pages, batch_size, expected)
+        elif mode == "swap":
+            count = self.refresh_swap(collection, pages, batch_size)
+        else:
+            self.db[collection].delete_many({})
+            count = self.insert_pages(collection, pages, batch_size).count
+        self.report_rejections(collection)
+        return count
 
-        return len(emplacements)
+    def refresh_swap(self, collection: str, pages: Iterable[List[Dict]], batch_size: int) -> int:
+        """
+        Charge une collection de staging, crée ses index puis la substitue à la collection live.
+        Args:
+            collection (str): Nom de la collection live.
+            pages (Iterable[List[Dict]]): Pages d'enregistrements bruts.
+            batch_size (int): Nombre de documents par insert_many.
+        Returns:
+            int: Nombre de documents chargés.
+        """
+        staging = f"{collection}_staging"
+        self.db.drop_collection(staging)
+        count = self.insert_pages(staging, pages, batch_size).count
+        self.db[staging].create_indexes(self.index_models(collection))
+        self.db[staging].rename(collection, dropTarget=True)
+        print(f"  🔀 {staging} → {collection}")
+        return count
+
+    def refresh_incremental(self, collection: str, pages: Iterable[List[Dict]], batch_size: int,
+                            expected: Optional[int] = None) -> int:
+        """
+        Met à jour une collection en n'écrivant que les différences.
+        Chaque document est identifié par `_key` (id de l'enregistrement) et comparé à
+        l'empreinte `_hash` déjà stockée : seuls les documents nouveaux ou modifiés sont
+        envoyés, par bulk_write non ordonné de ReplaceOne(upsert=True), qui retire aussi les
+        champs disparus de la source. Les documents qui ne figurent plus dans la source ne
+        sont supprimés que si la récupération est complète (au moins `expected` lignes lues) :
+        une récupération partielle ne vide jamais la collection.
+        Args:
+            collection (str): Nom de la collection.
+            pages (Iterable[List[Dict]]): Pages d'enregistrements bruts.
+            batch_size (int): Nombre de documents par bulk_write.
+            expected (Optional[int]): Nombre d'enregistrements annoncé par la source (inconnu : aucune suppression).
+        Returns:
+            int: Nombre d'enregistrements récupérés.
+        """
+        existing = {doc["_key"]: doc.get("_hash")
+                    for doc in self.db[collection].find({"_key": {"$exists": True}}, {"_key": 1, "_hash": 1, "_id": 0})}
+        seen = set()
+        counters = {"upserted": 0, "unchanged": 0}
+
+        def write(batch: List[Dict]):
+            operations = []
+            for doc in batch:
+                key, content_hash = doc["_key"], doc["_hash"]
+                seen.add(key)
+                if existing.get(key) == content_hash:
+                    counters["unchanged"] += 1
+                    continue
+                doc.pop("_id", None)
+                operations.append(ReplaceOne({"_key": key}, doc, upsert=True))
+            if operations:
+                self.db[collection].bulk_write(operations, ordered=False)
+                counters["upserted"] += len(operations)
+
+        stats = run_pipeline(pages, self.clean_data, write, batch_size=batch_size,
+                             queue_size=PIPELINE_QUEUE_SIZE, label=collection)
+
+        # Lignes lues avant nettoyage : les lignes écartées ont bien été récupérées
+        fetched = sum(report["rows"] for report in self.clean_reports)
+        deleted = 0
+        if expected is None or fetched < expected:
+            print(f"  ⚠️  {collection} : {fetched} lignes récupérées sur {expected} annoncées, "
+                  f"récupération incomplète : aucune suppression")
+        else:
+            stale = [key for key in existing if key not in seen]
+            for keys in chunked(stale, 1000):
+                deleted += self.db[collection].delete_many({"_key": {"$in": keys}}).deleted_count
+            # Documents chargés avant l'introduction de _key
+            deleted += self.db[collection].delete_many({"_key": {"$exists": False}}).deleted_count
+
+        print(f"  ⏱️  {stats.count} {collection} en {stats.seconds:.1f}s : {counters['upserted']} écrits, "
+              f"{counters['unchanged']} inchangés, {deleted} supprimés")
+        return stats.count
+
+    def insert_pages(self, collection: str, pages: Iterable[List[Dict]], batch_size: int) -> PipelineStats:
+        """
+        Nettoie et insère des pages d'enregistrements au fil de leur récupération.
+        La récupération, le nettoyage et les insert_many tournent en parallèle, reliés par
+        des files bornées (PIPELINE_QUEUE_SIZE) : seuls quelques pages et lots sont en mémoire.
+        Args:
+            collection (str): Nom de la collection cible.
+            pages (Iterable[List[Dict]]): Pages d'enregistrements bruts (générateur).
+            batch_size (int): Nombre de documents par insert_many.
+        Returns:
+            PipelineStats: Nombre de documents insérés, durée et pic RSS.
+        """
+        stats = run_pipeline(pages, self.clean_data, self.db[collection].insert_many,
+                             batch_size=batch_size, queue_size=PIPELINE_QUEUE_SIZE, label=collection)
+        print(f"  ⏱️  {stats.count} {collection} en {stats.seconds:.1f}s, pic RSS {stats.peak_rss_mb:.0f} Mo")
+        return stats
+
+    def insert_batches(self, collection: str, records: Iterable[Dict], batch_size: int) -> int:
+        """
+        Nettoie et insère des enregistrements par lots, au fil de leur arrivée.
+        Args:
+            collection (str): Nom de la collection cible.
+            records (Iterable[Dict]): Enregistrements bruts (éventuellement un générateur).
+            batch_size (int): Nombre de documents par insert_many.
+        Returns:
+            int: Nombre de documents insérés.
+        """
+        return self.insert_pages(collection, chunked(records, batch_size), batch_size).count
+
+    def export_snapshot(self, version: str) -> str:
+        """
+        Écrit l'instantané colonnaire des emplacements lu par l'application (voir etl.snapshot).
+        Args:
+            version (str): Version des données chargées.
+        Returns:
+            str: Chemin de l'instantané écrit.
+        """
+        emplacements = self.db[COLLECTION_EMPLACEMENTS].find({"_key": {"$exists": True}}, SNAPSHOT_PROJECTION)
+        path = write_snapshot(emplacements, SNAPSHOT_DIR, version)
+        print(f"🗜️  Instantané des emplacements écrit: {path}")
+        return path
 
     def load_all_data(self):
         """
         Charge toutes les données dans MongoDB.
+        L'instantané colonnaire est écrit avant la publication de la version : les workers
+        qui voient la nouvelle version trouvent l'instantané correspondant.
         """
+        start = time.perf_counter()
         try:
             self.create_indexes()
             emprises_count = self.load_emprises()
             emplacements_count = self.load_emplacements()
+            version = new_version()
+            if SNAPSHOT_DIR:
+                self.export_snapshot(version)
+            publish_version(self.db, "mongo", version, emprises=emprises_count, emplacements=emplacements_count)
 
             print(f"✅ Chargement terminé:")
             print(f"  - {emprises_count} emprises")
             print(f"  - {emplacements_count} emplacements")
+            print(f"  - durée totale {time.perf_counter() - start:.1f}s, pic RSS {peak_rss_mb():.0f} Mo")
 
         except Exception as e:
             print(f"❌ Erreur lors du chargement: {e}")
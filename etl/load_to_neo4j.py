@@ -1,7 +1,122 @@
 from neo4j import GraphDatabase
 from pymongo import MongoClient
+import time
 from typing import Dict, List
 from config import *
+from .metadata import publish_version
+from .neighbours import neighbour_pairs
+from .pipeline import chunked, peak_rss_mb
+
+# Champs des nœuds de dimension ; un emplacement sans l'une de ces valeurs n'est pas chargé
+DIMENSION_FIELDS = ("arrond", "regpri", "typsta", "zoneres", "nomvoie")
+
+EMPLACEMENT_PROJECTION = {
+    "_id": 0, "id": 1, "arrond": 1, "regpri": 1, "typsta": 1, "zoneres": 1, "nomvoie": 1,
+    "placal": 1, "surface_calculee": 1, "signvert": 1, "datereleve": 1, "geo_point_2d": 1
+}
+
+DIMENSION_QUERIES = {
+    "arrond": """
+        UNWIND $values AS value
+        MERGE (arr:Arrondissement {name: value})
+        ON CREATE SET arr.number = toInteger(value)
+    """,
+    "regpri": """
+        UNWIND $values AS value
+        MERGE (reg:Reglement {name: value})
+        ON CREATE SET reg.description = value
+    """,
+    "typsta": """
+        UNWIND $values AS value
+        MERGE (typ:Type {name: value})
+        ON CREATE SET typ.category = value
+    """,
+    "zoneres": """
+        UNWIND $values AS value
+        MERGE (zone:Zone {name: value})
+        ON CREATE SET zone.code = value
+    """,
+    "nomvoie": """
+        UNWIND $values AS value
+        MERGE (voie:Voie {name: value})
+        ON CREATE SET voie.full_name = value
+    """
+}
+
+DIMENSION_LINK_QUERIES = {
+    "zoneres": """
+        UNWIND $pairs AS pair
+        MATCH (zone:Zone {name: pair.name}), (arr:Arrondissement {name: pair.arrond})
+        MERGE (zone)-[:APPARTIENT_A]->(arr)
+    """,
+    "nomvoie": """
+        UNWIND $pairs AS pair
+        MATCH (voie:Voie {name: pair.name}), (arr:Arrondissement {name: pair.arrond})
+        MERGE (voie)-[:TRAVERSE]->(arr)
+    """
+}
+
+EMPLACEMENTS_QUERY = """
+UNWIND $rows AS row
+MERGE (emp:Emplacement {id: row.emp_id})
+ON CREATE SET
+    emp.places_calcul = row.placal,
+    emp.surface = row.surface,
+    emp.signalisation_verticale = row.signvert,
+    emp.date_releve = row.datereleve,
+    emp.latitude = row.lat,
+    emp.longitude = row.lon,
+    emp.location = CASE WHEN row.lat IS NULL OR row.lon IS NULL THEN null
+                        ELSE point({latitude: row.lat, longitude: row.lon}) END
+WITH emp, row
+MATCH (arr:Arrondissement {name: row.arrond})
+MATCH (reg:Reglement {name: row.regpri})
+MATCH (typ:Type {name: row.typsta})
+MATCH (zone:Zone {name: row.zoneres})
+MATCH (voie:Voie {name: row.nomvoie})
+MERGE (emp)-[:SITUE_DANS]->(arr)
+MERGE (emp)-[:SOUMIS_A]->(reg)
+MERGE (emp)-[:DE_TYPE]->(typ)
+MERGE (emp)-[:DANS_ZONE]->(zone)
+MERGE (emp)-[:SUR_VOIE]->(voie)
+"""
+
+# Relation dans les deux sens, comme l'ancienne requête qui parcourait les couples ordonnés
+PROCHE_DE_QUERY = """
+UNWIND $pairs AS pair
+MATCH (e1:Emplacement {id: pair.source}), (e2:Emplacement {id: pair.target})
+MERGE (e1)-[:PROCHE_DE {distance: pair.distance}]->(e2)
+MERGE (e2)-[:PROCHE_DE {distance: pair.distance}]->(e1)
+"""
+
+# Relations dérivées matérialisées, plafonnées à $limit par emplacement. Sans ORDER BY,
+# le LIMIT interrompt le parcours du Type/de la Voie dès que le plafond est atteint.
+DERIVED_QUERIES = {
+    "MEME_TYPE": """
+        UNWIND $ids AS emp_id
+        CALL {
+            WITH emp_id
+            MATCH (e1:Emplacement {id: emp_id})-[:DE_TYPE]->(:Type)<-[:DE_TYPE]-(e2:Emplacement)
+            WHERE e1 <> e2
+            WITH e1, e2 LIMIT $limit
+            MERGE (e1)-[:MEME_TYPE]->(e2)
+        } IN TRANSACTIONS OF $rows ROWS
+    """,
+    "COMPLEMENTAIRE": """
+        UNWIND $ids AS emp_id
+        CALL {
+            WITH emp_id
+            MATCH (e1:Emplacement {id: emp_id})-[:SUR_VOIE]->(:Voie)<-[:SUR_VOIE]-(e2:Emplacement)
+            MATCH (e1)-[:DE_TYPE]->(t1:Type), (e2)-[:DE_TYPE]->(t2:Type)
+            WHERE e1 <> e2 AND t1 <> t2
+            WITH e1, e2 LIMIT $limit
+            MERGE (e1)-[:COMPLEMENTAIRE]->(e2)
+        } IN TRANSACTIONS OF $rows ROWS
+    """
+}
+
+# Nombre d'emplacements traités par requête entre deux messages de progression
+DERIVED_PROGRESS_STEP = 10000
 
 class Neo4jLoader:
     def __init__(self):
@@ -21,7 +136,8 @@ class Neo4jLoader:
             "CREATE CONSTRAINT reglement_name IF NOT EXISTS FOR (r:Reglement) REQUIRE r.name IS UNIQUE",
             "CREATE CONSTRAINT zone_name IF NOT EXISTS FOR (z:Zone) REQUIRE z.name IS UNIQUE",
             "CREATE CONSTRAINT voie_name IF NOT EXISTS FOR (v:Voie) REQUIRE v.name IS UNIQUE",
-            "CREATE CONSTRAINT emplacement_id IF NOT EXISTS FOR (e:Emplacement) REQUIRE e.id IS UNIQUE"
+            "CREATE CONSTRAINT emplacement_id IF NOT EXISTS FOR (e:Emplacement) REQUIRE e.id IS UNIQUE",
+            "CREATE POINT INDEX emplacement_location IF NOT EXISTS FOR (e:Emplacement) ON (e.location)"
         ]
 
         with self.driver.session() as session:
@@ -33,116 +149,173 @@ class Neo4jLoader:
 
         print("✅ Contraintes créées")
 
-    def load_nodes(self):
+    def load_nodes(self, batch_size: int = NEO4J_BATCH_SIZE):
+        """
+        Charge les emplacements et leurs nœuds de dimension dans Neo4j.
+        Les nœuds de dimension (Arrondissement, Reglement, Type, Zone, Voie) et leurs relations
+        entre eux sont fusionnés une seule fois au départ ; les emplacements et leurs relations
+        sont ensuite créés par lots (UNWIND), une transaction explicite par lot.
+        Args:
+            batch_size (int): Nombre d'emplacements par transaction.
+        """
+        start = time.perf_counter()
+        rows = []
+        skipped = 0
+        for emplacement in self.db[COLLECTION_EMPLACEMENTS].find({}, EMPLACEMENT_PROJECTION):
+            row = self._emplacement_row(emplacement)
+            if any(row[field] is None for field in DIMENSION_FIELDS):
+                # Un MERGE sur une valeur nulle échoue : ces emplacements n'étaient déjà pas chargés
+                skipped += 1
+                continue
+            rows.append(row)
+        print(f"🔄 Chargement de {len(rows)} emplacements ({skipped} ignorés, dimension manquante)...")
+
         with self.driver.session() as session:
-            emplacements = list(self.db[COLLECTION_EMPLACEMENTS].find())
-            print(f"🔄 Chargement de {len(emplacements)} emplacements...")
-            batch_size = 100
-            for i in range(0, len(emplacements), batch_size):
-                batch = emplacements[i:i + batch_size]
-                self._process_batch(session, batch)
-                print(f"  Traité {min(i + batch_size, len(emplacements))}/{len(emplacements)} emplacements")
-
-    def _process_batch(self, session, batch: List[Dict]):
-        for emplacement in batch:
-            self._create_emplacement_graph(session, emplacement)
-
-    def _create_emplacement_graph(self, session, emplacement: Dict):
-        arrond = str(emplacement.get("arrond", "Inconnu"))
-        regpri = emplacement.get("regpri", "Inconnu")
-        typsta = emplacement.get("typsta", "Inconnu")
-        zoneres = emplacement.get("zoneres", "Inconnu")
-        nomvoie = emplacement.get("nomvoie", "Inconnue")
-        emp_id = str(emplacement.get("id", ""))
+            self._merge_dimensions(session, rows)
+            done = 0
+            for batch in chunked(rows, batch_size):
+                session.execute_write(self._run_query, EMPLACEMENTS_QUERY, rows=batch)
+                done += len(batch)
+                print(f"  Traité {done}/{len(rows)} emplacements")
+        print(f"  ⏱️  {len(rows)} emplacements en {time.perf_counter() - start:.1f}s")
+
+    @staticmethod
+    def _emplacement_row(emplacement: Dict) -> Dict:
+        """
+        Prépare les paramètres d'un emplacement pour les requêtes UNWIND.
+        Args:
+            emplacement (Dict): Document MongoDB de l'emplacement.
+        Returns:
+            Dict: Valeurs des nœuds et propriétés de l'emplacement.
+        """
         geo_point = emplacement.get("geo_point_2d", {})
-        lat = geo_point.get("lat") if geo_point else None
-        lon = geo_point.get("lon") if geo_point else None
-        placal = emplacement.get("placal", 0)
-        surface = emplacement.get("surface_calculee", 0)
-        signvert = emplacement.get("signvert", "Inconnue")
-        datereleve = emplacement.get("datereleve", "Inconnue")
-
-        query = """
-        MERGE (arr:Arrondissement {name: $arrond})
-        ON CREATE SET arr.number = toInteger($arrond)
-
-        MERGE (reg:Reglement {name: $regpri})
-        ON CREATE SET reg.description = $regpri
-
-        MERGE (typ:Type {name: $typsta})
-        ON CREATE SET typ.category = $typsta
-
-        MERGE (zone:Zone {name: $zoneres})
-        ON CREATE SET zone.code = $zoneres
-
-        MERGE (voie:Voie {name: $nomvoie})
-        ON CREATE SET voie.full_name = $nomvoie
-
-        MERGE (emp:Emplacement {id: $emp_id})
-        ON CREATE SET
-            emp.places_calcul = $placal,
-            emp.surface = $surface,
-            emp.signalisation_verticale = $signvert,
-            emp.date_releve = $datereleve,
-            emp.latitude = $lat,
-            emp.longitude = $lon
-
-        MERGE (emp)-[:SITUE_DANS]->(arr)
-        MERGE (emp)-[:SOUMIS_A]->(reg)
-        MERGE (emp)-[:DE_TYPE]->(typ)
-        MERGE (emp)-[:DANS_ZONE]->(zone)
-        MERGE (emp)-[:SUR_VOIE]->(voie)
+        return {
+            "arrond": str(emplacement.get("arrond", "Inconnu")),
+            "regpri": emplacement.get("regpri", "Inconnu"),
+            "typsta": emplacement.get("typsta", "Inconnu"),
+            "zoneres": emplacement.get("zoneres", "Inconnu"),
+            "nomvoie": emplacement.get("nomvoie", "Inconnue"),
+            "emp_id": str(emplacement.get("id", "")),
+            "placal": emplacement.get("placal", 0) or 0,
+            "surface": emplacement.get("surface_calculee", 0) or 0,
+            "signvert": emplacement.get("signvert", "Inconnue"),
+            "datereleve": emplacement.get("datereleve", "Inconnue"),
+            "lat": geo_point.get("lat") if geo_point else None,
+            "lon": geo_point.get("lon") if geo_point else None
+        }
 
-        MERGE (zone)-[:APPARTIENT_A]->(arr)
-        MERGE (voie)-[:TRAVERSE]->(arr)
+    def _merge_dimensions(self, session, rows: List[Dict]):
+        """
+        Fusionne les nœuds de dimension distincts et les relations Zone/Voie → Arrondissement.
+        Args:
+            session: Session Neo4j.
+            rows (List[Dict]): Lignes préparées par _emplacement_row.
         """
+        for field, query in DIMENSION_QUERIES.items():
+            values = list({row[field] for row in rows})
+            for batch in chunked(values, NEO4J_BATCH_SIZE):
+                session.execute_write(self._run_query, query, values=batch)
+            print(f"  ✅ {len(values)} valeurs distinctes pour {field}")
 
-        try:
-            session.run(query, {
-                "arrond": arrond,
-                "regpri": regpri,
-                "typsta": typsta,
-                "zoneres": zoneres,
-                "nomvoie": nomvoie,
-                "emp_id": emp_id,
-                "placal": placal or 0,
-                "surface": surface or 0,
-                "signvert": signvert,
-                "datereleve": datereleve,
-                "lat": lat,
-                "lon": lon
-            })
-        except Exception as e:
-            print(f"Erreur lors de la création du graphe pour l'emplacement {emp_id}: {e}")
+        for field, query in DIMENSION_LINK_QUERIES.items():
+            pairs = [{"name": name, "arrond": arrond} for name, arrond in {(row[field], row["arrond"]) for row in rows}]
+            for batch in chunked(pairs, NEO4J_BATCH_SIZE):
+                session.execute_write(self._run_query, query, pairs=batch)
+
+    @staticmethod
+    def _run_query(tx, query: str, **params):
+        """Exécute une requête dans la transaction explicite ouverte par execute_write."""
+        tx.run(query, **params).consume()
+
+    def create_proximity_relationships(self, radius: float = PROCHE_DE_RADIUS, batch_size: int = NEO4J_BATCH_SIZE) -> int:
+        """
+        Crée les relations PROCHE_DE entre emplacements distants de moins de `radius` mètres.
+        Les couples sont calculés hors de Neo4j par une jointure sur grille (etl.neighbours)
+        à partir des coordonnées stockées dans MongoDB, puis écrits par lots (UNWIND).
+        Args:
+            radius (float): Distance maximale en mètres.
+            batch_size (int): Nombre de couples par transaction.
+        Returns:
+            int: Nombre de couples d'emplacements voisins.
+        """
+        start = time.perf_counter()
+        ids, lats, lons = [], [], []
+        seen = set()
+        for emplacement in self.db[COLLECTION_EMPLACEMENTS].find({}, {"_id": 0, "id": 1, "geo_point_2d": 1}):
+            emp_id = str(emplacement.get("id", ""))
+            geo_point = emplacement.get("geo_point_2d")
+            # Le nœud garde les coordonnées du premier document de même id (ON CREATE SET)
+            if emp_id in seen:
+                continue
+            seen.add(emp_id)
+            if geo_point and geo_point.get("lat") is not None and geo_point.get("lon") is not None:
+                ids.append(emp_id)
+                lats.append(geo_point["lat"])
+                lons.append(geo_point["lon"])
+
+        count = 0
+        with self.driver.session() as session:
+            for first, second, distances in neighbour_pairs(lats, lons, radius):
+                pairs = [{"source": ids[i], "target": ids[j], "distance": d}
+                         for i, j, d in zip(first.tolist(), second.tolist(), distances.tolist())]
+                for batch in chunked(pairs, batch_size):
+                    session.execute_write(self._run_query, PROCHE_DE_QUERY, pairs=batch)
+                count += len(pairs)
+                print(f"  {count} couples PROCHE_DE écrits...")
+        print(f"  ✅ {count} couples PROCHE_DE (< {radius:g} m) entre {len(ids)} emplacements "
+              f"en {time.perf_counter() - start:.1f}s")
+        return count
+
+    def create_derived_relationships(self, limit: int = NEO4J_DERIVED_LIMIT, batch_size: int = NEO4J_BATCH_SIZE) -> Dict[str, int]:
+        """
+        Matérialise les relations MEME_TYPE et COMPLEMENTAIRE, au plus `limit` par emplacement.
+        Sans plafond, MEME_TYPE relie tous les couples d'emplacements d'un même type (nombre
+        quadratique de relations). Les requêtes sont découpées en transactions de `batch_size`
+        emplacements (CALL { ... } IN TRANSACTIONS) ; la progression, le nombre de relations
+        créées et le pic mémoire du chargeur sont affichés au fil de l'eau.
+        Args:
+            limit (int): Nombre maximal de relations par emplacement et par type de relation.
+            batch_size (int): Nombre d'emplacements par transaction.
+        Returns:
+            Dict[str, int]: Nombre de relations créées par type de relation.
+        """
+        with self.driver.session() as session:
+            ids = [record["id"] for record in session.run("MATCH (e:Emplacement) RETURN e.id AS id")]
+            created = {}
+            for relation, query in DERIVED_QUERIES.items():
+                start = time.perf_counter()
+                created[relation] = 0
+                for done, chunk in enumerate(chunked(ids, DERIVED_PROGRESS_STEP), start=1):
+                    # CALL { } IN TRANSACTIONS exige une transaction implicite (session.run)
+                    summary = session.run(query, ids=chunk, limit=limit, rows=batch_size).consume()
+                    created[relation] += summary.counters.relationships_created
+                    print(f"  {relation} : {min(done * DERIVED_PROGRESS_STEP, len(ids))}/{len(ids)} emplacements, "
+                          f"{created[relation]} relations, {time.perf_counter() - start:.1f}s, "
+                          f"pic RSS {peak_rss_mb():.0f} Mo")
+                print(f"  ✅ {created[relation]} relations {relation} (au plus {limit} par emplacement)")
+        return created
 
-    def create_advanced_relationships(self):
+    def create_advanced_relationships(self, derived_mode: str = NEO4J_DERIVED_RELATIONS):
+        """
+        Crée les relations PROCHE_DE, les relations dérivées si elles sont matérialisées,
+        et les statistiques des arrondissements.
+        Args:
+            derived_mode (str): "query" (MEME_TYPE/COMPLEMENTAIRE déduites à la requête,
+                voir Neo4jQueries) ou "materialize" (relations créées et plafonnées).
+        """
         print("🔗 Création des relations avancées...")
+        try:
+            self.create_proximity_relationships()
+        except Exception as e:
+            print(f"  ❌ Erreur relation PROCHE_DE: {e}")
+        if derived_mode == "materialize":
+            try:
+                self.create_derived_relationships()
+            except Exception as e:
+                print(f"  ❌ Erreur relations MEME_TYPE/COMPLEMENTAIRE: {e}")
+        else:
+            print("  MEME_TYPE/COMPLEMENTAIRE déduites à la requête (NEO4J_DERIVED_RELATIONS=query)")
         advanced_queries = [
-            """
-            MATCH (e1:Emplacement), (e2:Emplacement)
-            WHERE e1 <> e2
-                AND e1.latitude IS NOT NULL AND e1.longitude IS NOT NULL
-                AND e2.latitude IS NOT NULL AND e2.longitude IS NOT NULL
-                AND point.distance(
-                    point({latitude: e1.latitude, longitude: e1.longitude}),
-                    point({latitude: e2.latitude, longitude: e2.longitude})
-                ) < 50
-            MERGE (e1)-[:PROCHE_DE {distance: point.distance(
-                point({latitude: e1.latitude, longitude: e1.longitude}),
-                point({latitude: e2.latitude, longitude: e2.longitude})
-            )}]->(e2)
-            """,
-            """
-            MATCH (e1:Emplacement)-[:DE_TYPE]->(t:Type)<-[:DE_TYPE]-(e2:Emplacement)
-            WHERE e1 <> e2
-            MERGE (e1)-[:MEME_TYPE]->(e2)
-            """,
-            """
-            MATCH (e1:Emplacement)-[:SUR_VOIE]->(v:Voie)<-[:SUR_VOIE]-(e2:Emplacement)
-            MATCH (e1)-[:DE_TYPE]->(t1:Type), (e2)-[:DE_TYPE]->(t2:Type)
-            WHERE e1 <> e2 AND t1 <> t2
-            MERGE (e1)-[:COMPLEMENTAIRE]->(e2)
-            """,
             """
             MATCH (arr:Arrondissement)<-[:SITUE_DANS]-(emp:Emplacement)
             WITH arr, count(emp) as nb_emplacements, sum(emp.places_calcul) as total_places
@@ -165,6 +338,7 @@ class Neo4jLoader:
             self.create_constraints()
             self.load_nodes()
             self.create_advanced_relationships()
+            publish_version(self.db, "neo4j")
             print("✅ Chargement Neo4j terminé avec succès")
         except Exception as e:
             print(f"❌ Erreur lors du chargement Neo4j: {e}")
@@ -0,0 +1,35 @@
+import uuid
+from datetime import datetime
+from config import COLLECTION_METADATA
+
+
+def new_version() -> str:
+    """
+    Returns:
+        str: Nouvel identifiant de version (horodatage UTC suivi d'un suffixe aléatoire).
+    """
+    return f"{datetime.utcnow():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}"
+
+
+def publish_version(db, source: str, version: str = None, **details) -> str:
+    """
+    Publie une nouvelle version des données à la fin d'un chargement ETL.
+    L'application compare cette version à celle qu'elle a en cache pour invalider
+    les données dérivées (facettes, zones, cartes...).
+    Args:
+        db (Database): Base MongoDB dans laquelle enregistrer la version.
+        source (str): Nom du chargement ("mongo" ou "neo4j").
+        version (str): Version à publier (nouvelle version par défaut, voir new_version).
+        **details: Informations complémentaires enregistrées avec la version (effectifs...).
+    Returns:
+        str: Identifiant de la version publiée.
+    """
+    now = datetime.utcnow()
+    version = version or new_version()
+    db[COLLECTION_METADATA].replace_one(
+        {"_id": source},
+        {"_id": source, "version": version, "loaded_at": now, **details},
+        upsert=True
+    )
+    print(f"🏷️  Version {source} publiée: {version}")
+    return version
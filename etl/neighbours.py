@@ -0,0 +1,84 @@
+import math
+from typing import Iterator, Tuple
+import numpy as np
+
+# Rayon terrestre utilisé par point.distance de Neo4j (WGS-84 2D, formule de haversine) :
+# les distances calculées ici sont celles que l'ancienne requête Cypher enregistrait
+NEO4J_EARTH_RADIUS_M = 6378140.0
+
+# Marge relative ajoutée à la taille des cellules pour absorber l'écart de la projection locale
+GRID_MARGIN = 0.01
+
+
+def haversine_many(lat1: np.ndarray, lon1: np.ndarray, lat2: np.ndarray, lon2: np.ndarray) -> np.ndarray:
+    """
+    Distances de haversine (en mètres) entre des couples de points, terme à terme.
+    Args:
+        lat1 (np.ndarray): Latitudes des premiers points.
+        lon1 (np.ndarray): Longitudes des premiers points.
+        lat2 (np.ndarray): Latitudes des seconds points.
+        lon2 (np.ndarray): Longitudes des seconds points.
+    Returns:
+        np.ndarray: Distances en mètres.
+    """
+    phi1, phi2 = np.radians(lat1), np.radians(lat2)
+    a = np.sin((phi2 - phi1) / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(np.radians(lon2 - lon1) / 2) ** 2
+    return 2 * NEO4J_EARTH_RADIUS_M * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def neighbour_pairs(lats, lons, radius: float = 50, chunk_size: int = 50000) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    Recherche tous les couples de points distants de moins de `radius` mètres (jointure sur grille).
+    Les points sont projetés sur un plan local et rangés dans des cellules carrées d'un peu plus
+    de `radius` mètres : deux voisins sont forcément dans la même cellule ou dans deux cellules
+    adjacentes. Chaque point n'est comparé qu'aux points de sa cellule et de quatre cellules
+    voisines (demi-voisinage), si bien que chaque couple est examiné une seule fois et que le
+    coût croît linéairement avec le nombre de points, à densité égale.
+    Args:
+        lats: Latitudes des points.
+        lons: Longitudes des points.
+        radius (float): Distance maximale (exclue) en mètres.
+        chunk_size (int): Nombre de points traités à la fois (borne la mémoire des candidats).
+    Returns:
+        Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]: Par paquets, positions i et j (i ≠ j,
+        chaque couple non ordonné une seule fois) et distances correspondantes.
+    """
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    size = len(lats)
+    if size < 2:
+        return
+
+    cell = radius * (1 + GRID_MARGIN)
+    x = np.radians(lons) * NEO4J_EARTH_RADIUS_M * math.cos(math.radians(float(lats.mean())))
+    y = np.radians(lats) * NEO4J_EARTH_RADIUS_M
+    cx = np.floor((x - x.min()) / cell).astype(np.int64)
+    cy = np.floor((y - y.min()) / cell).astype(np.int64)
+
+    # Clé linéaire de cellule ; la colonne vide en bout de ligne évite qu'un décalage de -1
+    # en y retombe sur une cellule occupée de la colonne précédente
+    width = int(cy.max()) + 3
+    keys = cx * width + cy
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+
+    # Cellule elle-même, puis (x+1, y-1), (x+1, y), (x+1, y+1) et (x, y+1)
+    for offset in (0, width - 1, width, width + 1, 1):
+        for start in range(0, size, chunk_size):
+            positions = np.arange(start, min(start + chunk_size, size))
+            targets = sorted_keys[positions] + offset
+            high = np.searchsorted(sorted_keys, targets, side="right")
+            low = positions + 1 if offset == 0 else np.searchsorted(sorted_keys, targets, side="left")
+            counts = np.maximum(high - low, 0)
+            total = int(counts.sum())
+            if not total:
+                continue
+
+            first = np.repeat(positions, counts)
+            steps = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+            second = np.repeat(low, counts) + steps
+            i, j = order[first], order[second]
+            distances = haversine_many(lats[i], lons[i], lats[j], lons[j])
+            keep = distances < radius
+            if keep.any():
+                yield i[keep], j[keep], distances[keep]
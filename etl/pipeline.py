@@ -0,0 +1,176 @@
+import queue
+import resource
+import sys
+import threading
+import time
+from collections import namedtuple
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List
+
+PipelineStats = namedtuple("PipelineStats", ["count", "batches", "seconds", "peak_rss_mb"])
+
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def peak_rss_mb() -> float:
+    """
+    Returns:
+        float: Pic de mémoire résidente (RSS) du processus depuis son démarrage, en Mo.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss est en octets sous macOS, en kilo-octets sous Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def chunked(iterable: Iterable, size: int) -> Iterator[List]:
+    """
+    Découpe un itérable en listes de `size` éléments (la dernière peut être plus courte).
+    Args:
+        iterable (Iterable): Éléments à regrouper.
+        size (int): Taille des lots.
+    Returns:
+        Iterator[List]: Lots successifs.
+    """
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def background_iter(iterable: Iterable, maxsize: int = 4, poll_interval: float = 0.1) -> Iterator:
+    """
+    Parcourt un itérable dans un thread dédié et transmet ses éléments par une file bornée.
+    Le producteur (par exemple la récupération HTTP) avance pendant que le consommateur
+    traite les éléments précédents, sans jamais avoir plus de `maxsize` éléments en attente.
+    Les exceptions du producteur sont relancées côté consommateur. Si le consommateur
+    s'arrête avant la fin (erreur, abandon du générateur), le producteur cesse d'attendre
+    de la place dans la file, ferme la source et se termine.
+    Args:
+        iterable (Iterable): Source des éléments.
+        maxsize (int): Nombre maximal d'éléments en attente dans la file.
+        poll_interval (float): Délai (secondes) entre deux vérifications de l'arrêt du consommateur.
+    Returns:
+        Iterator: Les éléments de `iterable`, dans le même ordre.
+    """
+    items = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=poll_interval)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        iterator = iter(iterable)
+        try:
+            for item in iterator:
+                if not put(item):
+                    break
+        except BaseException as e:
+            put(_Failure(e))
+        finally:
+            # Consommateur arrêté : la source (générateur de récupération) libère ses ressources
+            if stop.is_set() and hasattr(iterator, "close"):
+                iterator.close()
+            put(_DONE)
+
+    threading.Thread(target=produce, name="pipeline-producer", daemon=True).start()
+    try:
+        while True:
+            item = items.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+
+
+class BackgroundWriter:
+    """Écrit des lots dans un thread dédié, alimenté par une file bornée.
+    `submit` bloque lorsque `maxsize` lots attendent déjà : la mémoire reste bornée
+    même si l'écriture est plus lente que la production.
+    """
+    def __init__(self, write: Callable[[List[Dict]], object], maxsize: int = 4):
+        """
+        Args:
+            write (Callable[[List[Dict]], object]): Fonction d'écriture d'un lot (insert_many...).
+            maxsize (int): Nombre maximal de lots en attente.
+        """
+        self._write = write
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name="pipeline-writer", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = self._queue.get()
+            if batch is _DONE:
+                return
+            if self._error is None:
+                try:
+                    self._write(batch)
+                except BaseException as e:
+                    self._error = e
+
+    def submit(self, batch: List[Dict]):
+        """Ajoute un lot à écrire ; relance l'erreur d'une écriture précédente le cas échéant."""
+        if self._error is not None:
+            raise self._error
+        self._queue.put(batch)
+
+    def close(self):
+        """Attend la fin des écritures en cours et relance leur éventuelle erreur."""
+        self._queue.put(_DONE)
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+
+def run_pipeline(pages: Iterable[List[Dict]], clean: Callable[[List[Dict]], List[Dict]],
+                 write: Callable[[List[Dict]], object], batch_size: int = 500, queue_size: int = 4,
+                 label: str = "documents") -> PipelineStats:
+    """
+    Exécute le pipeline ETL en flux : récupération des pages → nettoyage → lots → écriture.
+    La récupération et l'écriture tournent chacune dans leur thread, reliées au nettoyage
+    par des files bornées : les entrées/sorties réseau et les écritures MongoDB se recouvrent,
+    et au plus quelques pages et lots sont en mémoire à un instant donné.
+    Args:
+        pages (Iterable[List[Dict]]): Pages d'enregistrements bruts (générateur de récupération).
+        clean (Callable[[List[Dict]], List[Dict]]): Nettoyage d'un lot.
+        write (Callable[[List[Dict]], object]): Écriture d'un lot nettoyé.
+        batch_size (int): Nombre de documents par écriture.
+        queue_size (int): Taille des files entre les étapes.
+        label (str): Nom des documents dans les messages de progression.
+    Returns:
+        PipelineStats: Nombre de documents et de lots écrits, durée et pic RSS.
+    """
+    start = time.perf_counter()
+    fetched = background_iter(pages, maxsize=queue_size)
+    records = (record for page in fetched for record in page)
+    writer = BackgroundWriter(write, maxsize=queue_size)
+    count = batches = 0
+    try:
+        for batch in chunked(records, batch_size):
+            writer.submit(clean(batch))
+            count += len(batch)
+            batches += 1
+            print(f"  Traité {count} {label}")
+    finally:
+        # Arrête la récupération si le nettoyage ou l'écriture a échoué
+        fetched.close()
+        writer.close()
+    return PipelineStats(count, batches, time.perf_counter() - start, peak_rss_mb())
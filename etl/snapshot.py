@@ -0,0 +1,103 @@
+import json
+import os
+import shutil
+from datetime import datetime
+from typing import Dict, Iterable
+import numpy as np
+
+# Version du format des instantanés (relue par app/snapshot.py)
+SNAPSHOT_FORMAT = 1
+MANIFEST_FILE = "manifest.json"
+# Fichier désignant l'instantané courant, remplacé atomiquement à chaque publication
+CURRENT_FILE = "CURRENT"
+
+# Champs texte encodés par dictionnaire : une colonne de codes (0 = absent) et la liste des valeurs
+DICTIONARY_FIELDS = ("regpri", "typsta", "zoneres", "nomvoie")
+
+# Champs lus dans MongoDB pour construire un instantané
+SNAPSHOT_PROJECTION = {"_id": 0, "_key": 1, "geo_point_2d": 1, "arrond": 1, "placal": 1, "surface_calculee": 1,
+                       **{field: 1 for field in DICTIONARY_FIELDS}}
+
+PLACAL_MISSING = -1
+
+
+def _code_dtype(size: int):
+    """Plus petit type entier non signé capable de coder `size` valeurs plus l'absence (0)."""
+    return np.uint8 if size < 2 ** 8 else np.uint16 if size < 2 ** 16 else np.uint32
+
+
+def write_snapshot(emplacements: Iterable[Dict], directory: str, version: str, keep: int = 2) -> str:
+    """
+    Écrit un instantané colonnaire des emplacements, lisible en mémoire partagée (np.load mmap_mode="r").
+    Chaque colonne est un fichier .npy : clés `_key` (octets, triées), coordonnées float32
+    (NaN si absentes), arrond int8 (0 si absent), placal int16 (-1 si absent), surface float32,
+    et codes des champs de DICTIONARY_FIELDS. Les dictionnaires de valeurs sont dans manifest.json.
+    L'instantané est écrit dans `<directory>/<version>/` puis publié en remplaçant CURRENT ;
+    seuls les `keep` instantanés les plus récents sont conservés.
+    Args:
+        emplacements (Iterable[Dict]): Documents emplacements (au moins les champs de SNAPSHOT_PROJECTION).
+        directory (str): Répertoire des instantanés.
+        version (str): Version des données (celle publiée dans etl_metadata).
+        keep (int): Nombre d'instantanés conservés.
+    Returns:
+        str: Chemin de l'instantané écrit.
+    """
+    keys, lats, lons, arronds, placals, surfaces = [], [], [], [], [], []
+    dictionaries = {field: {None: 0} for field in DICTIONARY_FIELDS}
+    codes = {field: [] for field in DICTIONARY_FIELDS}
+    for emp in emplacements:
+        if emp.get("_key") is None:
+            continue
+        keys.append(str(emp["_key"]).encode("utf-8"))
+        geo_point = emp.get("geo_point_2d") or {}
+        lat, lon = geo_point.get("lat"), geo_point.get("lon")
+        lats.append(np.nan if lat is None or lon is None else lat)
+        lons.append(np.nan if lat is None or lon is None else lon)
+        arronds.append(emp.get("arrond") or 0)
+        placals.append(PLACAL_MISSING if emp.get("placal") is None else emp["placal"])
+        surfaces.append(np.nan if emp.get("surface_calculee") is None else emp["surface_calculee"])
+        for field in DICTIONARY_FIELDS:
+            values = dictionaries[field]
+            codes[field].append(values.setdefault(emp.get(field) or None, len(values)))
+
+    # Tri par clé : la pagination par `after` devient une recherche dichotomique
+    keys = np.array(keys, dtype=bytes) if keys else np.array([], dtype="S1")
+    order = np.argsort(keys, kind="stable")
+    columns = {
+        "key": keys[order],
+        "lat": np.array(lats, dtype=np.float32)[order],
+        "lon": np.array(lons, dtype=np.float32)[order],
+        "arrond": np.array(arronds, dtype=np.int8)[order],
+        "placal": np.clip(np.array(placals, dtype=np.float64), PLACAL_MISSING, np.iinfo(np.int16).max)
+                    .astype(np.int16)[order],
+        "surface_calculee": np.array(surfaces, dtype=np.float32)[order]
+    }
+    for field in DICTIONARY_FIELDS:
+        columns[field] = np.array(codes[field], dtype=_code_dtype(len(dictionaries[field])))[order]
+
+    path = os.path.join(directory, version)
+    os.makedirs(path, exist_ok=True)
+    for name, column in columns.items():
+        np.save(os.path.join(path, f"{name}.npy"), column)
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "version": version,
+        "rows": len(keys),
+        "created_at": datetime.utcnow().isoformat(),
+        # Valeurs par code ; la valeur du code 0 (absent) est None
+        "dictionaries": {field: list(values) for field, values in dictionaries.items()}
+    }
+    with open(os.path.join(path, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+
+    current = os.path.join(directory, CURRENT_FILE)
+    with open(current + ".tmp", "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(current + ".tmp", current)
+
+    # Les anciens instantanés restent lisibles par les processus qui les ont déjà ouverts (mmap)
+    versions = sorted(name for name in os.listdir(directory) if os.path.isdir(os.path.join(directory, name)))
+    for name in versions[:-keep] if keep else []:
+        if name != version:
+            shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+    return path
@@ -0,0 +1,6 @@
+# Configuration gunicorn : gunicorn -c gunicorn.conf.py app.main:app
+import os
+from app.connections import post_fork
+
+bind = os.getenv("GUNICORN_BIND", "127.0.0.1:8080")
+workers = int(os.getenv("GUNICORN_WORKERS", 2))
@@ -0,0 +1,155 @@
+import json
+import os
+import sys
+import threading
+from collections import namedtuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import mongomock
+import pytest
+
+# Les modules de l'application (config, app, etl) sont importés depuis la racine du dépôt
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import COLLECTION_EMPLACEMENTS, COLLECTION_METADATA
+from etl.cleaning import clean_batch
+from benchmarks.synthetic import synthetic_emplacements
+
+DATA_VERSION = "test-v1"
+
+# Connexions attendues par ParkingService et AsyncParkingService
+Connections = namedtuple("Connections", ["db", "async_db"])
+
+
+class AsyncCursor:
+    """Curseur asynchrone minimal (to_list, sort, limit) sur une liste de documents."""
+    def __init__(self, documents):
+        self.documents = list(documents)
+
+    def sort(self, field, direction=1):
+        self.documents.sort(key=lambda doc: doc.get(field), reverse=direction < 0)
+        return self
+
+    def limit(self, limit):
+        self.documents = self.documents[:limit] if limit else self.documents
+        return self
+
+    async def to_list(self, length=None):
+        return self.documents
+
+
+class AsyncCollection:
+    """Enveloppe asynchrone d'une collection mongomock (sous-ensemble de l'API asynchrone de PyMongo)."""
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def find_one(self, *args, **kwargs):
+        return self.collection.find_one(*args, **kwargs)
+
+    def find(self, *args, **kwargs):
+        return AsyncCursor(self.collection.find(*args, **kwargs))
+
+    async def aggregate(self, pipeline):
+        return AsyncCursor(self.collection.aggregate(pipeline))
+
+
+class AsyncDatabase:
+    def __init__(self, db):
+        self.db = db
+
+    def __getitem__(self, name):
+        return AsyncCollection(self.db[name])
+
+
+@pytest.fixture(scope="session")
+def emplacement_documents():
+    """Emplacements synthétiques nettoyés, tels que stockés dans MongoDB."""
+    return clean_batch(synthetic_emplacements(5000, seed=7))[0]
+
+
+@pytest.fixture
+def mongo_db(emplacement_documents):
+    """Base mongomock chargée des emplacements, avec une version de données publiée."""
+    db = mongomock.MongoClient().parking_test
+    db[COLLECTION_EMPLACEMENTS].insert_many([dict(doc) for doc in emplacement_documents])
+    db[COLLECTION_METADATA].insert_one({"_id": "mongo", "version": DATA_VERSION})
+    return db
+
+
+@pytest.fixture
+def connections(mongo_db):
+    return Connections(mongo_db, AsyncDatabase(mongo_db))
+
+
+class OpenDataHandler(BaseHTTPRequestHandler):
+    """Réplique locale de l'API Open Data : /records (limit, offset, total_count) et /exports/<format>.
+    Les échecs sont déterministes : `failures` associe un offset au nombre de réponses 503 à
+    renvoyer avant de servir la page (-1 : toujours).
+    """
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        with server.lock:
+            server.requests.append((url.path, params))
+        if "/exports/" in url.path:
+            return self.send_export()
+
+        offset, limit = int(params.get("offset", 0)), int(params.get("limit", 10))
+        with server.lock:
+            remaining = server.failures.get(offset, 0) if limit else 0
+            if remaining:
+                server.failures[offset] = remaining - 1 if remaining > 0 else remaining
+        if remaining:
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = json.dumps({
+            "total_count": len(server.records) if server.total is None else server.total,
+            "results": server.records[offset:offset + limit]
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_export(self):
+        """Export servi en blocs (Transfer-Encoding: chunked), dans l'ordre de `export_chunks`."""
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for chunk in self.server.export_chunks:
+            if callable(chunk):
+                # Attente côté serveur (ex. que le client ait décodé les premiers enregistrements)
+                chunk()
+                continue
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def open_data_server():
+    """Serveur Open Data local sur un port libre ; `url` est son point d'accès /records."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), OpenDataHandler)
+    server.daemon_threads = True
+    server.records = [{"id": str(i), "arrond": i % 20 + 1, "regpri": "PAYANT"} for i in range(250)]
+    server.total = None
+    server.failures = {}
+    server.requests = []
+    server.export_chunks = []
+    server.lock = threading.Lock()
+    server.url = f"http://127.0.0.1:{server.server_port}/catalog/datasets/emplacements/records"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,114 @@
+import copy
+from datetime import datetime
+import pytest
+from etl.cleaning import clean_batch, fingerprint, normalize_fields
+from benchmarks.synthetic import synthetic_emplacements
+
+# Champs ajoutés par le nettoyage par lots, absents du nettoyage ligne par ligne d'origine
+ADDED_FIELDS = ("_key", "_hash", "regpri_norm", "typsta_norm", "nomvoie_words")
+
+
+def baseline_clean_data(data):
+    """Nettoyage ligne par ligne d'origine (MongoLoader.clean_data avant le passage par lots), à l'identique."""
+    cleaned_data = []
+    for item in data:
+        if "geo_point_2d" in item and item["geo_point_2d"]:
+            geo_point = item["geo_point_2d"]
+            if isinstance(geo_point, dict) and "lat" in geo_point and "lon" in geo_point:
+                lat, lon = geo_point["lat"], geo_point["lon"]
+                if 48.8 <= lat <= 48.9 and 2.2 <= lon <= 2.5:
+                    item["location"] = {
+                        "type": "Point",
+                        "coordinates": [lon, lat]
+                    }
+
+        item["loaded_at"] = datetime.utcnow()
+        item["arrond"] = int(item.get("arrond", 0)) if item.get("arrond") else None
+
+        for field in ["regpri", "typsta", "nomvoie", "zoneres"]:
+            if field in item and item[field]:
+                item[field] = str(item[field]).strip()
+
+        cleaned_data.append(item)
+
+    return cleaned_data
+
+
+def record(id, lat=48.85, lon=2.35, **fields):
+    doc = {"id": id, "geo_point_2d": {"lat": lat, "lon": lon}, "arrond": 4, "regpri": "PAYANT",
+           "typsta": "LONGITUDINAL", "nomvoie": "RUE DE RIVOLI", "zoneres": "4A"}
+    doc.update(fields)
+    return doc
+
+
+EDGE_CASES = [
+    # Bornes de l'emprise, incluses, et valeurs juste à l'extérieur
+    record("lat-min", lat=48.8), record("lat-max", lat=48.9), record("lon-min", lon=2.2), record("lon-max", lon=2.5),
+    record("corner", lat=48.8, lon=2.5), record("below", lat=48.7999999), record("above", lat=48.9000001),
+    record("west", lon=2.1999999), record("east", lon=2.5000001), record("int-coords", lat=49, lon=2),
+    # Coordonnées absentes ou incomplètes
+    record("no-geo", geo_point_2d=None), record("empty-geo", geo_point_2d={}),
+    record("lat-only", geo_point_2d={"lat": 48.85}), record("not-a-dict", geo_point_2d=[48.85, 2.35]),
+    dict((k, v) for k, v in record("missing-geo").items() if k != "geo_point_2d"),
+    # Arrondissement absent, vide, nul ou sous forme de texte
+    dict((k, v) for k, v in record("missing-arrond").items() if k != "arrond"),
+    record("empty-arrond", arrond=""), record("none-arrond", arrond=None), record("zero-arrond", arrond=0),
+    record("text-arrond", arrond="12"), record("text-zero-arrond", arrond="0"), record("float-arrond", arrond=7.0),
+    # Champs texte : espaces, chaînes blanches, valeurs vides et non textuelles
+    record("padded", regpri="  PAYANT ", nomvoie="\tRUE DE RIVOLI  \n", zoneres=" 4A"),
+    record("blank", regpri="   ", typsta=" ", nomvoie="\t", zoneres="  "),
+    record("empty-text", regpri="", typsta=None, nomvoie=""),
+    record("non-text", zoneres=5, typsta=12.5),
+    {"id": None, "arrond": "3"},
+    {},
+]
+
+
+def without(doc, fields):
+    return {k: v for k, v in doc.items() if k not in fields}
+
+
+def assert_same_as_baseline(records):
+    expected = baseline_clean_data(copy.deepcopy(records))
+    actual, _ = clean_batch(copy.deepcopy(records))
+    assert len(actual) == len(expected)
+    ignored = ADDED_FIELDS + ("loaded_at",)
+    for exp, act in zip(expected, actual):
+        exp, act_content = without(exp, ignored), without(act, ignored)
+        assert act_content == exp
+        assert {k: type(v) for k, v in act_content.items()} == {k: type(v) for k, v in exp.items()}
+
+
+@pytest.mark.parametrize("doc", EDGE_CASES, ids=lambda doc: str(doc.get("id")))
+def test_clean_batch_matches_baseline_rules(doc):
+    assert_same_as_baseline([doc])
+
+
+def test_clean_batch_matches_baseline_on_mixed_batch():
+    assert_same_as_baseline(EDGE_CASES + synthetic_emplacements(2000, seed=3, dirty=0.2))
+
+
+def test_clean_batch_adds_normalized_fields_and_fingerprint():
+    expected = [fingerprint(normalize_fields(doc)) for doc in baseline_clean_data(copy.deepcopy(EDGE_CASES))]
+    actual, _ = clean_batch(copy.deepcopy(EDGE_CASES))
+    for exp, act in zip(expected, actual):
+        assert without(act, ("loaded_at",)) == without(exp, ("loaded_at",))
+
+
+def test_clean_batch_shares_one_loaded_at():
+    actual, _ = clean_batch(copy.deepcopy(EDGE_CASES))
+    assert len({doc["loaded_at"] for doc in actual}) == 1
+
+
+def test_clean_batch_report():
+    _, report = clean_batch(copy.deepcopy(EDGE_CASES))
+    assert report["rows"] == len(EDGE_CASES)
+    assert report["out_of_bbox"] == 5
+    assert report["missing_geo"] == 7
+    assert report["missing_arrond"] == 5
+    assert set(report["samples"]["out_of_bbox"]) == {"below", "above", "west", "east", "int-coords"}
+
+
+def test_clean_batch_empty():
+    assert clean_batch([]) == ([], {"rows": 0, "missing_geo": 0, "out_of_bbox": 0, "missing_arrond": 0,
+                                    "samples": {}})
@@ -0,0 +1,141 @@
+import json
+import os
+import socket
+from itertools import chain
+import pytest
+import etl.concurrent_fetch
+import etl.fetch_emplacements
+from etl.concurrent_fetch import RECORDS_WINDOW, Checkpoint, ConcurrentFetcher, FetchError
+from etl.fetch_emplacements import EmplacementsFetcher
+
+PAGE_SIZE = 20
+BACKOFF = 0.01
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Délais d'attente entre deux tentatives, enregistrés au lieu d'être attendus."""
+    delays = []
+    monkeypatch.setattr(etl.concurrent_fetch.time, "sleep", delays.append)
+    return delays
+
+
+def fetcher(url, checkpoint_path=None, workers=4, max_retries=3):
+    return ConcurrentFetcher(url, page_size=PAGE_SIZE, workers=workers, rate_limit=0, max_retries=max_retries,
+                             backoff=BACKOFF, checkpoint_path=checkpoint_path, timeout=5)
+
+
+def page_requests(server):
+    """Offsets des pages demandées à /records (hors demandes du nombre total)."""
+    return [int(params["offset"]) for path, params in server.requests
+            if path.endswith("/records") and params.get("limit") != "0"]
+
+
+def count_requests(server):
+    return sum(1 for path, params in server.requests if path.endswith("/records") and params.get("limit") == "0")
+
+
+def closed_port_url():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}/records"
+
+
+def test_fetch_all_returns_every_record_in_order(open_data_server):
+    assert fetcher(open_data_server.url).fetch_all() == open_data_server.records
+    assert sorted(page_requests(open_data_server)) == list(range(0, 250, PAGE_SIZE))
+    assert count_requests(open_data_server) == 1
+
+
+def test_known_total_is_not_requested_again(open_data_server):
+    pages = dict(fetcher(open_data_server.url).iter_pages(total=len(open_data_server.records)))
+    assert sorted(pages) == list(range(0, 250, PAGE_SIZE))
+    assert count_requests(open_data_server) == 0
+
+
+def test_failed_page_is_retried_with_exponential_backoff(open_data_server, sleeps):
+    open_data_server.failures = {40: 2}
+    assert fetcher(open_data_server.url).fetch_all() == open_data_server.records
+    assert page_requests(open_data_server).count(40) == 3
+    assert len(sleeps) == 2
+    assert BACKOFF <= sleeps[0] <= 1.5 * BACKOFF
+    assert 2 * BACKOFF <= sleeps[1] <= 3 * BACKOFF
+
+
+def test_permanent_failure_raises_and_resume_fetches_missing_pages(open_data_server, sleeps, tmp_path):
+    path = str(tmp_path / "checkpoint.jsonl")
+    open_data_server.failures = {100: -1}
+    with pytest.raises(FetchError):
+        fetcher(open_data_server.url, path, workers=1, max_retries=1).fetch_all()
+    assert page_requests(open_data_server).count(100) == 2
+
+    with open(path, encoding="utf-8") as f:
+        saved = {json.loads(line)["offset"] for line in list(f)[1:]}
+    assert saved == {0, 20, 40, 60, 80}
+
+    open_data_server.failures = {}
+    open_data_server.requests.clear()
+    assert fetcher(open_data_server.url, path).fetch_all() == open_data_server.records
+    assert sorted(page_requests(open_data_server)) == [offset for offset in range(0, 250, PAGE_SIZE)
+                                                       if offset not in saved]
+    assert not os.path.exists(path)
+
+
+def test_interrupted_fetch_resumes_from_checkpoint(open_data_server, tmp_path):
+    path = str(tmp_path / "checkpoint.jsonl")
+    pages = fetcher(open_data_server.url, path, workers=2).iter_pages()
+    consumed = dict(next(pages) for _ in range(3))
+    pages.close()
+    # Interruption pendant l'écriture d'une page : dernière ligne tronquée
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"offset": 200, "records": [{"id"')
+
+    open_data_server.requests.clear()
+    resumed = list(fetcher(open_data_server.url, path).iter_pages())
+    assert dict(resumed[:3]) == consumed
+    assert sorted(offset for offset, _ in resumed) == list(range(0, 250, PAGE_SIZE))
+    assert sorted(page_requests(open_data_server)) == [offset for offset in range(0, 250, PAGE_SIZE)
+                                                       if offset not in consumed]
+
+
+def test_checkpoint_of_another_dataset_is_ignored(tmp_path):
+    checkpoint = Checkpoint(str(tmp_path / "checkpoint.jsonl"))
+    checkpoint.load({"total_count": 250})
+    checkpoint.save_page(0, [{"id": "0"}])
+    assert checkpoint.load({"total_count": 250}) == {0: [{"id": "0"}]}
+    assert checkpoint.load({"total_count": 260}) == {}
+
+
+def test_records_window_exceeded_raises(open_data_server):
+    open_data_server.total = RECORDS_WINDOW + 1
+    with pytest.raises(FetchError):
+        fetcher(open_data_server.url).fetch_all()
+    assert page_requests(open_data_server) == []
+
+
+def test_network_failure_raises(sleeps):
+    with pytest.raises(FetchError):
+        fetcher(closed_port_url(), max_retries=2).fetch_all()
+    assert len(sleeps) == 2
+
+
+def test_emplacements_fetcher_counts_once(open_data_server, monkeypatch, tmp_path):
+    monkeypatch.setattr(etl.fetch_emplacements, "FETCH_CHECKPOINT_DIR", str(tmp_path))
+    source = EmplacementsFetcher(api_url=open_data_server.url)
+    records = list(chain.from_iterable(source.iter_emplacements_pages(batch_size=50, workers=4)))
+    assert sorted(records, key=lambda record: int(record["id"])) == open_data_server.records
+    assert count_requests(open_data_server) == 1
+
+    open_data_server.requests.clear()
+    assert source.fetch_all_emplacements(batch_size=50, workers=4, total=250) == open_data_server.records
+    assert count_requests(open_data_server) == 0
+
+
+def test_emplacements_fetcher_uses_export_past_records_window(open_data_server):
+    open_data_server.total = RECORDS_WINDOW + 1
+    open_data_server.export_chunks = [json.dumps(record).encode("utf-8") + b"\n" for record in open_data_server.records]
+    source = EmplacementsFetcher(api_url=open_data_server.url)
+    assert list(chain.from_iterable(source.iter_emplacements_pages(workers=4))) == open_data_server.records
+    assert count_requests(open_data_server) == 1
+    assert page_requests(open_data_server) == []
@@ -0,0 +1,141 @@
+import importlib.util
+import json
+import os
+import threading
+import pytest
+from etl.export_stream import export_url, iter_jsonl, iter_parquet, stream_export
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "export_emplacements.jsonl")
+
+
+@pytest.fixture(scope="module")
+def fixture_records():
+    with open(FIXTURE, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+@pytest.fixture
+def parquet_fixture(fixture_records, tmp_path):
+    """Les mêmes enregistrements au format Parquet (pyarrow requis)."""
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = str(tmp_path / "export_emplacements.parquet")
+    pq.write_table(pa.Table.from_pylist(fixture_records), path)
+    return path
+
+
+def export_of(server, fmt="jsonl"):
+    return export_url(server.url, fmt)
+
+
+def test_export_url():
+    assert export_url("https://example.org/api/datasets/emplacements/records") == \
+        "https://example.org/api/datasets/emplacements/exports/jsonl"
+    assert export_url("https://example.org/api/datasets/emplacements/records/", "parquet") == \
+        "https://example.org/api/datasets/emplacements/exports/parquet"
+    with pytest.raises(ValueError):
+        export_url("https://example.org/api/datasets/emplacements/records", "csv")
+
+
+def test_iter_jsonl_skips_blank_lines(fixture_records):
+    with open(FIXTURE, "rb") as f:
+        assert list(iter_jsonl(f)) == fixture_records
+    assert list(iter_jsonl(['{"id": "1"}', "", "  \n", b'{"id": "2"}\n'])) == [{"id": "1"}, {"id": "2"}]
+
+
+def test_iter_jsonl_is_incremental():
+    read = []
+
+    def lines():
+        for i in range(3):
+            read.append(i)
+            yield f'{{"id": "{i}"}}\n'
+
+    records = iter_jsonl(lines())
+    assert next(records) == {"id": "0"}
+    assert read == [0]
+
+
+def test_iter_jsonl_trailing_partial_line(fixture_records):
+    with open(FIXTURE, encoding="utf-8") as f:
+        lines = f.readlines()
+    # Dernière ligne complète mais sans fin de ligne : décodée
+    assert list(iter_jsonl(lines[:-1] + [lines[-1].rstrip("\n")])) == fixture_records
+    # Dernière ligne tronquée (export interrompu) : erreur après les enregistrements complets
+    decoded = []
+    with pytest.raises(ValueError):
+        for record in iter_jsonl(lines[:-1] + [lines[-1][:40]]):
+            decoded.append(record)
+    assert decoded == fixture_records[:-1]
+
+
+@pytest.mark.parametrize("content", ["", "\n\n"])
+def test_empty_export(content, tmp_path, open_data_server):
+    path = tmp_path / "empty.jsonl"
+    path.write_text(content)
+    assert list(stream_export(str(path))) == []
+    open_data_server.export_chunks = [content.encode("utf-8")] if content else []
+    assert list(stream_export(export_of(open_data_server))) == []
+
+
+def test_stream_export_local_file(fixture_records):
+    assert list(stream_export(FIXTURE)) == fixture_records
+    assert list(stream_export("file://" + FIXTURE)) == fixture_records
+
+
+def test_stream_export_http_is_incremental(fixture_records, open_data_server):
+    with open(FIXTURE, "rb") as f:
+        body = f.read()
+    first_line = body.index(b"\n") + 1
+    consumed = threading.Event()
+    waited = []
+    # Premier enregistrement puis un morceau du suivant ; la suite n'est envoyée qu'une fois
+    # le premier décodé par le client (ou après 5 s si la réponse était lue d'un bloc)
+    open_data_server.export_chunks = [body[:first_line + 10], lambda: waited.append(consumed.wait(5)),
+                                      body[first_line + 10:]]
+    records = stream_export(export_of(open_data_server))
+    assert next(records) == fixture_records[0]
+    consumed.set()
+    assert list(records) == fixture_records[1:]
+    assert waited == [True]
+
+
+def test_stream_export_http_trailing_partial_line(fixture_records, open_data_server):
+    with open(FIXTURE, "rb") as f:
+        body = f.read().rstrip(b"\n")
+    open_data_server.export_chunks = [body[:-20]]
+    decoded = []
+    with pytest.raises(ValueError):
+        for record in stream_export(export_of(open_data_server)):
+            decoded.append(record)
+    assert decoded == fixture_records[:-1]
+
+
+def test_stream_export_rejects_unknown_format():
+    with pytest.raises(ValueError):
+        list(stream_export(FIXTURE, fmt="csv"))
+
+
+def test_iter_parquet(parquet_fixture, fixture_records):
+    assert list(iter_parquet(parquet_fixture, batch_size=2)) == fixture_records
+
+
+def test_stream_export_parquet(parquet_fixture, fixture_records, open_data_server):
+    assert list(stream_export(parquet_fixture, fmt="parquet")) == fixture_records
+    with open(parquet_fixture, "rb") as f:
+        open_data_server.export_chunks = [f.read()]
+    assert list(stream_export(export_of(open_data_server, "parquet"), fmt="parquet")) == fixture_records
+
+
+def test_empty_parquet_export(tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = str(tmp_path / "empty.parquet")
+    pq.write_table(pa.table({"id": pa.array([], pa.string())}), path)
+    assert list(stream_export(path, fmt="parquet")) == []
+
+
+@pytest.mark.skipif(importlib.util.find_spec("pyarrow") is not None, reason="pyarrow installé")
+def test_parquet_without_pyarrow():
+    with pytest.raises(ImportError, match="pyarrow"):
+        list(iter_parquet(FIXTURE))
@@ -0,0 +1,54 @@
+import os
+import pytest
+import app.geocoding
+from app.geocoding import GeocodeStore
+
+
+def test_store_is_opened_on_first_use(tmp_path):
+    path = tmp_path / "cache" / "geocode.sqlite"
+    store = GeocodeStore(str(path))
+    assert not path.parent.exists()
+    assert store.get("10 rue de rivoli") is None
+    store.set("10 rue de rivoli", (48.8556, 2.3589))
+    assert store.get("10 rue de rivoli") == (48.8556, 2.3589)
+    assert path.exists()
+    store.close()
+    # Rouvert au besoin après close
+    assert store.get("10 rue de rivoli") == (48.8556, 2.3589)
+    store.close()
+
+
+def test_expired_entries_are_ignored(tmp_path, monkeypatch):
+    store = GeocodeStore(str(tmp_path / "geocode.sqlite"), ttl=60)
+    store.set("place d'italie", (48.8313, 2.3557))
+    monkeypatch.setattr(app.geocoding.time, "time", lambda: 1e12)
+    assert store.get("place d'italie") is None
+
+
+def test_child_process_opens_its_own_connection(tmp_path, monkeypatch):
+    store = GeocodeStore(str(tmp_path / "geocode.sqlite"))
+    store.set("rue lepic", (48.8852, 2.3339))
+    inherited = store._conn
+    monkeypatch.setattr(app.geocoding.os, "getpid", lambda: -1)
+    assert store.get("rue lepic") == (48.8852, 2.3339)
+    assert store._conn is not inherited
+    # La connexion du parent n'est pas fermée par l'enfant
+    assert inherited.execute("SELECT COUNT(*) FROM geocode").fetchone() == (1,)
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="os.fork indisponible")
+def test_store_works_across_fork(tmp_path):
+    store = GeocodeStore(str(tmp_path / "geocode.sqlite"))
+    store.set("rue lepic", (48.8852, 2.3339))
+    pid = os.fork()
+    if pid == 0:
+        try:
+            ok = store.get("rue lepic") == (48.8852, 2.3339)
+            store.set("rue de vaugirard", (48.8412, 2.3003))
+        except Exception:
+            ok = False
+        os._exit(0 if ok else 1)
+    _, status = os.waitpid(pid, 0)
+    assert os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0
+    assert store.get("rue de vaugirard") == (48.8412, 2.3003)
+    store.close()
@@ -0,0 +1,71 @@
+import threading
+import pytest
+from etl.pipeline import background_iter, chunked, run_pipeline
+
+
+class Source:
+    """Générateur instrumenté : nombre d'éléments produits et fermeture par le producteur."""
+    def __init__(self, size):
+        self.size = size
+        self.produced = 0
+        self.closed = threading.Event()
+
+    def __iter__(self):
+        try:
+            for i in range(self.size):
+                self.produced += 1
+                yield i
+        finally:
+            self.closed.set()
+
+
+def producer_threads():
+    return [thread for thread in threading.enumerate() if thread.name == "pipeline-producer"]
+
+
+def test_background_iter_keeps_order():
+    assert list(background_iter(range(100), maxsize=3)) == list(range(100))
+
+
+def test_background_iter_raises_producer_error():
+    def failing():
+        yield 1
+        raise RuntimeError("page perdue")
+
+    items = background_iter(failing())
+    assert next(items) == 1
+    with pytest.raises(RuntimeError, match="page perdue"):
+        next(items)
+
+
+def test_producer_stops_when_consumer_stops_early():
+    source = Source(10000)
+    items = iter(background_iter(iter(source), maxsize=2, poll_interval=0.01))
+    assert [next(items) for _ in range(3)] == [0, 1, 2]
+    items.close()
+    assert source.closed.wait(2)
+    # Au plus les éléments consommés, la file pleine et celui en attente de place
+    assert source.produced <= 3 + 2 + 1
+    for thread in producer_threads():
+        thread.join(2)
+    assert not producer_threads()
+
+
+def test_run_pipeline_writes_every_batch():
+    written = []
+    pages = chunked(({"id": i} for i in range(1050)), 100)
+    stats = run_pipeline(pages, lambda batch: batch, written.append, batch_size=500, queue_size=2)
+    assert (stats.count, stats.batches) == (1050, 3)
+    assert [len(batch) for batch in written] == [500, 500, 50]
+
+
+def test_run_pipeline_stops_fetching_when_cleaning_fails():
+    source = Source(100000)
+
+    def clean(batch):
+        raise ValueError("document invalide")
+
+    with pytest.raises(ValueError, match="document invalide"):
+        run_pipeline(chunked(iter(source), 10), clean, lambda batch: None, batch_size=10, queue_size=2)
+    assert source.closed.wait(2)
+    assert source.produced < 1000
@@ -0,0 +1,118 @@
+from itertools import combinations
+import pytest
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+from config import MONGO_URI, COLLECTION_EMPLACEMENTS
+from app.map import ParkingService
+from etl.cleaning import normalize_text
+from etl.load_to_mongo import MongoLoader
+from conftest import Connections
+
+# Plans d'exécution des recherches sur un vrai serveur MongoDB (MONGO_URI, localhost par défaut) :
+# chaque combinaison de filtres du formulaire doit être servie par un index, sans COLLSCAN.
+# Ignoré lorsqu'aucun mongod n'est joignable.
+
+# Champs du formulaire de recherche traduits en critères MongoDB par build_query
+FORM_FIELDS = ("arrondissement", "regpri", "typsta", "zoneres", "nomvoie")
+FORM_COMBINATIONS = [fields for size in range(len(FORM_FIELDS) + 1) for fields in combinations(FORM_FIELDS, size)]
+
+# Étapes qui attestent l'usage d'un index
+INDEX_STAGES = {"IXSCAN", "GEO_NEAR_2DSPHERE", "EXPRESS_IXSCAN", "IDHACK"}
+
+CENTER = (48.8566, 2.3522)
+RADIUS = 500
+LIMIT = 500
+
+
+def plan_stages(explain) -> set:
+    """Collecte récursivement les noms d'étapes (stage) d'une sortie explain."""
+    stages = set()
+    if isinstance(explain, dict):
+        if isinstance(explain.get("stage"), str):
+            stages.add(explain["stage"])
+        for value in explain.values():
+            stages |= plan_stages(value)
+    elif isinstance(explain, list):
+        for value in explain:
+            stages |= plan_stages(value)
+    return stages
+
+
+def winning_plans(explain):
+    """Extrait les plans gagnants (hors plans rejetés) d'une sortie explain find ou aggregate."""
+    if isinstance(explain, dict):
+        if "winningPlan" in explain:
+            yield explain["winningPlan"]
+            return
+        for value in explain.values():
+            yield from winning_plans(value)
+    elif isinstance(explain, list):
+        for value in explain:
+            yield from winning_plans(value)
+
+
+def assert_uses_index(explain):
+    stages = set().union(*(plan_stages(plan) for plan in winning_plans(explain))) or plan_stages(explain)
+    assert "COLLSCAN" not in stages
+    assert stages & INDEX_STAGES, sorted(stages)
+
+
+@pytest.fixture(scope="module")
+def mongo_db(emplacement_documents):
+    """Base temporaire chargée des emplacements, avec les index créés par l'ETL."""
+    client = MongoClient(MONGO_URI or "mongodb://localhost:27017", serverSelectionTimeoutMS=1000)
+    try:
+        client.admin.command("ping")
+    except PyMongoError:
+        pytest.skip("aucun serveur MongoDB joignable")
+    client.drop_database("parking_query_plans_test")
+    db = client.parking_query_plans_test
+    db[COLLECTION_EMPLACEMENTS].insert_many([dict(doc) for doc in emplacement_documents])
+    db[COLLECTION_EMPLACEMENTS].create_indexes(MongoLoader.index_models(COLLECTION_EMPLACEMENTS))
+    yield db
+    client.drop_database("parking_query_plans_test")
+    client.close()
+
+
+@pytest.fixture(scope="module")
+def service(mongo_db):
+    return ParkingService(Connections(mongo_db, None))
+
+
+@pytest.fixture(scope="module")
+def form_values(emplacement_documents):
+    """Valeurs réalistes pour chaque champ du formulaire, prises dans les emplacements chargés."""
+    doc = next(doc for doc in emplacement_documents
+               if doc.get("arrond") and doc.get("regpri") and doc.get("typsta") and doc.get("zoneres")
+               and doc.get("nomvoie"))
+    return {
+        "arrondissement": str(doc["arrond"]),
+        "regpri": doc["regpri"],
+        "typsta": doc["typsta"],
+        "zoneres": doc["zoneres"],
+        # Début du dernier mot du nom, comme une saisie partielle
+        "nomvoie": normalize_text(doc["nomvoie"]).split()[-1][:4]
+    }
+
+
+def form_filters(fields, values) -> dict:
+    return {field: values[field] for field in fields}
+
+
+@pytest.mark.parametrize("fields", FORM_COMBINATIONS, ids=lambda fields: "+".join(fields) or "empty")
+@pytest.mark.parametrize("page", ["first", "next"])
+def test_key_page_uses_index(fields, page, service, mongo_db, form_values, emplacement_documents):
+    # Curseur de page suivante : une clé au milieu de la collection
+    cursor = [sorted(doc["_key"] for doc in emplacement_documents)[len(emplacement_documents) // 2]] \
+        if page == "next" else None
+    query = service.key_page_query(form_filters(fields, form_values), cursor)
+    assert query["_key"] == ({"$gt": cursor[0]} if cursor else {"$exists": True})
+    assert_uses_index(mongo_db[COLLECTION_EMPLACEMENTS].find(query).sort("_key", 1).limit(LIMIT).explain())
+
+
+@pytest.mark.parametrize("fields", FORM_COMBINATIONS, ids=lambda fields: "+".join(fields) or "address")
+def test_near_search_uses_index(fields, service, mongo_db, form_values):
+    query = service.build_query(form_filters(fields, form_values))
+    assert_uses_index(mongo_db.command("aggregate", COLLECTION_EMPLACEMENTS, explain=True,
+                                       pipeline=service.near_pipeline(CENTER, query, RADIUS, LIMIT)))
+    assert_uses_index(mongo_db[COLLECTION_EMPLACEMENTS].find(service.fallback_query(CENTER, query, RADIUS)).explain())
@@ -0,0 +1,88 @@
+import asyncio
+import pytest
+import app.async_service
+import app.map
+from app.async_service import AsyncParkingService
+from app.distance import DistanceEngine
+from app.geocoding import GeocodedPoint
+from app.map import ParkingService
+from app.snapshot import SnapshotHolder
+from etl.snapshot import write_snapshot
+from conftest import DATA_VERSION
+
+# Recherches par position (geohash : sans géocodage) combinées aux filtres du formulaire
+NEAR_SEARCHES = [
+    {"geohash": "u09tvw"},
+    {"geohash": "u09tvw", "regpri": "payant"},
+    {"geohash": "u09tvw", "typsta": "epi", "arrondissement": "4"},
+    {"geohash": "u09tvw", "nomvoie": "de la"},
+    {"geohash": "u09tvw", "zoneres": "4A"},
+    {"geohash": "u09tuk", "regpri": "Livraison", "typsta": "longitudinal"},
+]
+
+
+@pytest.fixture
+def snapshot_service(connections, emplacement_documents, tmp_path):
+    write_snapshot(emplacement_documents, str(tmp_path), DATA_VERSION)
+    service = ParkingService(connections)
+    service.snapshot = SnapshotHolder(str(tmp_path))
+    return service
+
+
+@pytest.fixture
+def memory_service(connections, monkeypatch):
+    monkeypatch.setattr(app.map, "GEO_SEARCH_MODE", "memory")
+    monkeypatch.setattr(app.async_service, "GEO_SEARCH_MODE", "memory", raising=False)
+    service = ParkingService(connections)
+    service.snapshot = SnapshotHolder("")
+    return service
+
+
+def keys(page):
+    return {emp.key for emp in page}
+
+
+@pytest.mark.parametrize("filters", NEAR_SEARCHES)
+def test_memory_mode_matches_snapshot(filters, snapshot_service, memory_service):
+    expected, _ = snapshot_service.search_page(filters, 5000)
+    assert snapshot_service.snapshot.get(DATA_VERSION) is not None
+    results, _ = memory_service.search_page(filters, 5000)
+    assert keys(results) == keys(expected)
+
+
+@pytest.mark.parametrize("filters", NEAR_SEARCHES)
+def test_async_memory_mode_matches_snapshot(filters, snapshot_service, memory_service, connections):
+    expected, _ = snapshot_service.search_page(filters, 5000)
+    results, _ = asyncio.run(AsyncParkingService(memory_service, connections).search_page(filters, 5000))
+    assert keys(results) == keys(expected)
+
+
+def test_filters_restrict_memory_results(memory_service):
+    everything, _ = memory_service.search_page({"geohash": "u09tvw"}, 5000)
+    payant, _ = memory_service.search_page({"geohash": "u09tvw", "regpri": "payant"}, 5000)
+    assert payant and len(payant) < len(everything)
+    assert all(emp.regpri == "PAYANT" for emp in payant)
+
+
+def test_memory_pagination_follows_filters(memory_service):
+    filters = {"geohash": "u09tvw", "regpri": "payant"}
+    full, _ = memory_service.search_page(filters, 5000)
+    first, after = memory_service.search_page(filters, 10)
+    assert after is not None
+    second, _ = memory_service.search_page(filters, 5000, after)
+    assert [emp.key for emp in first + second] == [emp.key for emp in full]
+
+
+def test_address_pages_report_distances_from_the_geocoded_point(snapshot_service, connections, monkeypatch):
+    points = {"a": GeocodedPoint(48.85639, 2.35126, "test"), "b": GeocodedPoint(48.85739, 2.35226, "test")}
+    monkeypatch.setattr(snapshot_service.geocoder, "geocode", points.get)
+    normalized_a, page_a, _ = snapshot_service.cached_search_page({"address": "a"}, 50)
+    normalized_b, page_b, _ = snapshot_service.cached_search_page({"address": "b"}, 50)
+    # Même cellule geohash : même page en cache, distances propres à chaque adresse
+    assert normalized_a == normalized_b and [emp.key for emp in page_a] == [emp.key for emp in page_b]
+    for point, page in ((points["a"], page_a), (points["b"], page_b)):
+        expected = DistanceEngine([emp.lat for emp in page], [emp.lon for emp in page]).distances(
+            point.latitude, point.longitude)
+        assert [emp.distance for emp in page] == pytest.approx(expected.tolist())
+    _, async_page, _ = asyncio.run(AsyncParkingService(snapshot_service, connections).cached_search_page({"address": "b"}, 50))
+    assert async_page == page_b